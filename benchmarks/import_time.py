@@ -0,0 +1,77 @@
+"""Import-time regression benchmark of `datagovindia`.
+
+Every scenario runs in a fresh interpreter, best of `--repeat` runs. The benchmark fails (exit code 1) when a
+scenario imports a module it must not import, e.g. pandas for `datagovindia version`, or exceeds `--max-ms`.
+
+    $ python benchmarks/import_time.py
+    $ python benchmarks/import_time.py --repeat 10 --max-ms 300 --json import_time.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# name -> (code run in a fresh interpreter, modules it must not import)
+SCENARIOS = {
+    "import datagovindia": ("import datagovindia", ["pandas", "requests"]),
+    "import datagovindia.cli": ("import datagovindia.cli", ["pandas", "requests"]),
+    "cli version": (
+        "from datagovindia.cli import cli\ntry:\n    cli(['version'])\nexcept SystemExit:\n    pass",
+        ["pandas", "requests"],
+    ),
+    "from datagovindia import DataGovIndia": ("from datagovindia import DataGovIndia", ["pandas"]),
+    "datagovindia.core + pandas": ("import datagovindia.core, pandas", []),
+}
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+import json
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+def run_scenario(code: str, forbidden: list, repeat: int) -> dict:
+    """Run `code` in `repeat` fresh interpreters, returns the best time in ms and the forbidden modules it loaded."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")]))}
+    best, loaded = None, set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(code=code, forbidden=forbidden)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        loaded.update(result["loaded"])
+    return {"ms": round(best * 1000, 1), "loaded": sorted(loaded)}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario, the best run is reported.")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if a scenario without pandas takes longer.")
+    parser.add_argument("--json", default=None, help="Write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    results, failed = {}, False
+    for name, (code, forbidden) in SCENARIOS.items():
+        result = results[name] = run_scenario(code, forbidden, args.repeat)
+        problems = [f"imported {module}" for module in result["loaded"]]
+        if args.max_ms is not None and "pandas" in forbidden and result["ms"] > args.max_ms:
+            problems.append(f"slower than {args.max_ms} ms")
+        failed = failed or bool(problems)
+        print(f"{name:<40} {result['ms']:>8.1f} ms  {'FAIL: ' + ', '.join(problems) if problems else 'ok'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
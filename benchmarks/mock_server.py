@@ -0,0 +1,279 @@
+"""Local stand-in for the OGD API (`/lists` and `/resource/{id}`), serving a deterministic synthetic catalog.
+
+Point `datagovindia` at it with the `DATAGOVINDIA_API_URL` environment variable:
+
+    $ python benchmarks/mock_server.py --port 8765 --latency 0.05 --throttle-rate 0.01
+    $ DATAGOVINDIA_API_URL=http://127.0.0.1:8765 DATAGOVINDIA_API_KEY=bench datagovindia sync-metadata
+
+Every response is generated from the offset and limit of the request, so a catalog of millions of resources
+costs no memory. Resources only support filters on "state".
+"""
+
+import json
+import gzip
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WORDS = [
+    "rainfall", "crop", "production", "district", "mgnrega", "wages", "census", "population", "school",
+    "enrolment", "hospital", "beds", "mandi", "prices", "electricity", "consumption", "railway", "stations",
+    "literacy", "rate", "road", "accidents", "groundwater", "level", "vaccination", "coverage", "tax",
+    "collection", "forest", "cover", "water", "quality", "housing", "scheme", "pension", "beneficiaries",
+]
+ORG_TYPES = ["Central", "State", "City"]
+SOURCES = ["data.gov.in", "data.gov.in", "data.gov.in", "smartcities.data.gov.in", "tn.data.gov.in"]
+ORGS = [f"Ministry of {WORDS[i].title()}" for i in range(0, len(WORDS), 2)] + [f"Department of {w.title()}" for w in WORDS[1::3]]
+SECTORS = [f"{WORDS[i].title()} {WORDS[i + 1].title()}" for i in range(0, len(WORDS) - 1, 2)]
+STATES = ["Kerala", "Goa", "Punjab", "Assam", "Bihar", "Odisha", "Gujarat", "Sikkim", "Manipur", "Haryana"]
+
+# Most recently updated resource of the catalog, older resources are one minute apart
+LATEST_UPDATE = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+def catalog_record(i: int) -> dict:
+    """Metadata of the i-th most recently updated resource, as returned by /lists."""
+    words = [WORDS[(i * k + k * k) % len(WORDS)] for k in (3, 5, 7, 11)]
+    updated = LATEST_UPDATE - timedelta(minutes=i)
+    return {
+        "index_name": f"{i:08x}-0000-4000-8000-{i * 2654435761 % 16**12:012x}",
+        "title": f"{words[0].title()} {words[1]} by {words[2]} {i % 1000}",
+        "desc": f"{' '.join(words)} statistics published on the OGD platform",
+        "org_type": ORG_TYPES[i % len(ORG_TYPES)],
+        "field": [{"id": f, "name": f.title(), "type": "keyword"} for f in ("state", "district", words[3])],
+        "org": [ORGS[i % len(ORGS)]],
+        "source": SOURCES[i % len(SOURCES)],
+        "sector": [SECTORS[i % len(SECTORS)], SECTORS[(i * 7) % len(SECTORS)]],
+        "created_date": (updated - timedelta(days=i % 900)).strftime("%Y-%m-%d"),
+        "updated_date": updated.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "active": "1",
+    }
+
+def resource_fields(num_fields: int) -> list:
+    """Field metadata of the synthetic resources, `num_fields` extra numeric columns make them wider."""
+    fields = [
+        {"id": "id", "name": "Id", "type": "keyword"},
+        {"id": "state", "name": "State", "type": "keyword"},
+        {"id": "district", "name": "District", "type": "keyword"},
+        {"id": "date", "name": "Date", "type": "date"},
+        {"id": "value", "name": "Value", "type": "double"},
+    ]
+    return fields + [{"id": f"metric_{k}", "name": f"Metric {k}", "type": "double"} for k in range(num_fields)]
+
+def resource_record(j: int, num_fields: int) -> dict:
+    """j-th record of every synthetic resource, all values are strings like on the OGD platform."""
+    record = {
+        "id": str(j),
+        "state": STATES[j % len(STATES)],
+        "district": f"District {j % 731}",
+        "date": (LATEST_UPDATE - timedelta(days=j % 3650)).strftime("%d/%m/%Y"),
+        "value": str(j * 0.25),
+    }
+    for k in range(num_fields):
+        record[f"metric_{k}"] = str((j * (k + 3)) % 10007)
+    return record
+
+class MockOGDServer:
+    """Threaded HTTP server mimicking the OGD API, see the module docstring.
+
+        catalog_size: (int) - Number of resources listed by /lists.
+        resource_size: (int) - Number of records of every resource.
+        num_fields: (int) - Extra numeric columns of every resource.
+        max_page_size: (int) - Largest page served, larger limits are capped like on the OGD platform.
+        latency: (float) - Seconds added to every response.
+        jitter: (float) - Up to this many random seconds added on top of `latency`.
+        error_rate: (float) - Probability of a 502 response.
+        throttle_rate: (float) - Probability of a 429 response.
+        max_rps: (float) - Requests per second above which requests get a 429 response. Defaults to None (no limit).
+        retry_after: (float) - Retry-After header of 429 responses, in seconds.
+        compress: (bool) - gzip responses when the client accepts it.
+        seed: (int) - Seed of the random latency, errors and throttling.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        catalog_size: int = 500_000,
+        resource_size: int = 100_000,
+        num_fields: int = 5,
+        max_page_size: int = 10_000,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        max_rps: float = None,
+        retry_after: float = 1.0,
+        compress: bool = False,
+        seed: int = 0,
+    ):
+        self.catalog_size = catalog_size
+        self.resource_size = resource_size
+        self.num_fields = num_fields
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.compress = compress
+        self.updated = LATEST_UPDATE  # Last update of every resource, bump it with `resource_size` to append records
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "bytes": 0, "200": 0, "429": 0, "502": 0}
+        self._window = [0, 0]  # [second, requests in that second]
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """Serve in a background thread, returns the base URL to use as `DATAGOVINDIA_API_URL`."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _draw(self) -> tuple:
+        """Latency and status of the next response."""
+        with self.lock:
+            self.stats["requests"] += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            if self.max_rps is not None:
+                second = int(time.monotonic())
+                if self._window[0] != second:
+                    self._window = [second, 0]
+                self._window[1] += 1
+                if self._window[1] > self.max_rps:
+                    return delay, 429
+            if self.random.random() < self.throttle_rate:
+                return delay, 429
+            if self.random.random() < self.error_rate:
+                return delay, 502
+            return delay, 200
+
+    def _window_of(self, query: dict) -> tuple:
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["10"])[0])
+        return max(offset, 0), max(min(limit, self.max_page_size), 0)
+
+    def lists(self, query: dict) -> dict:
+        offset, limit = self._window_of(query)
+        active = query.get("filters[active]", ["1"])[0]
+        total = self.catalog_size if active == "1" else 0
+        end = min(offset + limit, total)
+        records = [catalog_record(i) for i in range(offset, end)]
+        return {"status": "ok", "total": total, "count": len(records), "offset": offset, "limit": limit, "records": records}
+
+    def resource(self, resource_id: str, query: dict) -> dict:
+        offset, limit = self._window_of(query)
+        rows = range(self.resource_size)
+        state = query.get("filters[state]", [None])[0]
+        if state is not None:
+            rows = rows[STATES.index(state):: len(STATES)] if state in STATES else range(0)
+        records = [resource_record(j, self.num_fields) for j in rows[offset : offset + limit]]
+        fields = query.get("fields", [None])[0]
+        if fields:
+            keep = fields.split(",")
+            records = [{k: v for k, v in record.items() if k in keep} for record in records]
+        return {
+            "index_name": resource_id,
+            "title": f"Synthetic resource {resource_id}",
+            "updated_date": self.updated.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "status": "ok",
+            "total": len(rows),
+            "count": len(records),
+            "offset": str(offset),
+            "limit": str(limit),
+            "field": resource_fields(self.num_fields),
+            "records": records,
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive connections, like the OGD platform
+
+            def do_GET(self):
+                delay, status = server._draw()
+                if delay:
+                    time.sleep(delay)
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                headers = {"Content-Type": "application/json"}
+                if status == 429:
+                    body = {"status": "error", "message": "Too many requests"}
+                    headers["Retry-After"] = str(server.retry_after)
+                elif status != 200:
+                    body = {"status": "error", "message": "Bad gateway"}
+                elif parts.path.rstrip("/") == "/lists":
+                    body = server.lists(query)
+                elif parts.path.startswith("/resource/"):
+                    body = server.resource(parts.path[len("/resource/"):], query)
+                else:
+                    status, body = 404, {"status": "error", "message": "Not found"}
+                payload = json.dumps(body).encode()
+                if server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    payload = gzip.compress(payload, compresslevel=1)
+                    headers["Content-Encoding"] = "gzip"
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                with server.lock:
+                    server.stats[str(status)] = server.stats.get(str(status), 0) + 1
+                    server.stats["bytes"] += len(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock OGD API until interrupted.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--catalog-size", type=int, default=500_000)
+    parser.add_argument("--resource-size", type=int, default=100_000)
+    parser.add_argument("--num-fields", type=int, default=5)
+    parser.add_argument("--max-page-size", type=int, default=10_000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=None)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--compress", action="store_true")
+    args = parser.parse_args()
+    server = MockOGDServer(**vars(args))
+    print(f"Serving a mock OGD API at {server.url}, set DATAGOVINDIA_API_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""Benchmarks of `sync_metadata`, `search`, `get_data`, `get_data_many`, the dataset mirror and sharded downloads against a local mock OGD API.
+
+Runs fully offline: a `MockOGDServer` is started in this process and every scenario runs in a fresh interpreter
+pointed at it with `DATAGOVINDIA_API_URL`, so peak RSS is measured per scenario. Results are written as JSON
+together with the commit and the configuration, and `--compare` prints the change against an earlier run.
+
+    $ python benchmarks/run.py                                  # all scenarios, 500k-resource catalog
+    $ python benchmarks/run.py --scenarios get_data --latency 0.05 --throttle-rate 0.02
+    $ python benchmarks/run.py --output after.json --compare before.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), "src")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from mock_server import MockOGDServer, WORDS, ORG_TYPES, SECTORS  # noqa: E402
+
+SCENARIOS = ["sync", "search", "get_data", "get_data_many", "mirror", "sharded"]
+
+# Metrics where higher is better, every other metric is better when lower
+HIGHER_IS_BETTER = {"records_per_sec"}
+
+def percentile(values: list, q: float) -> float:
+    """q-th quantile (0-1) of values, nearest rank."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q * (len(values) - 1))))]
+
+def latency_summary(seconds: list) -> dict:
+    return {
+        "requests": len(seconds),
+        "p50_ms": round(percentile(seconds, 0.5) * 1000, 2) if seconds else None,
+        "p99_ms": round(percentile(seconds, 0.99) * 1000, 2) if seconds else None,
+    }
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB, None where the resource module is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+################## scenarios, run in a fresh interpreter ##################
+
+def timed_session():
+    """`requests.Session` recording the latency of every request it sends in `.latencies`."""
+    import requests
+
+    class TimedSession(requests.Session):
+        def __init__(self):
+            super().__init__()
+            self.latencies = []
+
+        def get(self, url, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().get(url, **kwargs)
+            finally:
+                self.latencies.append(time.perf_counter() - start)
+
+    return TimedSession()
+
+def client(config: dict):
+    from datagovindia import DataGovIndia
+
+    session = timed_session()
+    return DataGovIndia(api_key="bench", db_path=config["db_path"], session=session), session
+
+def run_sync(config: dict) -> dict:
+    datagovin, session = client(config)
+    start = time.perf_counter()
+    datagovin.sync_metadata(batch_size=config["sync_batch_size"], njobs=config["njobs"])
+    seconds = time.perf_counter() - start
+    num_records = datagovin.get_update_info().get("number_of_resources", 0)
+    return {
+        "records": num_records,
+        "seconds": round(seconds, 3),
+        "records_per_sec": round(num_records / seconds, 1),
+        **latency_summary(session.latencies),
+    }
+
+def run_search(config: dict) -> dict:
+    datagovin, _ = client(config)
+    if not os.path.exists(config["db_path"]):
+        datagovin.sync_metadata(batch_size=config["sync_batch_size"], njobs=config["njobs"])
+    queries = [{"query": WORDS[i]} for i in range(0, len(WORDS), 3)]
+    queries += [{"query": f"{WORDS[i]} {WORDS[i + 1]}"} for i in range(0, len(WORDS) - 1, 6)]
+    queries += [{"query": "", "org_type": t} for t in ORG_TYPES]
+    queries += [{"query": WORDS[i], "sectors": [SECTORS[i % len(SECTORS)]]} for i in range(0, len(WORDS), 6)]
+    latencies, num_results = [], 0
+    start = time.perf_counter()
+    datagovin.search(**queries[0])  # Opens the database and builds missing indexes
+    cold = time.perf_counter() - start
+    for _ in range(config["search_repeat"]):
+        for query in queries:
+            start = time.perf_counter()
+            num_results += len(datagovin.search(**query))
+            latencies.append(time.perf_counter() - start)
+    return {
+        "queries": len(latencies),
+        "results": num_results,
+        "cold_ms": round(cold * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+def run_get_data(config: dict) -> dict:
+    datagovin, session = client(config)
+    start = time.perf_counter()
+    data = datagovin.get_data("bench-resource", batch_size=config["batch_size"], njobs=config["njobs"], typed=config["typed"])
+    seconds = time.perf_counter() - start
+    return {
+        "records": len(data),
+        "seconds": round(seconds, 3),
+        "records_per_sec": round(len(data) / seconds, 1),
+        **latency_summary(session.latencies),
+    }
+
+def run_get_data_many(config: dict) -> dict:
+    datagovin, session = client(config)
+    resource_ids = [f"bench-resource-{i}" for i in range(config["num_resources"])]
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as output_dir:
+        results = datagovin.get_data_many(
+            resource_ids, output_dir=output_dir, batch_size=config["batch_size"], njobs=config["njobs"], typed=config["typed"]
+        )
+    seconds = time.perf_counter() - start
+    num_records = sum(n or 0 for n in results.values())
+    return {
+        "records": num_records,
+        "seconds": round(seconds, 3),
+        "records_per_sec": round(num_records / seconds, 1),
+        **latency_summary(session.latencies),
+    }
+
+def run_mirror(config: dict) -> dict:
+    """`get_data(use_mirror=True)`: a cold download into an empty mirror, then reads of the unchanged resource."""
+    datagovin, session = client(config)
+    with tempfile.TemporaryDirectory() as mirror_dir:
+        start = time.perf_counter()
+        data = datagovin.get_data("bench-resource", batch_size=config["batch_size"], njobs=config["njobs"], use_mirror=True, mirror_dir=mirror_dir)
+        cold = time.perf_counter() - start
+        warm = []
+        for _ in range(3):
+            start = time.perf_counter()
+            datagovin.get_data("bench-resource", use_mirror=True, mirror_dir=mirror_dir)
+            warm.append(time.perf_counter() - start)
+    return {
+        "records": len(data),
+        "cold_seconds": round(cold, 3),
+        "records_per_sec": round(len(data) / cold, 1),
+        "warm_ms": round(percentile(warm, 0.5) * 1000, 2),
+    }
+
+def run_sharded(config: dict) -> dict:
+    """`get_data` as a sharded job fetched by `shard_workers` local worker processes, then merged."""
+    datagovin, _ = client(config)
+    with tempfile.TemporaryDirectory() as shard_dir:
+        start = time.perf_counter()
+        job_id = datagovin.plan_data_shards("bench-resource", batch_size=config["batch_size"], shard_dir=shard_dir)
+        command = [
+            sys.executable, "-m", "datagovindia.cli", "shard-worker", "--api-key", "bench", "--db-path", config["db_path"], "--no-cache",
+            "--job-id", job_id, "--shard-dir", shard_dir,
+        ]
+        if config["njobs"]:
+            command += ["--njobs", str(config["njobs"])]
+        workers = [subprocess.Popen(command, stdout=subprocess.DEVNULL) for _ in range(config["shard_workers"])]
+        if any(worker.wait() != 0 for worker in workers):
+            raise RuntimeError("A shard worker failed")
+        fetched = time.perf_counter() - start
+        data = datagovin.merge_shards(job_id, typed=config["typed"], shard_dir=shard_dir)
+        seconds = time.perf_counter() - start
+    return {
+        "records": len(data),
+        "seconds": round(seconds, 3),
+        "records_per_sec": round(len(data) / seconds, 1),
+        "merge_seconds": round(seconds - fetched, 3),
+    }
+
+def run_worker(scenario: str, config: dict):
+    """Run one scenario and print its metrics as the last line of stdout."""
+    result = globals()[f"run_{scenario}"](config)
+    result["peak_rss_mb"] = peak_rss_mb()
+    sys.stdout.write("\n" + json.dumps(result) + "\n")
+
+################## driver ##################
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_scenario(scenario: str, config: dict, server_url: str) -> dict:
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")])),
+        "DATAGOVINDIA_API_URL": server_url,
+    }
+    for key in ("DATAGOVINDIA_RATE", "DATAGOVINDIA_CACHE", "DATAGOVINDIA_ENGINE"):
+        env.pop(key, None)  # Results must not depend on the environment of the machine
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", scenario, "--config", json.dumps(config)],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Scenario {scenario} failed:\n{process.stderr[-4000:]}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def compare(results: dict, baseline: dict):
+    """Print every metric next to its baseline value, with the relative change."""
+    if baseline.get("config") != results["config"]:
+        print("Warning: the baseline was run with a different configuration, results are not comparable.")
+    print(f"\nChange against {baseline.get('commit')}:")
+    for scenario, metrics in results["scenarios"].items():
+        for metric, value in metrics.items():
+            before = baseline.get("scenarios", {}).get(scenario, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before:
+                continue
+            change = (value - before) / before * 100
+            better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+            print(f"  {scenario:<14} {metric:<16} {before:>12} -> {value:<12} {change:+7.1f}% {'better' if better else ''}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks of datagovindia against a mock OGD API.")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--config", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated scenarios among {SCENARIOS}.")
+    parser.add_argument("--catalog-size", type=int, default=500_000, help="Resources listed by the mock /lists endpoint.")
+    parser.add_argument("--resource-size", type=int, default=200_000, help="Records of every mock resource.")
+    parser.add_argument("--num-fields", type=int, default=5, help="Extra numeric columns of every mock resource.")
+    parser.add_argument("--num-resources", type=int, default=8, help="Resources downloaded by get_data_many.")
+    parser.add_argument("--max-page-size", type=int, default=10_000, help="Largest page served by the mock API.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Random seconds added on top of --latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 502 response.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of a 429 response.")
+    parser.add_argument("--max-rps", type=float, default=None, help="Requests per second above which the mock API responds 429.")
+    parser.add_argument("--batch-size", type=int, default=2000, help="batch_size of get_data and get_data_many.")
+    parser.add_argument("--sync-batch-size", type=int, default=1000, help="batch_size of sync_metadata.")
+    parser.add_argument("--njobs", type=int, default=None, help="njobs of every scenario.")
+    parser.add_argument("--shard-workers", type=int, default=4, help="Worker processes of the sharded scenario.")
+    parser.add_argument("--typed", action="store_true", help="Download typed DataFrames.")
+    parser.add_argument("--search-repeat", type=int, default=5, help="Runs of the set of search queries.")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run to compare with.")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, json.loads(args.config))
+        return 0
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Invalid scenarios {unknown}, valid scenarios are {SCENARIOS}")
+    server_options = [
+        "catalog_size", "resource_size", "num_fields", "max_page_size", "latency", "jitter", "error_rate",
+        "throttle_rate", "max_rps",
+    ]
+    client_options = ["batch_size", "sync_batch_size", "njobs", "typed", "search_repeat", "num_resources", "shard_workers"]
+    config = {key: getattr(args, key) for key in server_options + client_options}
+
+    results = {"commit": git_commit(), "python": sys.version.split()[0], "config": config, "scenarios": {}}
+    with tempfile.TemporaryDirectory() as tmp_dir, MockOGDServer(**{k: config[k] for k in server_options}) as server:
+        worker_config = {**config, "db_path": os.path.join(tmp_dir, "datagovindia.db")}
+        for scenario in scenarios:
+            result = results["scenarios"][scenario] = run_scenario(scenario, worker_config, server.url)
+            print(f"{scenario:<14} " + "  ".join(f"{k}={v}" for k, v in result.items()), flush=True)
+        results["server"] = dict(server.stats)
+    print(f"mock server: {results['server']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,533 @@
+"""Asyncio client for the OGD platform, see `AsyncDataGovIndia`. Requires httpx, `pip install datagovindia[async]`.
+
+Requests are sent from the event loop through a single `httpx.AsyncClient`, whose keep-alive connection pool is shared
+by every call of a client object. Pages are fetched by at most `njobs` concurrent tasks instead of a thread or process
+pool, so nothing is forked. Cancelling a call, or closing an iterator of `iter_data` early, cancels the page fetches
+still in flight. The metadata database is read and written on a worker thread, SQLite never blocks the event loop.
+"""
+
+from __future__ import annotations
+
+import time
+import asyncio
+import functools
+from itertools import islice
+from typing import List, Dict, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, RetryError
+from datagovindia.core import (
+    DataGovIndia,
+    MetadataSync,
+    DEFAULT_HEADERS,
+    DEFAULT_THREAD_NJOBS,
+    REQUEST_EXCEPTIONS,
+    build_url,
+    construct_url_for_lists,
+    metadata_url,
+    total_resources_url,
+    compile_page,
+    updated_since,
+    decode_json,
+    parse_api_info,
+    observe_response,
+    records_to_columns,
+    concat_columns,
+    merge_branches,
+    split_chunks,
+    build_frame,
+    _count_retry,
+    logger,
+)
+from datagovindia.ratelimit import RateLimiter, resolve_rate
+from datagovindia.metrics import METRICS, endpoint_of
+
+try:
+    import httpx
+    from datagovindia.ratelimit import AsyncRateLimitedTransport
+except ImportError:
+    httpx = None
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+def import_httpx():
+    if httpx is None:
+        raise ImportError("AsyncDataGovIndia requires httpx. Install it with `pip install datagovindia[async]`.")
+    return httpx
+
+def create_async_client(pool_maxsize: int = DEFAULT_THREAD_NJOBS, http2: bool = False, limiter: RateLimiter = None):
+    """Create an `httpx.AsyncClient` with a keep-alive connection pool of `pool_maxsize` connections and gzip/deflate
+    compression, sending every request through `limiter` if given. See `create_session`."""
+    import_httpx()
+    limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+    transport = AsyncRateLimitedTransport(limiter=limiter, http2=http2, limits=limits)
+    return httpx.AsyncClient(limits=limits, headers=DEFAULT_HEADERS, transport=transport)
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=5, max=60),
+    retry=retry_if_exception_type(REQUEST_EXCEPTIONS),
+    before_sleep=_count_retry,
+)
+async def make_async_request_with_retry(url: str, client, **kwargs):
+    """`make_request_with_retry` for an `httpx.AsyncClient`. Requests wait for a free connection of the pool
+    without a timeout, concurrency is bounded by the callers."""
+    connect_timeout, read_timeout = kwargs.get("timeout", 10), kwargs.get("timeout", 30)
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=None)
+    endpoint = endpoint_of(url)
+    start = time.perf_counter()
+    try:
+        response = await client.get(url, timeout=timeout)
+    except REQUEST_EXCEPTIONS:
+        METRICS.inc("requests_total", endpoint=endpoint, status="error")
+        raise
+    observe_response(endpoint, start, response)
+    response.raise_for_status()
+    return response
+
+async def get_async_page(url: str, client) -> dict:
+    """`get_api_page` for an `httpx.AsyncClient`."""
+    data = decode_json(await make_async_request_with_retry(url, client))
+    data.setdefault("records", [])
+    return data
+
+async def get_async_records(url: str, client) -> list:
+    """`get_api_records` for an `httpx.AsyncClient`."""
+    data = decode_json(await make_async_request_with_retry(url, client))
+    return data.get("records", [])
+
+async def get_async_columns(url: str, client) -> dict:
+    """`get_api_columns` for an `httpx.AsyncClient`."""
+    return records_to_columns(await get_async_records(url, client))
+
+async def iter_async(func, args_list, njobs: int = None, max_in_flight: int = None, ordered: bool = True):
+    """Await `func(*args)` for every args in `args_list` as concurrent tasks and yield the results, like `iter_parallel`.
+
+        njobs: (int) - Maximum number of calls running at once. Defaults to `DEFAULT_THREAD_NJOBS`.
+
+        max_in_flight: (int) - Maximum number of calls started but not yet yielded. Defaults to 2 * njobs.
+
+        ordered: (bool) - Yield results in the order of `args_list` (default). If False, yield `(index, result)` pairs
+        in completion order.
+
+    `args_list` is consumed lazily. The first error is raised as soon as its result is due. Pending calls are cancelled,
+    and awaited, when the consumer stops iterating (`aclose`), is cancelled or an error is raised.
+    """
+    njobs = max(1, njobs or DEFAULT_THREAD_NJOBS)
+    max_in_flight = max(1, max_in_flight or 2 * njobs)
+    semaphore = asyncio.Semaphore(njobs)
+
+    async def call(args):
+        async with semaphore:
+            return await func(*args)
+
+    args_iter = enumerate(args_list)
+    pending = {}  # Index -> task of started calls not yet yielded, in submission order
+
+    def submit_next(n):
+        for index, args in islice(args_iter, n):
+            pending[index] = asyncio.ensure_future(call(args))
+
+    submit_next(max_in_flight)
+    try:
+        while pending:
+            if ordered:
+                index = next(iter(pending))
+                await asyncio.wait([pending[index]])
+            else:
+                done, _ = await asyncio.wait(pending.values(), return_when=asyncio.FIRST_COMPLETED)
+                index = next(i for i, task in pending.items() if task in done)
+            result = pending.pop(index).result()
+            submit_next(1)
+            yield result if ordered else (index, result)
+    finally:
+        for task in pending.values():
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending.values(), return_exceptions=True)
+
+async def filter_async_pages(pages, predicates: list, offset: int = 0, limit: int = None):
+    """`datagovindia.query.filter_pages` for an async iterator of pages. Stopping early closes `pages`,
+    which cancels the pages still in flight."""
+    from datagovindia.query import PageWindow
+
+    window = PageWindow(predicates, offset, limit)
+    try:
+        async for page in pages:
+            page = window(page)
+            if page:
+                yield page
+            if window.done:
+                return
+    finally:
+        await pages.aclose()
+
+class AsyncDataGovIndia:
+    """Asyncio counterpart of `DataGovIndia`, see the module docstring. Methods sending requests are coroutines.
+
+        api_key: (str) - API key for data.gov.in, see `DataGovIndia`.
+
+        db_path: (str) - Path to the metadata database, see `DataGovIndia`.
+
+        client: (httpx.AsyncClient) - Client used for all requests of this object. If not provided, one is created
+        with a pool of `max_connections` keep-alive connections (see `create_async_client`) and closed by `aclose`.
+
+        http2: (bool) - Use HTTP/2 for the client created by this object. Requires `pip install httpx[http2]`.
+
+        max_connections: (int) - Size of the connection pool of the client created by this object. Defaults to `DEFAULT_THREAD_NJOBS`.
+
+        rate: (float) - Maximum number of requests per second, see `DataGovIndia`. Only used when `client` is not provided.
+
+        limiter: (RateLimiter) - Rate limiter to use for all requests of this object, see `DataGovIndia`.
+        Only used when `client` is not provided.
+
+    Use it as an async context manager, or await `aclose()`, to close the connections once done:
+
+        async with AsyncDataGovIndia() as datagovin:
+            data = await datagovin.get_data("5c2f62fe-5afa-4119-a499-fec9d604d5bd")
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        db_path: str = None,
+        client=None,
+        http2: bool = False,
+        max_connections: int = DEFAULT_THREAD_NJOBS,
+        rate: float = None,
+        limiter: RateLimiter = None,
+    ):
+        import_httpx()
+        self.limiter = limiter or RateLimiter(rate=resolve_rate(rate))
+        # Searches and writes of the metadata database, and the helpers planning pages, are shared with `DataGovIndia`.
+        # It never sends a request, so it never creates its HTTP session.
+        self.local = DataGovIndia(api_key=api_key, db_path=db_path, limiter=self.limiter, cache=False)
+        self.api_key = self.local.api_key
+        self.db_path = self.local.db_path
+        self._owns_client = client is None
+        self.client = client or create_async_client(max_connections, http2=http2, limiter=self.limiter)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the connections of the client created by this object, a client passed in is left open."""
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def _run_in_thread(self, func, *args, executor=None, **kwargs):
+        """Run a blocking call, e.g. on the metadata database, in `executor` (defaults to the loop's default executor)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+    async def validate_api_key(self):
+        """Raise a ValueError if the API key is missing or invalid, see `DataGovIndia.validate_api_key`."""
+        if not self.api_key:
+            raise ValueError(
+                "API key not found. Please set it as an environment variable `DATAGOVINDIA_API_KEY` or pass it as an argument while initializing the AsyncDataGovIndia object."
+            )
+        # Get 1 record of the catalog and fetch its resource with the key, like `check_api_key`
+        params = {"api-key": self.api_key, "format": "json", "offset": 0, "limit": 1}
+        response = await self.client.get(construct_url_for_lists(params))
+        resource_id = (decode_json(response).get("records") or [{}])[0].get("index_name")
+        if resource_id:
+            try:
+                response = await self.client.get(build_url(api_key=self.api_key, resource_id=resource_id, limit=1))
+                response.raise_for_status()
+                return
+            except REQUEST_EXCEPTIONS:
+                pass
+        raise ValueError("Invalid API key. Please check if the API key is valid.")
+
+    async def search(self, query: str = None, **kwargs) -> pd.DataFrame:
+        """Search for a query in the metadata database, run on a worker thread.
+        Takes the same arguments as `DataGovIndia.search`."""
+        return await self._run_in_thread(self.local.search, query, **kwargs)
+
+    async def get_update_info(self) -> dict:
+        """Fetches information about the last update of the database, see `DataGovIndia.get_update_info`."""
+        return await self._run_in_thread(self.local.get_update_info)
+
+    async def get_resource_info(self, resource_id: str, filters: Dict[str, str] = None) -> dict:
+        """Fetches information about a resource, see `DataGovIndia.get_resource_info`. Returns {} if the request fails."""
+        url = build_url(api_key=self.api_key, resource_id=resource_id, filters=filters or {}, offset=0, limit=0)
+        try:
+            return parse_api_info(decode_json(await make_async_request_with_retry(url, self.client)))
+        except RetryError as e:
+            logger.error(f"Failed to fetch data: {e}")
+            return {}
+
+    async def get_data(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        njobs: int = None,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        typed: bool = False,
+        dtype_backend: str = "numpy",
+        where=None,
+    ) -> pd.DataFrame:
+        """Returns requested data as a pandas dataframe. Takes the same arguments as `DataGovIndia.get_data`, with:
+
+            njobs: (int) - Number of pages fetched concurrently. Defaults to `DEFAULT_THREAD_NJOBS`.
+
+        Checkpoints, mirrors and engines are not available, use `DataGovIndia` in a worker thread for these.
+
+        Returns: pd.DataFrame
+        """
+        pages, info = await self._open_pages(
+            resource_id,
+            sort_by=sort_by,
+            ascending=ascending,
+            offset=offset,
+            batch_size=batch_size,
+            njobs=njobs,
+            limit=limit,
+            filters=filters,
+            fields=fields,
+            where=where,
+            columnar=True,
+        )
+        columns = concat_columns([page async for page in pages])
+        field_info = await self._field_info(resource_id, info) if typed else None
+        return build_frame(columns, field_info, typed, dtype_backend)
+
+    async def iter_data(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        njobs: int = None,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        chunksize: int = None,
+        as_frame: bool = True,
+        typed: bool = False,
+        dtype_backend: str = "numpy",
+        where=None,
+    ):
+        """Async iterator of the requested data in chunks as pages arrive, in the order of the records.
+            Takes the same arguments as `get_data`, and `chunksize` and `as_frame` as `DataGovIndia.iter_data`.
+
+            At most 2 * njobs pages are fetched ahead of the consumer. Breaking out of the loop and closing the
+            iterator (`await chunks.aclose()`), or cancelling the consuming task, cancels the pages in flight.
+
+                async for chunk in datagovin.iter_data(resource_id, chunksize=10000):
+                    ...
+
+        Returns: AsyncIterator[pd.DataFrame]
+        """
+        pages, info = await self._open_pages(
+            resource_id,
+            sort_by=sort_by,
+            ascending=ascending,
+            offset=offset,
+            batch_size=batch_size,
+            njobs=njobs,
+            limit=limit,
+            filters=filters,
+            fields=fields,
+            where=where,
+        )
+        try:
+            field_info = await self._field_info(resource_id, info) if typed and as_frame else None
+            buffer = []
+            async for page in pages:
+                chunks, buffer = split_chunks(buffer, page, chunksize)
+                for chunk in chunks:
+                    yield build_frame(chunk, field_info, typed, dtype_backend) if as_frame else chunk
+            if buffer:
+                yield build_frame(buffer, field_info, typed, dtype_backend) if as_frame else buffer
+        finally:
+            await pages.aclose()
+
+    async def _field_info(self, resource_id: str, info: dict) -> list:
+        """Field metadata of a resource, see `DataGovIndia._field_info`."""
+        return info.get("field") or (await self.get_resource_info(resource_id)).get("field")
+
+    async def _open_pages(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        njobs: int = None,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        where=None,
+        columnar: bool = False,
+    ) -> tuple:
+        """Fetch the first page of every request and plan the remaining pages, see `DataGovIndia._open_pages`.
+
+        Returns: (async iterator of the records of each page in order, metadata of the first response)
+        """
+        from datagovindia.query import plan_request
+
+        # offset and limit are sent to the API unless records are filtered or merged locally
+        _, branches, residual, local_window = plan_request(where, filters)
+        njobs = max(1, njobs or DEFAULT_THREAD_NJOBS)
+        self.limiter.set_max_concurrency(njobs)
+
+        branch_args = self.local._branch_args(
+            resource_id, branches, sort_by, ascending, offset, batch_size, limit, fields, local_window
+        )
+        param_list, prefetched, info = merge_branches(
+            [opened async for opened in iter_async(self._open_request, branch_args, njobs=njobs)]
+        )
+
+        # Pages filtered locally are transposed once filtered
+        pages = self._iter_pages(param_list, njobs=njobs, prefetched=prefetched, columnar=columnar and not local_window)
+        if local_window:
+            pages = filter_async_pages(pages, residual, offset=offset, limit=limit)
+            if columnar:
+                pages = _map_pages(records_to_columns, pages)
+        return pages, info
+
+    async def _open_request(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+    ) -> tuple:
+        """Fetch the first page of a request and plan the remaining pages, see `DataGovIndia._open_request`.
+
+        Returns: (parameters of every page, records of the first page, metadata of the response)
+        """
+        first = self.local._first_page_params(resource_id, sort_by, ascending, offset, batch_size, limit, filters, fields)
+        if first is None:
+            return [], [], {}
+        started = time.monotonic()
+        meta = await get_async_page(build_url(api_key=self.api_key, **first), self.client)
+        seconds = time.monotonic() - started
+        records = meta.pop("records")
+        total = meta.get("total")
+        if total is None:
+            total = (await self.get_resource_info(resource_id, filters=filters)).get("total") or 0
+        rest = self.local._plan_after_first(first, batch_size, limit, len(records), total, seconds)
+        return [first, *rest], records, meta
+
+    async def _iter_pages(self, param_list: list, njobs: int = None, prefetched: dict = None, columnar: bool = False):
+        """Fetch the pages in `param_list` concurrently and yield the records of each page in order, as columns if `columnar`.
+        `prefetched` maps the index of pages already fetched to their records, they are not fetched again."""
+        prefetched = dict(prefetched or {})
+        missing = [params for i, params in enumerate(param_list) if i not in prefetched]
+        fetched = iter_async(
+            get_async_columns if columnar else get_async_records,
+            [(build_url(api_key=self.api_key, **params), self.client) for params in missing],
+            njobs=njobs,
+        )
+        try:
+            for i in range(len(param_list)):
+                if i not in prefetched:
+                    yield await fetched.__anext__()
+                else:
+                    records = prefetched.pop(i)
+                    yield records_to_columns(records) if columnar else records
+        finally:
+            await fetched.aclose()
+
+    async def _fetch_metadata(self, start: int = 0, end: int = 1000, active: int = 1, executor=None) -> list:
+        """Fetch and compile the resources from `start` to `end` of the catalog, see `_fetch_metadata`.
+        Records are compiled in `executor`, parsing their dates would otherwise stall the event loop. A single thread
+        compiling every page keeps the event loop from waiting behind several threads for the GIL."""
+        try:
+            records = (await get_async_page(metadata_url(self.api_key, start, end, active), self.client))["records"]
+        except (RetryError, *REQUEST_EXCEPTIONS) as e:
+            METRICS.inc("page_failures_total", endpoint="lists")
+            logger.error(f"Request failed for range ({start}-{end}): {e}")
+            raise
+        return await self._run_in_thread(compile_page, records, executor=executor)
+
+    async def _sync_deactivated(self, watermark: str, batch_size: int, njobs: int, db) -> int:
+        """Remove resources deactivated on the OGD platform since `watermark`, see `DataGovIndia._sync_deactivated`."""
+        _batch = njobs * batch_size
+        _num_removed = 0
+        start = 0
+        while True:
+            records = []
+            pages = iter_async(
+                self._fetch_metadata,
+                [(i, i + batch_size, 0, db) for i in range(start, start + _batch, batch_size)],
+                njobs=njobs,
+            )
+            async for page in pages:
+                records.extend(page)
+            recent = updated_since(records, watermark)
+            _num_removed += await self._run_in_thread(
+                self.local._remove_resources, [r["resource_id"] for r in recent], executor=db
+            )
+            if len(recent) < _batch:
+                return _num_removed
+            start += _batch
+
+    async def sync_metadata(self, batch_size: int = 1000, njobs: int = None, incremental: bool = False, bulk: bool = True):
+        """Updates metadata in the sqlite database, see `DataGovIndia.sync_metadata` for the arguments.
+
+        Pages are fetched by up to `njobs` concurrent tasks and stored in completion order by a single worker thread,
+        which owns every connection to the database. Checkpoints are not available. Cancelling the sync cancels the pages
+        in flight: a full bulk sync leaves `resources` as it was, other syncs keep the pages stored so far.
+        """
+        start_time = time.time()
+        local = self.local
+        njobs = max(1, njobs or DEFAULT_THREAD_NJOBS)
+        self.limiter.set_max_concurrency(njobs)
+        # Compiles and stores pages, SQLite connections are used by the thread that created them
+        db = ThreadPoolExecutor(max_workers=1)
+        run = functools.partial(self._run_in_thread, executor=db)
+        sync = None
+        try:
+            await run(local.ensure_schema)
+            _num_available = (await get_async_page(total_resources_url(), self.client))["total"]
+            watermark = await run(local._get_watermark) if incremental else None
+            sync = await run(MetadataSync, local, _num_available, watermark, bulk=bulk, start_time=start_time)
+            pages = sync.plan_pages(batch_size)
+
+            def page_args():
+                # Pages are listed newest first, pages after one reaching the watermark are not needed
+                for start, end in pages:
+                    if sync.reached_watermark:
+                        return
+                    yield (start, end, 1, db)
+
+            fetched = iter_async(self._fetch_metadata, page_args(), njobs=njobs, ordered=False)
+            try:
+                async for index, records in fetched:
+                    await run(sync.store, *pages[index], records)
+            finally:
+                await fetched.aclose()  # Also when cancelled while storing a page
+            await run(sync.end_listing)
+
+            _num_removed = None
+            if watermark:
+                _num_removed = await self._sync_deactivated(watermark, batch_size, njobs, db)
+            await run(sync.finish, _num_removed)
+        finally:
+            if sync is not None:
+                db.submit(sync.close)  # After the statement running on the thread, if cancelled
+            db.shutdown(wait=False)
+
+async def _map_pages(func, pages):
+    """Apply `func` to every page of an async iterator, closing it when closed."""
+    try:
+        async for page in pages:
+            yield func(page)
+    finally:
+        await pages.aclose()
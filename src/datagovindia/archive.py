@@ -0,0 +1,211 @@
+"""Compact lookup index of the archived resource maps of `datagovindia<=1.0.0` (data/*.gz).
+
+The archive maps every resource to its organisation type and source as large gzipped JSON files.
+`build_archive_index` converts them once into a small SQLite file, with 16-byte resource ids and integer codes,
+that `ArchiveIndex` opens read-only and memory-mapped for O(log n) lookups without decompressing anything.
+
+The archive is a snapshot of the catalog as of datagovindia 1.0.0, `DataGovIndia.search` answers from the synced
+metadata database instead. The archived files are not part of the installed package: they are found in the
+`data/` directory of a source checkout, or in the directory named by the DATAGOVINDIA_ARCHIVE_DIR environment variable.
+"""
+
+import os
+import gzip
+import json
+import sqlite3
+
+# Archived maps of resource ids by attribute: attribute -> file name
+ARCHIVE_MAPS = {
+    "org_type": "orgtypeidx_map.gz",
+    "source": "sourceidx_map.gz",
+}
+
+ARCHIVE_ATTRIBUTES = "attributes.gz"
+
+# Archived metadata field maps: column of the `fields` table -> file name
+ARCHIVE_FIELD_MAPS = {
+    "dtype": "fielddtype_map.gz",
+    "label": "fieldlabel_map.gz",
+}
+
+# Bytes of the index file mapped into memory by `ArchiveIndex`
+ARCHIVE_MMAP_SIZE = 64 * 1024 * 1024
+
+def default_archive_index_path() -> str:
+    """Path of the archive index, defaults to ~/.datagovindia/archive.db"""
+    return os.path.join(os.path.expanduser("~"), ".datagovindia", "archive.db")
+
+def default_archive_dir() -> str:
+    """Directory holding the archived maps: the environment variable DATAGOVINDIA_ARCHIVE_DIR, or the `data/`
+    directory of a source checkout. None if neither holds them."""
+    candidates = [
+        os.environ.get("DATAGOVINDIA_ARCHIVE_DIR"),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "data"),
+    ]
+    for directory in filter(None, candidates):
+        if all(os.path.exists(os.path.join(directory, filename)) for filename in ARCHIVE_MAPS.values()):
+            return os.path.normpath(directory)
+    return None
+
+def resource_id_to_bytes(resource_id: str) -> bytes:
+    """Pack a resource id, with or without dashes, into 16 bytes."""
+    return bytes.fromhex(resource_id.replace("-", ""))
+
+def resource_id_from_bytes(packed: bytes) -> str:
+    """Unpack a resource id into the dashed form used by the OGD platform."""
+    h = packed.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+def _load_map(path: str) -> dict:
+    """Load an archived map as {value: [resource ids]}, maps are stored either as a dict or as a list of dicts."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {key: ids for item in data for key, ids in item.items()}
+    return data
+
+def build_archive_index(data_dir: str = None, path: str = None) -> str:
+    """Build the archive index from the archived maps in `data_dir`, returns the path of the index.
+
+        data_dir: (str) - Directory holding orgtypeidx_map.gz, sourceidx_map.gz, attributes.gz, fielddtype_map.gz
+        and fieldlabel_map.gz. Defaults to `default_archive_dir()`.
+        path: (str) - Path of the index. Defaults to ~/.datagovindia/archive.db
+
+    The index is written to a temporary file and moved into place, readers never see a partial index.
+    """
+    data_dir = data_dir or default_archive_dir()
+    if data_dir is None:
+        raise ValueError(
+            "Could not find the archived maps (data/*.gz), they are not part of the installed package. "
+            "Pass the `data` directory of a checkout of https://github.com/addypy/datagovindia "
+            "or set the environment variable DATAGOVINDIA_ARCHIVE_DIR."
+        )
+    path = path or default_archive_index_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        with conn:
+            rows = {}  # packed resource id -> [org_type code, source code]
+            for position, (attribute, filename) in enumerate(ARCHIVE_MAPS.items()):
+                conn.execute(f"CREATE TABLE {attribute}s(id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+                mapping = _load_map(os.path.join(data_dir, filename))
+                for code, (name, resource_ids) in enumerate(sorted(mapping.items())):
+                    conn.execute(f"INSERT INTO {attribute}s VALUES (?, ?)", (code, name))
+                    for resource_id in resource_ids:
+                        rows.setdefault(resource_id_to_bytes(resource_id), [None] * len(ARCHIVE_MAPS))[position] = code
+            columns = ", ".join(f"{attribute} INTEGER" for attribute in ARCHIVE_MAPS)
+            conn.execute(f"CREATE TABLE resources(resource_id BLOB PRIMARY KEY, {columns}) WITHOUT ROWID")
+            placeholders = ", ".join(["?"] * (len(ARCHIVE_MAPS) + 1))
+            conn.executemany(
+                f"INSERT INTO resources VALUES ({placeholders})",
+                ((packed, *values) for packed, values in sorted(rows.items())),
+            )
+            for attribute in ARCHIVE_MAPS:
+                conn.execute(f"CREATE INDEX resources_{attribute} ON resources({attribute})")
+
+            conn.execute("CREATE TABLE attributes(name TEXT, value TEXT, PRIMARY KEY (name, value)) WITHOUT ROWID")
+            attributes_path = os.path.join(data_dir, ARCHIVE_ATTRIBUTES)
+            if os.path.exists(attributes_path):
+                with gzip.open(attributes_path, "rt", encoding="utf-8") as f:
+                    attributes = json.load(f)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO attributes VALUES (?, ?)",
+                    [(name, value) for name, values in attributes.items() for value in values],
+                )
+
+            # Types and labels of the metadata fields, {field: value} maps
+            conn.execute("CREATE TABLE fields(name TEXT PRIMARY KEY, dtype TEXT, label TEXT) WITHOUT ROWID")
+            fields = {}
+            for column, filename in ARCHIVE_FIELD_MAPS.items():
+                field_path = os.path.join(data_dir, filename)
+                if os.path.exists(field_path):
+                    for name, value in _load_map(field_path).items():
+                        fields.setdefault(name, {})[column] = value
+            conn.executemany(
+                "INSERT INTO fields VALUES (?, ?, ?)",
+                [(name, values.get("dtype"), values.get("label")) for name, values in sorted(fields.items())],
+            )
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+class ArchiveIndex:
+    """Read-only, memory-mapped lookups in an index built by `build_archive_index`.
+
+        path: (str) - Path of the index. Defaults to ~/.datagovindia/archive.db
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or default_archive_index_path()
+        if not os.path.exists(self.path):
+            raise ValueError(
+                f"Could not find the archive index {self.path}, build it with `build_archive_index(data_dir)` "
+                "or `datagovindia build-archive-index <data_dir>`"
+            )
+        self.conn = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size = {ARCHIVE_MMAP_SIZE}")
+        self.names = {
+            attribute: dict(self.conn.execute(f"SELECT id, name FROM {attribute}s")) for attribute in ARCHIVE_MAPS
+        }
+
+    def lookup(self, resource_id: str) -> dict:
+        """Organisation type and source of a resource, None if it is not in the archive."""
+        try:
+            packed = resource_id_to_bytes(resource_id)
+        except ValueError:
+            return None
+        columns = ", ".join(ARCHIVE_MAPS)
+        row = self.conn.execute(f"SELECT {columns} FROM resources WHERE resource_id = ?", (packed,)).fetchone()
+        if row is None:
+            return None
+        return {attribute: self.names[attribute].get(code) for attribute, code in zip(ARCHIVE_MAPS, row)}
+
+    def _where(self, org_type: str = None, source: str = None) -> tuple:
+        """WHERE clause and parameters selecting resources by organisation type and/or source, None if nothing matches."""
+        conditions, params = [], []
+        for attribute, name in (("org_type", org_type), ("source", source)):
+            if name is None:
+                continue
+            code = next((c for c, n in self.names[attribute].items() if n == name), None)
+            if code is None:
+                return None
+            conditions.append(f"{attribute} = ?")
+            params.append(code)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def resource_ids(self, org_type: str = None, source: str = None) -> list:
+        """Resource ids with the given organisation type and/or source, in the dashed form used by the OGD platform."""
+        where = self._where(org_type=org_type, source=source)
+        if where is None:
+            return []
+        sql, params = where
+        return [resource_id_from_bytes(packed) for (packed,) in self.conn.execute(f"SELECT resource_id FROM resources{sql}", params)]
+
+    def count(self, org_type: str = None, source: str = None) -> int:
+        """Number of resources with the given organisation type and/or source."""
+        where = self._where(org_type=org_type, source=source)
+        if where is None:
+            return 0
+        sql, params = where
+        return self.conn.execute(f"SELECT COUNT(*) FROM resources{sql}", params).fetchone()[0]
+
+    def attribute_values(self, name: str) -> list:
+        """Values of an archived attribute, e.g. "org_types", "org_names", "sources" or "sectors"."""
+        return [value for (value,) in self.conn.execute("SELECT value FROM attributes WHERE name = ? ORDER BY value", (name,))]
+
+    def field_info(self) -> dict:
+        """Type and label of the archived metadata fields, as {field: {"dtype", "label"}}.
+        Empty for an index built before the field maps were indexed."""
+        try:
+            rows = self.conn.execute("SELECT name, dtype, label FROM fields ORDER BY name").fetchall()
+        except sqlite3.OperationalError:
+            return {}
+        return {name: {"dtype": dtype, "label": label} for name, dtype, label in rows}
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,205 @@
+"""On-disk HTTP response cache for requests to the OGD platform."""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+import requests
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from requests.structures import CaseInsensitiveDict
+from datagovindia.metrics import endpoint_of
+
+# Time-to-live of cached responses in seconds, per endpoint, see `endpoint_of`
+DEFAULT_CACHE_TTL = {
+    "lists": 6 * 3600,
+    "resource_info": 3600,
+    "resource": 24 * 3600,
+}
+
+DEFAULT_CACHE_MAX_SIZE = 512 * 1024 * 1024
+
+def default_cache_path() -> str:
+    """Path of the cache database, defaults to ~/.datagovindia/cache.db"""
+    return os.path.join(os.path.expanduser("~"), ".datagovindia", "cache.db")
+
+def canonical_cache_key(url: str) -> str:
+    """Canonical form of url used as cache key: api-key removed, query parameters sorted, scheme and host lowercased."""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "api-key")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query, safe="[],"), ""))
+
+class ResponseCache:
+    """SQLite store of successful GET responses.
+
+        path: (str) - Path of the cache database. Defaults to ~/.datagovindia/cache.db
+        ttl: (dict) - Time-to-live in seconds per endpoint, merged into `DEFAULT_CACHE_TTL`.
+        max_size: (int) - Maximum total size of cached bodies in bytes, least recently used responses are evicted beyond it.
+
+    Stale responses with an ETag or Last-Modified header are revalidated with a conditional request
+    instead of being downloaded again.
+    """
+
+    def __init__(self, path: str = None, ttl: dict = None, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        self.path = path or default_cache_path()
+        self.ttl = {**DEFAULT_CACHE_TTL, **(ttl or {})}
+        self.max_size = max_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._size = None  # Upper bound of the total size of cached bodies, see `evict`
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses(
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT,
+                    status INTEGER,
+                    headers TEXT,
+                    body BLOB,
+                    size INTEGER,
+                    stored_at REAL,
+                    accessed_at REAL
+                )
+            """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses(accessed_at)")
+
+    def connect(self) -> sqlite3.Connection:
+        """Connection of the current thread, connections are not shared across threads or processes."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str):
+        """Get a cached response as a dict, None if not cached."""
+        conn = self.connect()
+        row = conn.execute(
+            "SELECT endpoint, status, headers, body, stored_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        endpoint, status, headers, body, stored_at = row
+        return {"endpoint": endpoint, "status": status, "headers": json.loads(headers), "body": body, "stored_at": stored_at}
+
+    def is_fresh(self, entry: dict) -> bool:
+        """Check if a cached response is within the TTL of its endpoint."""
+        return time.time() - entry["stored_at"] < self.ttl.get(entry["endpoint"], 0)
+
+    def set(self, key: str, endpoint: str, response: requests.Response):
+        """Store a response and evict least recently used responses beyond `max_size`."""
+        body = response.content
+        # Bodies are stored decoded, drop headers describing the wire encoding
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+        now = time.time()
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, response.status_code, json.dumps(headers), body, len(body), now, now),
+            )
+        with self._lock:
+            if self._size is not None:
+                self._size += len(body)
+            full = self._size is None or self._size > self.max_size
+        if full:
+            self.evict()
+
+    def refresh(self, key: str):
+        """Mark a cached response as fresh after a successful revalidation."""
+        now = time.time()
+        conn = self.connect()
+        with conn:
+            conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def evict(self):
+        """Delete least recently used responses until the total size is below `max_size`.
+        `set` keeps a running upper bound of the total size, replaced responses and responses stored by other
+        processes are only counted exactly here, so the cache is only summed once it may have grown beyond `max_size`."""
+        conn = self.connect()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_size:
+            with conn:
+                for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+                    if total <= self.max_size:
+                        break
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    total -= size
+        with self._lock:
+            self._size = total
+
+    def clear(self):
+        """Delete all cached responses."""
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM responses")
+        with self._lock:
+            self._size = 0
+
+def build_cached_response(entry: dict, url: str) -> requests.Response:
+    """Build a `requests.Response` from a cached entry."""
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response._content = entry["body"]
+    response.url = url
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+class CachedSession(requests.Session):
+    """`requests.Session` serving GET requests from a `ResponseCache`.
+    Requests sent with `cache=False`, e.g. `session.get(url, cache=False)`, bypass the cache."""
+
+    def __init__(self, cache: ResponseCache):
+        super().__init__()
+        self.cache = cache
+
+    def request(self, method, url, *args, cache: bool = True, **kwargs):
+        if not cache or method.upper() != "GET" or kwargs.get("params"):
+            return super().request(method, url, *args, **kwargs)
+        key = canonical_cache_key(url)
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            return build_cached_response(entry, url)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            cached_headers = CaseInsensitiveDict(entry["headers"])
+            if cached_headers.get("ETag"):
+                headers["If-None-Match"] = cached_headers["ETag"]
+            if cached_headers.get("Last-Modified"):
+                headers["If-Modified-Since"] = cached_headers["Last-Modified"]
+        response = super().request(method, url, *args, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.refresh(key)
+            return build_cached_response(entry, url)
+        if response.status_code == 200:
+            self.cache.set(key, endpoint_of(url), response)
+        return response
+
+def resolve_cache(cache=None) -> ResponseCache:
+    """Resolve the response cache from the argument or the `DATAGOVINDIA_CACHE` environment variable.
+
+        cache: True for a cache at the default path, a path, a `ResponseCache`, or False to disable caching.
+        If None, DATAGOVINDIA_CACHE is read: "1"/"true" enables the default cache, any other value is used as a path.
+    """
+    if cache is None:
+        cache = os.environ.get("DATAGOVINDIA_CACHE", "")
+        if cache.lower() in ("", "0", "false", "no"):
+            cache = False
+        elif cache.lower() in ("1", "true", "yes"):
+            cache = True
+    if cache is False:
+        return None
+    if cache is True:
+        return ResponseCache()
+    if isinstance(cache, str):
+        return ResponseCache(cache)
+    return cache
@@ -0,0 +1,107 @@
+"""Checkpoint manifests and page spools for resumable downloads."""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+def default_checkpoint_root() -> str:
+    """Directory holding all checkpoints. Read from the environment variable DATAGOVINDIA_CHECKPOINT_DIR,
+    defaults to ~/.datagovindia/checkpoints"""
+    return os.environ.get(
+        "DATAGOVINDIA_CHECKPOINT_DIR", os.path.join(os.path.expanduser("~"), ".datagovindia", "checkpoints")
+    )
+
+def write_json_atomic(path: str, data):
+    """Write data as JSON to path, readers never see a partially written file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+class Checkpoint:
+    """Checkpoint of a paged download.
+
+    A checkpoint is a directory holding:
+        manifest.json : the parameters of the request and any state needed to resume it
+        pages.jsonl : one line per completed page, appended as pages complete
+        page_<offset>_<limit>.json : spooled records of each completed page
+
+    Pages are identified by their (offset, limit) window, all other request parameters
+    (resource_id, filters, fields, ...) are part of the checkpoint key.
+    """
+
+    def __init__(self, directory: str, params: dict):
+        self.directory = directory
+        self.params = params
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.log_path = os.path.join(directory, "pages.jsonl")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.state = json.load(f).get("state", {})
+        else:
+            self.state = {}
+            self.save_manifest()
+        self.done = self._load_done()
+
+    @classmethod
+    def for_request(cls, name: str, params: dict, root: str = None) -> "Checkpoint":
+        """Get the checkpoint of a request, keyed by a hash of its parameters."""
+        key = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        return cls(os.path.join(root or default_checkpoint_root(), f"{name}-{key}"), params)
+
+    def save_manifest(self):
+        """Persist the request parameters and resume state."""
+        manifest = {"params": self.params, "state": self.state, "updated": datetime.now().isoformat(timespec="seconds")}
+        write_json_atomic(self.manifest_path, manifest)
+
+    def _load_done(self) -> dict:
+        """Load completed pages from the log, ignoring pages whose spool file went missing."""
+        done = {}
+        lines = []
+        if os.path.exists(self.log_path):
+            with open(self.log_path, encoding="utf-8") as f:
+                lines = f.readlines()
+        for line in lines:
+            try:
+                page = json.loads(line)
+            except ValueError:
+                continue  # Partially written line of an interrupted run
+            if os.path.exists(self.page_path(page["offset"], page["limit"])):
+                done[(page["offset"], page["limit"])] = page["records"]
+        # Spool files are written atomically, so pages spooled but not yet logged when a run failed are complete too
+        for filename in os.listdir(self.directory):
+            match = re.fullmatch(r"page_(\d+)_(\d+)\.json", filename)
+            if match:
+                done.setdefault((int(match.group(1)), int(match.group(2))), None)
+        return done
+
+    def page_path(self, offset: int, limit: int) -> str:
+        """Path of the spool file of a page."""
+        return os.path.join(self.directory, f"page_{offset}_{limit}.json")
+
+    def is_done(self, offset: int, limit: int) -> bool:
+        """Check if a page was completed by this or a previous run."""
+        return (offset, limit) in self.done
+
+    def mark_done(self, offset: int, limit: int, num_records: int):
+        """Record a page as completed, its spool file must already be written."""
+        self.done[(offset, limit)] = num_records
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"offset": offset, "limit": limit, "records": num_records}) + "\n")
+
+    def write_page(self, offset: int, limit: int, records: list):
+        """Spool the records of a page to disk."""
+        write_json_atomic(self.page_path(offset, limit), records)
+
+    def read_page(self, offset: int, limit: int) -> list:
+        """Read the spooled records of a page."""
+        with open(self.page_path(offset, limit), encoding="utf-8") as f:
+            return json.load(f)
+
+    def clear(self):
+        """Delete the checkpoint once the request is complete."""
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -2,8 +2,8 @@ import os
 import sys
 import json
 import click
-from datagovindia import DataGovIndia, save_dataframe, __version__, check_api_key
 import functools
+import datagovindia  # Exports are loaded lazily, commands only import what they use
 
 # Decorator for common parameters
 def common_options(func):
@@ -19,6 +19,11 @@ def common_options(func):
         type=str,
         help="Path to the SQLite database. Optional if already set in environment variable 'DATAGOVINDIA_DB_PATH'.",
     )
+    @click.option(
+        "--cache/--no-cache",
+        default=None,
+        help="Cache API responses on disk. Uses 'DATAGOVINDIA_CACHE' environment variable if not provided.",
+    )
     @functools.wraps(func)  # Ensure the original function signature is preserved
     def wrapper(*args, **kwargs):
         return func(*args, **kwargs)
@@ -27,15 +32,24 @@ def common_options(func):
 ################## datagovindia cli ##################
 
 @click.group()
-def cli():
+@click.option(
+    "--metrics",
+    "metrics_path",
+    default=None,
+    type=str,
+    help="Write request and stage metrics to this file at exit, a JSON run report if it ends with .json, "
+    "a Prometheus textfile otherwise. Uses 'DATAGOVINDIA_METRICS' environment variable if not provided.",
+)
+def cli(metrics_path):
     """Command-line interface for the DataGovIndia API wrapper."""
-    pass
+    if metrics_path:
+        datagovindia.enable_metrics(metrics_path)
 
 # Version
 @cli.command(name="version", context_settings=dict(ignore_unknown_options=True, allow_extra_args=True))
 def version():
     """Displays the version of the DataGovIndia API wrapper."""
-    click.echo(f"datagovindia v{__version__}")
+    click.echo(f"datagovindia v{datagovindia.__version__}")
 
 # Validate API Key
 @cli.command(name="validate-api-key")
@@ -47,7 +61,7 @@ def validate_api_key_cli(api_key):
         if not api_key:
             click.echo("API key not provided in arguments or environment variable 'DATAGOVINDIA_API_KEY'.", err=True)
             sys.exit(1)     
-    if check_api_key(api_key=api_key):
+    if datagovindia.check_api_key(api_key=api_key):
         click.echo("Your API key is valid.")
     else:
         click.echo("Your API key is invalid. Please check if you have a valid key.", err=True)
@@ -66,25 +80,43 @@ def validate_api_key_cli(api_key):
     "--njobs",
     default=None,
     type=int,
-    help="Number of threads to use for collecting data. (default is all cores)",
+    help="Number of parallel requests to use for collecting data. (default is 16 threads, or all cores with --engine process)",
 )
-def sync_metadata_cli(api_key, db_path, batch_size, njobs):
+@click.option(
+    "--engine",
+    default=None,
+    type=click.Choice(["thread", "process"]),
+    help="Engine used to run parallel requests. Uses 'DATAGOVINDIA_ENGINE' environment variable if not provided. (default is thread)",
+)
+@click.option(
+    "--rate",
+    default=None,
+    type=float,
+    help="Maximum number of requests per second. Uses 'DATAGOVINDIA_RATE' environment variable if not provided. (default is no limit)",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only fetch resources updated since the last sync and remove deactivated resources.",
+)
+@click.option("--resume", is_flag=True, help="Resume an interrupted sync, skipping offset ranges already synced.")
+def sync_metadata_cli(api_key, db_path, cache, batch_size, njobs, engine, rate, incremental, resume):
     """Fetch and sync metadata from the OGD platform into the SQLite database."""
     click.echo("Syncing latest metadata from the OGD platform...")
     try:
-        datagovin = DataGovIndia(api_key=api_key, db_path=db_path, validate_key=True)
+        datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=True, rate=rate, cache=cache)
     except Exception as e:
         click.echo(f"Error initializing DataGovIndia: {str(e)}", err=True)
         sys.exit(1)
-    datagovin.sync_metadata(batch_size=batch_size, njobs=njobs)
+    datagovin.sync_metadata(batch_size=batch_size, njobs=njobs, incremental=incremental, engine=engine, resume=resume)
     click.echo("Metadata updated successfully.")
 
 # Get Update Info
 @cli.command(name="get-update-info")
 @common_options
-def get_update_info_cli(api_key, db_path):
+def get_update_info_cli(api_key, db_path, cache):
     """Fetch info for the last metadata update from the OGD platform."""
-    datagovin = DataGovIndia(api_key=api_key, db_path=db_path, validate_key=False)
+    datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=False, cache=cache)
     click.echo("Fetching info for the last metadata update...")
     info = datagovin.get_update_info()
     click.echo(json.dumps(info, indent=4))
@@ -92,7 +124,7 @@ def get_update_info_cli(api_key, db_path):
 # Search
 @cli.command(name="search")
 @common_options
-@click.argument("query", required=True)
+@click.argument("query", required=False, default="")
 @click.option("-o", "--output", default=None, type=str, help="Path to the output file if you want to save the results.")
 @click.option("--preview", is_flag=True, help="Display the results in the terminal.", default=False)
 @click.option("-n", "--limit", default=5, type=int, show_default=True, help="Number of results to show.")
@@ -107,17 +139,40 @@ def get_update_info_cli(api_key, db_path):
 )
 @click.option("-s", "--sort-by", default=None, type=str, help="Field to sort results by.")
 @click.option("--asc", is_flag=True, help="Sort results in ascending order.")
-def search_cli(query, api_key, db_path, output, preview, limit, fields, sort_by, asc):
-    """Search the metadata database based on a query and display or save the results."""
-    datagovin = DataGovIndia(api_key=api_key, db_path=db_path, validate_key=False)
+@click.option(
+    "--mode",
+    default="fts",
+    type=click.Choice(["fts", "regex"]),
+    show_default=True,
+    help="Search using the full-text index (fts) or by scanning every record with a regex (regex).",
+)
+@click.option("--org", "orgs", multiple=True, type=str, help="Only resources of this organisation (repeatable).")
+@click.option("--sector", "sectors", multiple=True, type=str, help="Only resources in this sector (repeatable).")
+@click.option("--org-type", default=None, type=str, help="Only resources of this organisation type, e.g. Central.")
+@click.option("--updated-after", default=None, type=str, help="Only resources updated on or after this date.")
+def search_cli(
+    query, api_key, db_path, cache, output, preview, limit, fields, sort_by, asc, mode, orgs, sectors, org_type, updated_after
+):
+    """Search the metadata database based on a query and filters, and display or save the results."""
+    datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=False, cache=cache)
     click.echo(f"Searching for '{query}' in fields {fields}...")
-    search_df = datagovin.search(query, search_fields=fields, sort_by=sort_by, ascending=asc)
+    search_df = datagovin.search(
+        query,
+        search_fields=fields,
+        sort_by=sort_by,
+        ascending=asc,
+        mode=mode,
+        orgs=list(orgs),
+        sectors=list(sectors),
+        org_type=org_type,
+        updated_after=updated_after,
+    )
 
     if preview:
         click.echo(search_df.head(limit))
         click.echo(f"{len(search_df)} results found.")
     if output:
-        save_dataframe(search_df, output)
+        datagovindia.save_dataframe(search_df, output)
         click.echo(f"{len(search_df)} results saved to '{output}'.")
     else:
         click.echo(f"{len(search_df)} results found.")
@@ -126,9 +181,9 @@ def search_cli(query, api_key, db_path, output, preview, limit, fields, sort_by,
 @cli.command(name="get-resource-info")
 @common_options
 @click.argument("resource_id", required=True, type=str)
-def get_resource_info_cli(resource_id, api_key, db_path):
+def get_resource_info_cli(resource_id, api_key, db_path, cache):
     """Fetch info for a given resource ID from the OGD platform and display it in the terminal."""
-    datagovin = DataGovIndia(api_key=api_key, db_path=db_path, validate_key=True)
+    datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=True, cache=cache)
     click.echo(f"Fetching info for resource_id '{resource_id}'...")
     info = datagovin.get_resource_info(resource_id)
     click.echo(json.dumps(info, indent=4))
@@ -160,14 +215,78 @@ def get_resource_info_cli(resource_id, api_key, db_path):
     "--njobs",
     default=None,
     type=int,
-    help="Number of threads to use for collecting data. (default is all cores)",
+    help="Number of parallel requests to use for collecting data. (default is 16 threads, or all cores with --engine process)",
+)
+@click.option(
+    "--engine",
+    default=None,
+    type=click.Choice(["thread", "process"]),
+    help="Engine used to run parallel requests. Uses 'DATAGOVINDIA_ENGINE' environment variable if not provided. (default is thread)",
+)
+@click.option(
+    "--rate",
+    default=None,
+    type=float,
+    help="Maximum number of requests per second. Uses 'DATAGOVINDIA_RATE' environment variable if not provided. (default is no limit)",
+)
+@click.option("--resume", is_flag=True, help="Resume an interrupted download, fetching only the missing pages.")
+@click.option(
+    "--use-mirror",
+    is_flag=True,
+    help="Serve the data from a local mirror of the resource, only downloading records added since the last call.",
+)
+@click.option("--typed", is_flag=True, help="Parse columns into numeric, date and categorical types using the resource's field types.")
+@click.option(
+    "-w",
+    "--where",
+    multiple=True,
+    type=str,
+    help="Predicate the records must match, e.g. 'year >= 2015' or 'state in (Kerala, Goa)' (repeatable).",
 )
 def get_data_cli(
-    resource_id, api_key, db_path, output, sort_by, asc, offset, batch_size, limit, filters, fields, njobs
+    resource_id,
+    api_key,
+    db_path,
+    cache,
+    output,
+    sort_by,
+    asc,
+    offset,
+    batch_size,
+    limit,
+    filters,
+    fields,
+    njobs,
+    engine,
+    rate,
+    resume,
+    use_mirror,
+    typed,
+    where,
 ):
-    """Fetch data for a given resource ID and save it to a specified file."""
-    datagovin = DataGovIndia(api_key=api_key, db_path=db_path, validate_key=True)
+    """Fetch data for a given resource ID and save it to a specified file.
+    CSV, JSONL, Parquet and Feather files are written page by page as data arrives."""
+    datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=True, rate=rate, cache=cache)
     click.echo(f"Fetching data for resource_id '{resource_id}'...")
+    if os.path.splitext(output)[-1] in datagovindia.STREAMING_EXTENSIONS and not use_mirror:
+        chunks = datagovin.iter_data(
+            resource_id,
+            sort_by=sort_by,
+            ascending=asc,
+            offset=offset,
+            batch_size=batch_size,
+            limit=limit,
+            filters=filters,
+            fields=fields,
+            njobs=njobs,
+            engine=engine,
+            resume=resume,
+            typed=typed,
+            where=list(where),
+        )
+        num_rows = datagovindia.save_dataframe_chunks(chunks, output)
+        click.echo(f"{num_rows} records fetched and saved to '{output}'.")
+        return
     data = datagovin.get_data(
         resource_id,
         sort_by=sort_by,
@@ -178,9 +297,249 @@ def get_data_cli(
         filters=filters,
         fields=fields,
         njobs=njobs,
+        engine=engine,
+        resume=resume,
+        typed=typed,
+        where=list(where),
+        use_mirror=use_mirror,
     )
-    save_dataframe(data, output)
+    datagovindia.save_dataframe(data, output)
     click.echo(f"{len(data)} records fetched and saved to '{output}'.")
 
+# Get Data for many resources
+@cli.command(name="get-data-batch")
+@common_options
+@click.option(
+    "-i",
+    "--ids-file",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="File with one resource ID per line.",
+)
+@click.option("-q", "--query", default=None, type=str, help="Download every resource matching a search of the metadata database.")
+@click.option("-o", "--output-dir", required=True, type=str, help="Directory to save one file per resource to.")
+@click.option(
+    "--format",
+    "file_format",
+    default="csv",
+    type=click.Choice(["csv", "jsonl", "parquet", "feather"]),
+    show_default=True,
+    help="Format of the output files.",
+)
+@click.option(
+    "--batch-size",
+    default=2000,
+    type=int,
+    help="Number of records to be fetched in a single request. Increase this value to improve performance.",
+)
+@click.option(
+    "--njobs",
+    default=None,
+    type=int,
+    help="Number of parallel requests shared by all resources. (default is 16 threads, or all cores with --engine process)",
+)
+@click.option(
+    "--engine",
+    default=None,
+    type=click.Choice(["thread", "process"]),
+    help="Engine used to run parallel requests. Uses 'DATAGOVINDIA_ENGINE' environment variable if not provided. (default is thread)",
+)
+@click.option(
+    "--rate",
+    default=None,
+    type=float,
+    help="Maximum number of requests per second. Uses 'DATAGOVINDIA_RATE' environment variable if not provided. (default is no limit)",
+)
+@click.option("--typed", is_flag=True, help="Parse columns into numeric, date and categorical types using the resource's field types.")
+def get_data_batch_cli(
+    api_key, db_path, cache, ids_file, query, output_dir, file_format, batch_size, njobs, engine, rate, typed
+):
+    """Fetch data for many resources at once and save one file per resource to a directory.
+    Resource IDs are read from --ids-file and/or from the results of a --query search."""
+    datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=True, rate=rate, cache=cache)
+    resource_ids = []
+    if ids_file:
+        with open(ids_file, encoding="utf-8") as f:
+            resource_ids.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    if query:
+        search_df = datagovin.search(query)
+        resource_ids.extend(search_df["resource_id"].tolist() if len(search_df) else [])
+    if not resource_ids:
+        raise click.UsageError("No resource IDs to fetch, pass --ids-file and/or --query.")
+    click.echo(f"Fetching data for {len(resource_ids)} resources...")
+    results = datagovin.get_data_many(
+        resource_ids,
+        output_dir=output_dir,
+        file_format=file_format,
+        batch_size=batch_size,
+        njobs=njobs,
+        engine=engine,
+        typed=typed,
+    )
+    failed = [rid for rid, num_rows in results.items() if num_rows is None]
+    click.echo(
+        f"{sum(n for n in results.values() if n)} records of {len(results) - len(failed)} resources saved to '{output_dir}'."
+    )
+    if failed:
+        click.echo(f"{len(failed)} resources could not be fetched: {', '.join(failed)}", err=True)
+
+# Sharded downloads
+def shard_dir_option(func):
+    return click.option(
+        "--shard-dir",
+        default=None,
+        type=str,
+        help="Directory shared by the coordinator and the workers. Uses 'DATAGOVINDIA_SHARD_DIR' environment variable if not provided. (default is ~/.datagovindia/shards)",
+    )(func)
+
+@cli.command(name="shard-plan-data")
+@common_options
+@shard_dir_option
+@click.argument("resource_id", required=True, type=str)
+@click.option("--filters", default={}, type=dict, help="Filters to be applied on the records.")
+@click.option(
+    "--fields",
+    default=[],
+    multiple=True,
+    type=str,
+    help="Fields to be fetched. Keep empty to fetch all fields.",
+)
+@click.option("--offset", default=0, type=int, help="Offset of the records to be fetched.")
+@click.option("--limit", default=None, type=int, help="Number of records to be fetched. (default is all records)")
+@click.option(
+    "--batch-size",
+    default=2000,
+    type=int,
+    help="Number of records fetched by every unit of the job.",
+)
+@click.option("--sort-by", default=None, type=str, help="Field to sort results by.")
+@click.option("--asc", is_flag=True, help="Sort results in ascending order (default is ascending).")
+@click.option(
+    "-w",
+    "--where",
+    multiple=True,
+    type=str,
+    help="Predicate the records must match, e.g. 'year >= 2015' or 'state in (Kerala, Goa)' (repeatable).",
+)
+def shard_plan_data_cli(
+    resource_id, api_key, db_path, cache, shard_dir, filters, fields, offset, limit, batch_size, sort_by, asc, where
+):
+    """Plan the download of a resource as a sharded job and print its id.
+    Run 'shard-worker' on any number of hosts, then 'shard-merge' with the job id."""
+    datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=True, cache=cache)
+    job_id = datagovin.plan_data_shards(
+        resource_id,
+        sort_by=sort_by,
+        ascending=asc,
+        offset=offset,
+        batch_size=batch_size,
+        limit=limit,
+        filters=filters,
+        fields=fields,
+        where=list(where),
+        shard_dir=shard_dir,
+    )
+    click.echo(job_id)
+
+@cli.command(name="shard-plan-sync")
+@common_options
+@shard_dir_option
+@click.option(
+    "--batch-size",
+    default=1000,
+    type=int,
+    help="Number of resources fetched by every unit of the job.",
+)
+def shard_plan_sync_cli(api_key, db_path, cache, shard_dir, batch_size):
+    """Plan a full metadata sync as a sharded job and print its id.
+    Run 'shard-worker' on any number of hosts, then 'shard-merge' with the job id."""
+    datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=True, cache=cache)
+    click.echo(datagovin.plan_sync_shards(batch_size=batch_size, shard_dir=shard_dir))
+
+@cli.command(name="shard-worker")
+@common_options
+@shard_dir_option
+@click.option("--job-id", default=None, type=str, help="Only work on this job. (default is every job, oldest first)")
+@click.option(
+    "--njobs",
+    default=None,
+    type=int,
+    help="Number of units fetched in parallel by this worker. (default is 16 threads)",
+)
+@click.option(
+    "--rate",
+    default=None,
+    type=float,
+    help="Maximum number of requests per second of this worker. Uses 'DATAGOVINDIA_RATE' environment variable if not provided. (default is no limit)",
+)
+@click.option(
+    "--lease",
+    default=None,
+    type=float,
+    help="Seconds after which the units claimed by a worker that died are claimed again. (default is 600)",
+)
+def shard_worker_cli(api_key, db_path, cache, shard_dir, job_id, njobs, rate, lease):
+    """Claim and fetch the units of sharded jobs until none is left."""
+    datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=False, rate=rate, cache=cache)
+    completed = datagovin.run_shard_worker(job_id=job_id, njobs=njobs, shard_dir=shard_dir, lease=lease)
+    click.echo(f"{completed} units completed.")
+
+@cli.command(name="shard-merge")
+@common_options
+@shard_dir_option
+@click.argument("job_id", required=True, type=str)
+@click.option("-o", "--output", default=None, type=str, help="Path to the output file, required for download jobs.")
+@click.option("--typed", is_flag=True, help="Parse columns into numeric, date and categorical types using the resource's field types.")
+@click.option("--keep", is_flag=True, help="Keep the job and the outputs of its units after merging.")
+def shard_merge_cli(api_key, db_path, cache, shard_dir, job_id, output, typed, keep):
+    """Assemble a completed sharded job: save a download to a file, or load a metadata sync into the database."""
+    datagovin = datagovindia.DataGovIndia(api_key=api_key, db_path=db_path, validate_key=False, cache=cache)
+    job = datagovindia.WorkQueue(shard_dir).job(job_id)
+    if job is not None and job["kind"] == "get_data" and output is None:
+        click.echo("Option '-o' / '--output' is required to merge a download job.", err=True)
+        sys.exit(1)
+    try:
+        result = datagovin.merge_shards(job_id, output=output, typed=typed, shard_dir=shard_dir, keep=keep)
+    except ValueError as e:
+        click.echo(str(e), err=True)
+        sys.exit(1)
+    if job["kind"] == "get_data":
+        click.echo(f"{result} records merged and saved to '{output}'.")
+    else:
+        click.echo(f"Metadata merged, {result} resources in the database.")
+
+@cli.command(name="shard-status")
+@shard_dir_option
+@click.option("--job-id", default=None, type=str, help="Only show this job, along with the errors of its failed units.")
+def shard_status_cli(shard_dir, job_id):
+    """Display the progress of the sharded jobs."""
+    queue = datagovindia.WorkQueue(shard_dir)
+    for job in queue.jobs():
+        if job_id is not None and job["job_id"] != job_id:
+            continue
+        click.echo(
+            f"{job['job_id']}: {job['done']}/{job['units']} units done, {job['claimed']} claimed, "
+            f"{job['pending']} pending, {job['failed']} failed, {job['records']} records"
+        )
+        if job_id is not None:
+            for unit, error in queue.errors(job_id).items():
+                click.echo(f"  unit {unit}: {error}", err=True)
+
+# Archive index
+@cli.command(name="build-archive-index")
+@click.argument("data_dir", required=False, default=None, type=click.Path(exists=True, file_okay=False))
+@click.option("-o", "--output", default=None, type=str, help="Path to the index. (default is ~/.datagovindia/archive.db)")
+def build_archive_index_cli(data_dir, output):
+    """Build the lookup index of the archived resource maps (data/*.gz) of datagovindia<=1.0.0.
+    DATA_DIR defaults to 'DATAGOVINDIA_ARCHIVE_DIR' or the data directory of a source checkout."""
+    try:
+        path = datagovindia.build_archive_index(data_dir, path=output)
+    except ValueError as e:
+        click.echo(str(e), err=True)
+        sys.exit(1)
+    index = datagovindia.ArchiveIndex(path)
+    click.echo(f"Indexed {index.count()} resources in '{path}' ({os.path.getsize(path) / 1e6:.1f} MB).")
+    index.close()
+
 if __name__ == "__main__":
     cli()
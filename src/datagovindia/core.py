@@ -0,0 +1,2857 @@
+"""Client of the OGD platform: HTTP sessions, page fetching, the metadata database and `DataGovIndia`.
+
+pandas, `datagovindia.schema` and `datagovindia.query` are imported by the methods building DataFrames,
+so commands that only touch the metadata database or the network start without loading pandas.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import time
+import requests
+import queue
+import threading
+import signal
+import sqlite3
+import multiprocessing as mp
+from typing import List, Dict, TYPE_CHECKING
+from urllib.parse import urlencode
+from datetime import datetime, timezone
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, RetryError
+from dateutil.parser import parse as dateutil_parse
+from collections.abc import Iterable
+from itertools import islice, zip_longest
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from datagovindia.checkpoint import Checkpoint, write_json_atomic
+from datagovindia.ratelimit import RateLimiter, RateLimitedAdapter, resolve_rate
+from datagovindia.cache import ResponseCache, CachedSession, resolve_cache
+from datagovindia.metrics import METRICS, endpoint_of
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Default concurrency of the thread engine, fetches are I/O-bound so this is independent of the CPU count
+DEFAULT_THREAD_NJOBS = 16
+
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+
+API_BASE_URL = "https://api.data.gov.in"
+
+def resolve_api_url() -> str:
+    """Base URL of the OGD API, overridden by the `DATAGOVINDIA_API_URL` environment variable, e.g. to point at a mock server."""
+    return os.environ.get("DATAGOVINDIA_API_URL", API_BASE_URL).rstrip("/")
+
+# Exceptions raised by HTTP sessions that are worth retrying
+try:
+    import httpx
+    from datagovindia.ratelimit import RateLimitedTransport
+
+    REQUEST_EXCEPTIONS = (requests.exceptions.RequestException, httpx.HTTPError)
+except ImportError:
+    httpx = None
+    REQUEST_EXCEPTIONS = (requests.exceptions.RequestException,)
+
+# Optional fast JSON decoder, `pip install datagovindia[fast]`
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shared keep-alive session of the current process, see `get_session`
+_session_lock = threading.Lock()
+_shared_session = {"pid": None, "session": None, "pool_maxsize": 0}
+
+def create_session(
+    pool_maxsize: int = DEFAULT_THREAD_NJOBS, http2: bool = False, limiter: RateLimiter = None, cache: ResponseCache = None
+):
+    """Create an HTTP session with a keep-alive connection pool of `pool_maxsize` connections and gzip/deflate compression.
+
+        http2: (bool) - Use an `httpx.Client` with HTTP/2 enabled instead of a `requests.Session`.
+        Requires `pip install httpx[http2]`.
+
+        limiter: (RateLimiter) - Rate limiter shared by all requests sent through the session. Defaults to None (no limit).
+
+        cache: (ResponseCache) - Serve GET requests from an on-disk response cache. Defaults to None (no cache).
+    """
+    if http2:
+        if cache is not None:
+            raise ValueError("Response caching is not supported with HTTP/2.")
+        if httpx is None:
+            raise ImportError("HTTP/2 support requires httpx. Install it with `pip install httpx[http2]`.")
+        limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+        transport = RateLimitedTransport(limiter=limiter, http2=True, limits=limits)
+        return httpx.Client(http2=True, limits=limits, headers=DEFAULT_HEADERS, transport=transport)
+    session = requests.Session() if cache is None else CachedSession(cache)
+    session.headers.update(DEFAULT_HEADERS)
+    session.adapters.clear()  # Nothing to keep from the default adapters
+    mount_adapter(session, pool_maxsize, limiter=limiter)
+    return session
+
+def mount_adapter(session: requests.Session, pool_maxsize: int, limiter: RateLimiter = None):
+    """Mount a `RateLimitedAdapter` keeping up to `pool_maxsize` connections alive per host.
+    The retries, pool blocking and larger pool of a plain `HTTPAdapter` it replaces are kept, along with the rate limiter
+    of the adapter it replaces if `limiter` is None. Adapters of other classes, e.g. mounted by the caller of
+    `DataGovIndia(session=...)` for custom TLS or connection handling, are left in place and are not rate limited."""
+    for prefix in ("https://", "http://"):
+        current = session.adapters.get(prefix)
+        if current is not None and type(current) not in (HTTPAdapter, RateLimitedAdapter):
+            continue
+        options = {"pool_connections": 4, "pool_maxsize": pool_maxsize}
+        if current is not None:
+            options = {
+                "pool_connections": current._pool_connections,
+                "pool_maxsize": max(pool_maxsize, current._pool_maxsize),
+                "pool_block": current._pool_block,
+                "max_retries": current.max_retries,
+            }
+        session.mount(prefix, RateLimitedAdapter(limiter=limiter or getattr(current, "limiter", None), **options))
+
+def get_session(pool_maxsize: int = DEFAULT_THREAD_NJOBS) -> requests.Session:
+    """Get the keep-alive session shared by all threads of the current process.
+    A new session is created after a fork, the connection pool grows to at least `pool_maxsize`.
+    Requests are sent through an adaptive `RateLimiter`, capped at the `DATAGOVINDIA_RATE` environment variable if set."""
+    with _session_lock:
+        if _shared_session["pid"] != os.getpid():
+            session = create_session(pool_maxsize, limiter=RateLimiter(rate=resolve_rate()))
+            _shared_session.update(pid=os.getpid(), session=session, pool_maxsize=pool_maxsize)
+        elif _shared_session["pool_maxsize"] < pool_maxsize:
+            mount_adapter(_shared_session["session"], pool_maxsize)
+            _shared_session["pool_maxsize"] = pool_maxsize
+        return _shared_session["session"]
+
+def _count_retry(retry_state):
+    """Count a retry of `make_request_with_retry`, called by tenacity before sleeping."""
+    url = retry_state.args[0] if retry_state.args else retry_state.kwargs.get("url", "")
+    METRICS.inc("request_retries_total", endpoint=endpoint_of(url))
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=5, max=60),
+    retry=retry_if_exception_type(REQUEST_EXCEPTIONS),
+    before_sleep=_count_retry,
+)
+def make_request_with_retry(url: str, session=None, **kwargs) -> requests.Response:
+    """GET `url` with retries, reusing connections from `session` (defaults to the shared session, see `get_session`)."""
+    session = session or get_session()
+    connect_timeout, read_timeout = kwargs.get("timeout", 10), kwargs.get("timeout", 30)
+    if isinstance(session, requests.Session):
+        timeout = (connect_timeout, read_timeout)
+    else:
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+    endpoint = endpoint_of(url)
+    start = time.perf_counter()
+    try:
+        response = session.get(url, timeout=timeout)
+    except REQUEST_EXCEPTIONS:
+        METRICS.inc("requests_total", endpoint=endpoint, status="error")
+        raise
+    observe_response(endpoint, start, response)
+    response.raise_for_status()
+    return response
+
+def observe_response(endpoint: str, start: float, response):
+    """Record the latency, status and size of a response to a request sent at `start` (`time.perf_counter()`)."""
+    if METRICS.enabled:
+        METRICS.observe("request_seconds", time.perf_counter() - start, endpoint=endpoint)
+        METRICS.inc("requests_total", endpoint=endpoint, status=str(response.status_code))
+        METRICS.inc("response_bytes_total", len(response.content), endpoint=endpoint)
+
+def decode_json(response) -> dict:
+    """Decode the JSON body of a response with orjson if it is installed, timed as the "json_decode" stage."""
+    with METRICS.stage("json_decode") as counter:
+        data = orjson.loads(response.content) if orjson is not None else response.json()
+        if isinstance(data, dict) and isinstance(data.get("records"), list):
+            counter["records"] = len(data["records"])
+    return data
+
+def flatten(lst):
+    """Flatten a nested list"""
+    for item in lst:
+        if isinstance(item, Iterable) and not isinstance(item, str):
+            yield from flatten(item)
+        else:
+            yield item
+
+def construct_url_for_lists(params: dict) -> str:
+    """
+    Construct URL with query parameters.
+    """
+    base_url = f"{resolve_api_url()}/lists"
+    query_string = urlencode(params)
+    return f"{base_url}?{query_string}"
+
+def total_resources_url() -> str:
+    """Url of a request for 0 records of the catalog, whose "total" is the number of available resources."""
+    params = {
+        "format": "json",
+        "notfilters[source]": "visualize.data.gov.in",
+        "filters[active]": 1,
+        "offset": 0,
+        "limit": 0,
+    }
+    return construct_url_for_lists(params)
+
+def get_total_available_resources(session=None) -> int:
+    """Retrieve total number of available records."""
+    api_response = make_request_with_retry(total_resources_url(), session=session)
+    return api_response.json()["total"]
+
+def metadata_url(api_key: str, start: int = 0, end: int = 1000, active: int = 1) -> str:
+    """Url of the resources from `start` to `end` of the catalog, sorted by last update, newest first."""
+    params = {
+        "api-key": api_key,
+        "notfilters[source]": "visualize.data.gov.in",
+        "filters[active]": active,
+        "sort[updated]": "desc",
+        "format": "json",
+        "offset": start,
+        "limit": end - start,
+    }
+    return construct_url_for_lists(params)
+    
+def _fetch_metadata(api_key: str, start: int = 0, end: int = 1000, active: int = 1, session=None) -> list:
+    """Retrieve records using single thread. Records are sorted by last update, newest first."""
+    api_url = metadata_url(api_key, start, end, active)
+
+    try:
+        resp = make_request_with_retry(api_url, session=session)
+        resp.raise_for_status()
+        # logger.info(f"Successfully fetched data for range ({start}-{end}")
+        return compile_page(decode_json(resp).get("records", []))
+    except (RetryError, *REQUEST_EXCEPTIONS) as e:
+        METRICS.inc("page_failures_total", endpoint="lists")
+        logger.error(f"Request failed for range ({start}-{end}): {e}")
+        raise
+
+def compile_page(records: list) -> list:
+    """`compile_records` for a page of the catalog, timed as the "compile_records" stage."""
+    with METRICS.stage("compile_records", len(records)):
+        return compile_records(records)
+
+def updated_since(records: list, watermark: str) -> list:
+    """Compiled records updated since `watermark`, or with no `date_updated`."""
+    return [r for r in records if r["date_updated"] is None or r["date_updated"] >= watermark]
+
+
+
+def build_url(
+    api_key: str,
+    resource_id: str,
+    offset: int = 0,
+    limit: int = 1000,
+    filters: Dict[str, str] = None,
+    fields: List[str] = None,
+    sort_by: str = None,
+    sort_order: str = "asc",
+) -> str:
+    """Build url to fetch data from data.gov.in
+
+        api_key: (str) - API key for data.gov.in
+        resource_id: (str) - Unique identifier of the resource.
+        offset: (int) - Offset of the records to be fetched. Defaults to 0.
+        limit: (int) - Number of records to be fetched. Defaults to 1000.
+        filters: (dict) - Filters to be applied on the records, should be a list of dicts of the form {<field>:<value>}. Defaults to {}.
+        fields: (list) - Fields to be fetched. Defaults to [].
+        sort_by: (str) - Field to sort results by. Defaults to None.
+        sort_order: (str) - Order of sorting. Defaults to "asc". Only applicable if sort_by is not None.
+
+    Returns: (str) - Url to fetch data from data.gov.in
+    """
+    base_url = f"{resolve_api_url()}/resource/{resource_id}"
+    params = {"api-key": api_key, "format": "json", "offset": offset, "limit": limit}
+    if fields:
+        params["fields"] = ",".join(fields)
+    if sort_by:
+        params[f"sort[{sort_by}]"] = sort_order or "asc"
+    if filters:
+        params.update({f"filters[{k}]": v for k, v in filters.items()})
+    url = base_url + "?" + urlencode(params, doseq=True, safe="\],\[")
+    return url
+
+def check_api_key(api_key: str, session=None) -> bool:
+    """Check if API key is valid by making a request to the API for 1 record."""
+    params = {
+        "api-key": api_key,
+        "format": "json",
+        "offset": 0,
+        "limit": 1,
+    }
+    api_url = construct_url_for_lists(params)
+    session = session or get_session()
+    # Cache keys do not include the API key, the responses of another key must not validate this one
+    options = {"cache": False} if isinstance(session, CachedSession) else {}
+    resp    = session.get(api_url, **options)
+    # Get 1 record to check if the API key is valid
+    resource_id = resp.json().get("records", [{}])[0].get("index_name")
+    if resource_id:
+        url = build_url(api_key=api_key,resource_id=resource_id, limit=1)
+        try:
+            response = session.get(url, **options)
+            response.raise_for_status()
+            return True
+        except REQUEST_EXCEPTIONS:
+            return False
+    else:
+        return False
+
+
+
+# Attributes of the `resources` table that can be searched with `regexmatch`
+SEARCHABLE_ATTRIBUTES = [
+    "title",
+    "description",
+    "org_type",
+    "fields",
+    "orgs",
+    "source",
+    "sectors",
+    "date_created",
+    "date_updated",
+]
+
+# Attributes indexed in the `resources_fts` full-text table, with their bm25 weights
+FTS_ATTRIBUTES = {
+    "title": 10.0,
+    "description": 5.0,
+    "org_type": 1.0,
+    "fields": 2.0,
+    "orgs": 3.0,
+    "source": 1.0,
+    "sectors": 3.0,
+}
+
+FTS_OPERATORS = {"AND", "OR", "NOT"}
+
+# Columns of the `metadata` table, one row is stored per sync run
+METADATA_COLUMNS = {
+    "last_updated": "TEXT",
+    "number_of_resources": "INTEGER",
+    "sync_mode": "TEXT",
+    "watermark": "TEXT",
+    "num_fetched": "INTEGER",
+    "num_inserted": "INTEGER",
+    "num_updated": "INTEGER",
+    "num_removed": "INTEGER",
+    "duration_seconds": "REAL",
+}
+
+# Join tables of the " | "-joined columns of `resources`: table -> (key column, resources column)
+FACET_TABLES = {
+    "resource_field": ("field", "fields"),
+    "resource_org": ("org", "orgs"),
+    "resource_sector": ("sector", "sectors"),
+}
+
+# Indexed columns of `resources` used by faceted search filters
+INDEXED_COLUMNS = ["date_updated", "org_type", "source"]
+
+RESOURCE_COLUMNS = [
+    "resource_id",
+    "title",
+    "description",
+    "org_type",
+    "fields",
+    "orgs",
+    "source",
+    "sectors",
+    "date_created",
+    "date_updated",
+]
+
+# Pragmas of the long-lived connection loading the catalog during a full sync
+BULK_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64 * 1024,  # 64MB, negative values are in KiB
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+def split_joined(value: str) -> list:
+    """Split a " | "-joined column of `resources` into its values."""
+    if not value:
+        return []
+    return [item for item in value.split(" | ") if item]
+
+def build_fts_query(query: str, search_fields: list = ["title"]) -> str:
+    """Translate a search query into an FTS5 MATCH expression.
+
+        Every term is quoted so that special characters never break the FTS5 syntax.
+        Supported syntax:
+            - `rural employment` : both terms must match (implicit AND)
+            - `"rural employment"` : phrase match
+            - `employ*` : prefix match, also works on phrases (`"rural employ"*`)
+            - `title:mgnrega` : field scoped match, overrides `search_fields` for that term
+            - `AND`, `OR`, `NOT` : boolean operators (uppercase)
+    """
+    for field in search_fields:
+        if field not in FTS_ATTRIBUTES:
+            raise ValueError(f"Invalid search field {field}, valid fields are {list(FTS_ATTRIBUTES)}")
+    default_scope = "{" + " ".join(search_fields) + "}"
+    terms = []
+    for column, term in re.findall(r'(?:(\w+):)?("[^"]*"\*?|[^\s"]+)', query):
+        if not column and term in FTS_OPERATORS:
+            terms.append(term)
+            continue
+        is_prefix = term.endswith("*")
+        term = term.rstrip("*").strip('"').replace('"', '""').strip()
+        if not term:
+            continue
+        if column and column not in FTS_ATTRIBUTES:
+            raise ValueError(f"Invalid search field {column}, valid fields are {list(FTS_ATTRIBUTES)}")
+        phrase = f'"{term}"' + ("*" if is_prefix else "")
+        terms.append(f"{column or default_scope} : {phrase}")
+    if not terms:
+        raise ValueError(f"Invalid search query: '{query}'")
+    return " ".join(terms)
+
+def remove_special_chars(s: str) -> str:
+    """
+    Remove special characters from string.
+    """
+    return re.sub("[^a-zA-Z0-9\.]", "", s).strip().lower()  # type: ignore
+
+def regexmatch(text: str, query: str) -> bool:
+    """Search for 'query' within 'text' using regex"""
+    if text and query:  # Check only non-null
+        text, query = remove_special_chars(text), remove_special_chars(query)
+        if re.search(query, text, flags=re.I):
+            return True
+        else:
+            return False
+    else:
+        return False
+
+def format_date(date_string: str):
+    """Parse date string with given format and return ISO 8601 formatted date string"""
+    try:
+        return dateutil_parse(date_string).isoformat(timespec="seconds")
+    except (ValueError, TypeError):
+        return None
+
+# Timestamp formats used by the OGD platform, tried before falling back to dateutil
+OGD_DATE_FORMATS = ["%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"]
+
+@lru_cache(maxsize=65536)
+def _normalize_date_string(date_string: str):
+    for fmt in OGD_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(date_string, fmt)
+        except ValueError:
+            continue
+        if fmt.endswith("Z"):
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.isoformat(timespec="seconds")
+    return format_date(date_string)
+
+def normalize_date(date_string: str):
+    """Same as `format_date`, but tries the known OGD timestamp formats before dateutil and memoizes repeated strings."""
+    if isinstance(date_string, str):
+        return _normalize_date_string(date_string)
+    return format_date(date_string)
+
+def current_datetime() -> str:
+    """Get the current datetime as a string in ISO 8601 format."""
+    return datetime.now().isoformat(timespec="seconds")
+
+def is_nested(lst: list) -> bool:
+    """Check if list is nested"""
+    return any(isinstance(i, list) for i in lst)
+
+def format_seconds(seconds: int, padding: int = 8) -> str:
+    """Format seconds into a readable format"""
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    parts = []
+    if hours:
+        parts.append(f"{int(hours)}h{'' if hours > 1 else ''}")
+    if minutes:
+        parts.append(f"{int(minutes)}m{'' if minutes > 1 else ''}")
+    if seconds or not parts:
+        parts.append(f"{int(seconds)}s{'' if seconds > 1 else ''}")
+    eta_string = ":".join(parts)
+    return eta_string.ljust(padding)
+
+def display_progress_bar(iteration, total, bar_length=50, char="=", fill_char=".", eta=None):
+    """
+    Display a progress bar in the console.
+
+    Parameters:
+    ------------
+        iteration (int): Current iteration.
+        total (int): Total number of iterations.
+        bar_length (int): Length of the progress bar.
+        char (str): Character for completed progress.
+        fill_char (str): Character for remaining progress.
+        eta (str or None): Estimated time of arrival.
+    """
+    progress = iteration / total
+    arrow = char * int(round(progress * bar_length) - 1) + ">"
+    spaces = fill_char * (bar_length - len(arrow))
+
+    if eta:
+        sys.stdout.write(f"\rUpdated {iteration}/{total} resources: [{arrow + spaces}] - ETA: {eta}")
+    else:
+        sys.stdout.write(f"\rUpdated {iteration}/{total} resources: [{arrow + spaces}]")
+    sys.stdout.flush()
+
+def compile_record_info(record: dict) -> dict:
+    """Compile record info into a dictionary"""
+    return {
+        "resource_id": record.get("index_name"),
+        "title": record.get("title"),
+        "description": record.get("desc"),
+        "org_type": record.get("org_type"),
+        "fields": " | ".join(str(f.get("id", "")) for f in record.get("field", [])),
+        "orgs": " | ".join(str(item) for item in flatten(record.get("org", []))),
+        "source": record.get("source"),
+        "sectors": " | ".join(str(item) for item in record.get("sector", [])),
+        "date_created": format_date(record.get("created_date")),
+        "date_updated": format_date(record.get("updated_date")),
+    }
+
+def _join_orgs(orgs) -> str:
+    """Join org names, only flattening nested lists when there are any."""
+    if all(isinstance(org, str) for org in orgs):
+        return " | ".join(orgs)
+    return " | ".join(str(item) for item in flatten(orgs))
+
+def compile_records(records: list) -> list:
+    """Compile a page of raw metadata records, with the same output as `compile_record_info` for each record.
+    Dates go through the memoized `normalize_date`, so each distinct timestamp of a page is parsed once."""
+    compiled = []
+    append = compiled.append
+    for record in records:
+        get = record.get
+        append(
+            {
+                "resource_id": get("index_name"),
+                "title": get("title"),
+                "description": get("desc"),
+                "org_type": get("org_type"),
+                "fields": " | ".join([str(f.get("id", "")) for f in get("field", [])]),
+                "orgs": _join_orgs(get("org", [])),
+                "source": get("source"),
+                "sectors": " | ".join(map(str, get("sector", []))),
+                "date_created": normalize_date(get("created_date")),
+                "date_updated": normalize_date(get("updated_date")),
+            }
+        )
+    return compiled
+
+
+def init_worker():
+    """Ignore SIGINT in worker processes to let the parent handle it."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+# Engines available to run network-bound fetches in parallel
+ENGINES = ["thread", "process"]
+
+def resolve_engine(engine: str = None) -> str:
+    """Resolve the fetch engine from the argument or the `DATAGOVINDIA_ENGINE` environment variable.
+    Defaults to "thread"."""
+    engine = engine or os.environ.get("DATAGOVINDIA_ENGINE", "thread")
+    if engine not in ENGINES:
+        raise ValueError(f"Invalid engine {engine}, valid engines are {ENGINES}")
+    return engine
+
+def resolve_njobs(njobs: int = None, engine: str = None) -> int:
+    """Resolve the number of parallel workers for an engine.
+    Defaults to `DEFAULT_THREAD_NJOBS` for the thread engine and the number of cores for the process engine."""
+    if njobs is None:
+        njobs = DEFAULT_THREAD_NJOBS if resolve_engine(engine) == "thread" else mp.cpu_count()
+    return max(1, njobs)
+
+def iter_parallel(func, args_list, njobs: int = None, engine: str = None, max_in_flight: int = None, ordered: bool = True):
+    """Call `func(*args)` for every args in `args_list` in parallel and yield the results in order.
+
+        engine: (str) - "thread" runs calls on a thread pool in this process, results are returned without pickling.
+        "process" runs calls on a `multiprocessing.Pool`. Defaults to the `DATAGOVINDIA_ENGINE` environment variable or "thread".
+
+        njobs: (int) - Number of parallel workers, see `resolve_njobs`.
+
+        max_in_flight: (int) - Maximum number of calls submitted but not yet yielded. Defaults to 2 * njobs.
+        Bounds memory to `max_in_flight` results regardless of the length of `args_list`.
+
+        ordered: (bool) - Yield results in the order of `args_list` (default). If False, yield `(index, result)` pairs
+        in completion order, like `imap_unordered`, so that a slow call does not hold back the results after it.
+
+    `args_list` is consumed lazily, a generator can stop producing calls based on the results seen so far.
+    Pending calls are cancelled if the consumer stops iterating. Exits gracefully on KeyboardInterrupt.
+    """
+    engine = resolve_engine(engine)
+    njobs = resolve_njobs(njobs, engine)
+    max_in_flight = max(1, max_in_flight or 2 * njobs)
+    done = queue.Queue()  # Indices of completed calls
+    if engine == "thread":
+        executor = ThreadPoolExecutor(max_workers=njobs)
+
+        def submit(index, args):
+            future = executor.submit(func, *args)
+            future.add_done_callback(lambda _: done.put(index))
+            return future
+
+        collect = lambda future: future.result()
+    else:
+        executor = mp.Pool(njobs, initializer=init_worker)  # Initialize worker with SIGINT ignored
+
+        def submit(index, args):
+            notify = lambda _: done.put(index)
+            return executor.apply_async(func, args, callback=notify, error_callback=notify)
+
+        collect = lambda async_result: async_result.get()
+
+    args_iter = enumerate(args_list)
+    pending = {}  # Index -> future of submitted calls not yet yielded, in submission order
+    submit_next = lambda n: pending.update((index, submit(index, args)) for index, args in islice(args_iter, n))
+    submit_next(max_in_flight)
+    completed = False
+    try:
+        while pending:
+            index = next(iter(pending)) if ordered else done.get()
+            result = collect(pending.pop(index))
+            submit_next(1)
+            yield result if ordered else (index, result)
+        completed = True
+    except KeyboardInterrupt:
+        logger.warning("Received KeyboardInterrupt, terminating workers...")
+        _shutdown_executor(executor, list(pending.values()), wait=False)
+        executor = None
+        logger.info("All workers terminated.")
+        sys.exit(1)
+    finally:
+        if executor is not None:
+            _shutdown_executor(executor, list(pending.values()), wait=completed)
+
+def _shutdown_executor(executor, pending, wait: bool = True):
+    """Shut down a thread pool or process pool, cancelling `pending` calls unless `wait` is True."""
+    if isinstance(executor, ThreadPoolExecutor):
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=wait)
+    elif wait:
+        # Close the pool normally if no interruption occurs
+        executor.close()
+        executor.join()
+    else:
+        executor.terminate()  # Terminate all running workers
+        executor.join()  # Wait for workers to terminate
+
+def run_parallel(func, args_list: list, njobs: int = None, engine: str = None) -> list:
+    """Call `func(*args)` for every args in `args_list` in parallel and return the results in order.
+    See `iter_parallel` for the engines available."""
+    return list(iter_parallel(func, args_list, njobs=njobs, engine=engine))
+
+def fetch_metadata_records(
+    api_key: str,
+    start: int = 0,
+    end: int = 1000000,
+    batch_size: int = 100,
+    njobs: int = None,
+    active: int = 1,
+    engine: str = None,
+    session=None,
+) -> list:
+    """Retrieve records using multiple threads with graceful handling of KeyboardInterrupt.
+    `session` is only shared with the thread engine, each process of the process engine uses its own session."""
+    if resolve_engine(engine) == "thread":
+        session = session or get_session(resolve_njobs(njobs, engine))
+    else:
+        session = None
+    data = run_parallel(
+        _fetch_metadata,
+        [(api_key, i, min(end, i + batch_size), active, session) for i in range(start, end, batch_size)],
+        njobs=njobs,
+        engine=engine,
+    )
+
+    # Flatten the data after processing
+    data = [item for sublist in data if sublist is not None for item in sublist]
+    return data
+
+
+def get_api_info(url, session=None) -> dict:
+    """Get json data from url"""
+    try:
+        response = make_request_with_retry(url, session=session)
+        response.raise_for_status()
+    except RetryError as e:
+        logger.error(f"Failed to fetch data: {e}")
+        return {}
+    return parse_api_info(response.json())
+
+def parse_api_info(data: dict) -> dict:
+    """Metadata of a resource from the json response of a request for its records, see `get_api_info`."""
+    skip_keys = [
+        "message",
+        "version",
+        "status",
+        "offset",
+        "limit",
+        "count",
+        "records",
+        "external_ws",
+        "external_ws_url",
+        "target_bucket",
+    ]
+    boolean_keys = ["visualizable", "active"]
+
+    for key in boolean_keys:
+        if key in data:
+            try:
+                data[key] = bool(int(data[key]))
+            except (ValueError, TypeError):
+                data[key] = data[key]
+    data = {k: v for k, v in data.items() if k not in skip_keys}
+    return data
+
+def save_dataframe(df, filepath):
+    """Save dataframe to filepath"""
+    def get_file_extension(filepath) -> str:
+        """Get file extension from filepath"""
+        return os.path.splitext(filepath)[-1]
+    file_extension = get_file_extension(filepath)
+    if file_extension == ".csv":
+        df.to_csv(filepath, index=False)
+    elif file_extension == ".json":
+        df.to_json(filepath, orient="records")
+    elif file_extension == ".xlsx":
+        df.to_excel(filepath, index=False)
+    elif file_extension in STREAMING_EXTENSIONS:
+        save_dataframe_chunks([df], filepath)
+    else:
+        raise ValueError(f"Invalid file extension: {file_extension}")
+
+# File formats that can be written one chunk at a time by `save_dataframe_chunks`
+STREAMING_EXTENSIONS = [".csv", ".jsonl", ".ndjson", ".parquet", ".feather", ".arrow"]
+
+def import_pyarrow():
+    """Import pyarrow, required for Parquet and Feather files."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError("Parquet and Feather files require pyarrow. Install it with `pip install datagovindia[parquet]`.")
+    return pyarrow
+
+class ChunkWriter:
+    """Write dataframes to filepath one chunk at a time, see `save_dataframe_chunks` for the formats supported.
+    For callers pushing chunks as they arrive, e.g. when several files are written at once."""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.file_extension = os.path.splitext(filepath)[-1]
+        if self.file_extension not in STREAMING_EXTENSIONS:
+            raise ValueError(
+                f"Invalid file extension for streaming: {self.file_extension}, valid extensions are {STREAMING_EXTENSIONS}"
+            )
+        self.num_rows = 0
+        self.columns = None
+        self.header_written = False
+        self._empty = None  # First empty chunk, only written if no chunk has rows
+        self._schema = None
+        self._writer = None
+        self._file = None
+        if self.file_extension in (".parquet", ".feather", ".arrow"):
+            self._pa = import_pyarrow()
+        else:
+            self._file = open(filepath, "w", encoding="utf-8", newline="")
+
+    def write(self, df: pd.DataFrame):
+        """Append a chunk, its columns are aligned to the columns of the first chunk with columns.
+        Empty chunks are skipped until a chunk has rows, so that they do not fix the header or the schema."""
+        if self.columns is None:
+            if not len(df.columns):
+                return
+            self.columns = list(df.columns)
+        df = df.reindex(columns=self.columns)
+        if not self.header_written and not len(df):
+            if self._empty is None:
+                self._empty = df
+            return
+        self._write(df)
+
+    def _write(self, df: pd.DataFrame):
+        if self._file is None:
+            pa = self._pa
+            if self._writer is None:
+                self._schema = self._stable_schema(pa.Table.from_pandas(df, preserve_index=False).schema)
+                if self.file_extension == ".parquet":
+                    self._writer = pa.parquet.ParquetWriter(self.filepath, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.filepath, self._schema)
+            self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+        elif self.file_extension == ".csv":
+            df.to_csv(self._file, index=False, header=not self.header_written)
+            self._file.flush()
+        elif len(df):
+            self._file.write(df.to_json(orient="records", lines=True).rstrip("\n") + "\n")
+            self._file.flush()
+        self.header_written = True
+        self.num_rows += len(df)
+
+    def _stable_schema(self, schema):
+        """Schema of the first chunk, widened so that later chunks fit it: categorical codes are stored as int32
+        whatever the number of categories in the first chunk, and columns with only missing values are strings.
+        Arrow IPC files only allow one dictionary per column, categorical columns are stored as their values there."""
+        pa = self._pa
+        fields = []
+        for field in schema:
+            if pa.types.is_dictionary(field.type):
+                value_type = pa.large_string() if pa.types.is_null(field.type.value_type) else field.type.value_type
+                if self.file_extension == ".parquet":
+                    field = field.with_type(pa.dictionary(pa.int32(), value_type, field.type.ordered))
+                else:
+                    field = field.with_type(value_type)
+            elif pa.types.is_null(field.type):
+                field = field.with_type(pa.large_string())
+            fields.append(field)
+        return pa.schema(fields, metadata=schema.metadata)
+
+    def close(self) -> int:
+        """Close the file, returns the number of rows written."""
+        if not self.header_written and self._empty is not None:
+            self._write(self._empty)  # Only empty chunks: write the header or schema of the first one
+            self._empty = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self.num_rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def save_dataframe_chunks(chunks, filepath) -> int:
+    """Save an iterable of dataframes to filepath, writing every chunk to disk as soon as it arrives.
+    Memory use stays flat regardless of the number of chunks. Returns the number of rows written.
+
+        .csv : header is written with the first chunk, later chunks are appended
+        .jsonl / .ndjson : one JSON record per line
+        .parquet : one row group per chunk
+        .feather / .arrow : Arrow IPC file with one record batch per chunk
+
+    Columns of later chunks are aligned to the columns of the first chunk with columns, empty chunks are skipped.
+    """
+    with ChunkWriter(filepath) as writer:
+        for df in chunks:
+            writer.write(df)
+    return writer.num_rows
+
+def get_api_records(url: str, session=None, **kwargs) -> list:
+    """Get json data from url"""
+    response = make_request_with_retry(url, session=session, **kwargs)
+    response.raise_for_status()
+    data = decode_json(response)
+    if "records" not in data:
+        return []
+    else:
+        return data["records"]
+
+def records_to_columns(records: list) -> dict:
+    """Transpose a page of records into columns, {field: [values]}. Fields missing from a record are None."""
+    if not records:
+        return {}
+    keys = records[0].keys()
+    if not all(record.keys() == keys for record in records):
+        keys = dict.fromkeys(key for record in records for key in record)
+    return {key: [record.get(key) for record in records] for key in keys}
+
+def concat_columns(pages) -> dict:
+    """Concatenate columnar pages (see `records_to_columns`) into one dict of lists, without building a dict per record.
+    Fields missing from a page are None."""
+    columns, num_rows = {}, 0
+    for page in pages:
+        size = len(next(iter(page.values()))) if page else 0
+        for key in page:
+            if key not in columns:
+                columns[key] = [None] * num_rows
+        for key, values in columns.items():
+            values.extend(page[key] if key in page else [None] * size)
+        num_rows += size
+    return columns
+
+def window_columns(pages, offset: int = 0, limit: int = None):
+    """Skip the first `offset` rows of columnar pages and stop after `limit` rows, see `concat_columns`."""
+    for page in pages:
+        size = len(next(iter(page.values()))) if page else 0
+        start = min(offset, size)
+        stop = size if limit is None else min(size, start + limit)
+        offset -= start
+        if limit is not None:
+            limit -= stop - start
+        yield page if (start, stop) == (0, size) else {key: values[start:stop] for key, values in page.items()}
+        if limit == 0:
+            return
+
+def get_api_columns(url: str, session=None) -> dict:
+    """Get the records at url as columns, see `records_to_columns`.
+    Transposed by the worker, which also halves the size of pages sent back by the process engine."""
+    return records_to_columns(get_api_records(url, session=session))
+
+def _get_api_records_or_error(url: str, session=None):
+    """`get_api_records` returning the error instead of raising it, for callers that skip failed pages."""
+    try:
+        return get_api_records(url, session=session)
+    except (RetryError, ValueError, *REQUEST_EXCEPTIONS) as e:
+        METRICS.inc("page_failures_total", endpoint="resource")
+        return RuntimeError(f"{type(e).__name__}: {e}")  # Picklable for the process engine
+
+def get_api_page(url: str, session=None, **kwargs) -> dict:
+    """Get the json response of a page of records, along with the "total", "count" and "field" metadata of the resource."""
+    response = make_request_with_retry(url, session=session, **kwargs)
+    response.raise_for_status()
+    data = decode_json(response)
+    data.setdefault("records", [])
+    return data
+
+# Smallest page planned by `adapt_batch_size`
+MIN_BATCH_SIZE = 100
+
+# Pages are sized so that a request takes about this many seconds, see `adapt_batch_size`
+TARGET_PAGE_SECONDS = 15.0
+
+def adapt_batch_size(batch_size: int, requested: int, received: int, seconds: float, more: bool = True) -> int:
+    """Size of the remaining pages of a request, from the first page.
+
+        batch_size: (int) - Requested page size, the result never exceeds it.
+        requested: (int) - Number of records requested in the first page.
+        received: (int) - Number of records received in the first page.
+        seconds: (float) - Time taken by the first page.
+        more: (bool) - Whether more records were available after the first page.
+
+    A first page with fewer records than requested while more were available means the API caps the page size,
+    later pages are capped to the same size. Pages slower than `TARGET_PAGE_SECONDS` are shrunk proportionally,
+    down to `MIN_BATCH_SIZE`, so that they stay clear of timeouts.
+    """
+    if more and 0 < received < requested:
+        batch_size = received
+    if received and seconds > TARGET_PAGE_SECONDS:
+        batch_size = min(batch_size, max(MIN_BATCH_SIZE, int(batch_size * TARGET_PAGE_SECONDS / seconds)))
+    return max(1, batch_size)
+
+def plan_windows(start: int, end: int, batch_size: int) -> list:
+    """Split the records from `start` to `end` into (offset, limit) pages of at most `batch_size` records."""
+    return [(i, min(batch_size, end - i)) for i in range(start, end, max(1, batch_size))]
+
+def merge_branches(opened) -> tuple:
+    """Merge the plans returned by `_open_request` for every branch of a query plan, in order.
+
+    Returns: (parameters of every page, {index of a page: records} of the pages already fetched, metadata of the first response)
+    """
+    param_list, prefetched, info = [], {}, {}
+    for branch_params, records, meta in opened:
+        if branch_params:
+            prefetched[len(param_list)] = records
+        param_list.extend(branch_params)
+        info = info or meta
+    return param_list, prefetched, info
+
+def split_chunks(buffer: list, page: list, chunksize: int = None) -> tuple:
+    """Add a page of records to `buffer` and split off every full chunk of `chunksize` records, see `iter_data`.
+    Every page is a chunk of its own if `chunksize` is None.
+
+    Returns: (list of chunks, records left in the buffer)
+    """
+    if chunksize is None:
+        return [page], buffer
+    buffer.extend(page)
+    num_full = len(buffer) // chunksize * chunksize
+    return [buffer[i : i + chunksize] for i in range(0, num_full, chunksize)], buffer[num_full:]
+
+def build_frame(data, field_info: list = None, typed: bool = False, dtype_backend: str = "numpy") -> pd.DataFrame:
+    """Build a DataFrame from a list of records or from columns (see `records_to_columns`). With `typed`, columns are
+    parsed using the field types of the resource in `field_info`, see `datagovindia.schema.apply_schema`."""
+    import pandas as pd
+    from datagovindia.schema import apply_schema
+
+    num_rows = len(data) if isinstance(data, list) else len(next(iter(data.values()), []))
+    with METRICS.stage("dataframe_build", num_rows):
+        frame = pd.DataFrame(data)
+    if not typed:
+        return frame
+    with METRICS.stage("apply_schema", len(frame)):
+        return apply_schema(frame, field_info, dtype_backend)
+
+def spool_page(url: str, path: str, session=None) -> int:
+    """Fetch the records at url and spool them to path, returns the number of records.
+    Records are written by the worker and never sent back to the parent process."""
+    records = get_api_records(url, session=session)
+    write_json_atomic(path, records)
+    return len(records)
+
+def get_data_njobs(url_list: list, njobs=None, engine: str = None, session=None) -> list:
+    """Get record data from url_list using njobs with graceful handling of KeyboardInterrupt.
+    `session` is only shared with the thread engine, each process of the process engine uses its own session."""
+    if resolve_engine(engine) == "thread":
+        session = session or get_session(resolve_njobs(njobs, engine))
+    else:
+        session = None
+    data = run_parallel(get_api_records, [(url, session) for url in url_list], njobs=njobs, engine=engine)
+
+    # Flatten the data after processing
+    data = [item for sublist in data for item in sublist]
+    return data
+
+class DataGovIndia:
+    """Python API-wrapper for Government of India’s [Open Government Data OGD platform](https://data.gov.in/)"""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        db_path: str = None,
+        validate_key: bool = False,
+        session=None,
+        http2: bool = False,
+        rate: float = None,
+        limiter: RateLimiter = None,
+        cache=None,
+    ):
+        """Initialize DataGovIndia object
+
+        api_key: str
+            API key for data.gov.in. If not provided, it will be read from the environment variable DATAGOVINDIA_API_KEY
+            If not found, it will raise an error.
+
+        db_path: str
+            Required only for searching the database.
+            Path to the database file. If not provided, it will be read from the environment variable DATAGOVINDIA_DB_PATH
+            If not found, it will be set to ~/datagovindia.db
+
+        session: requests.Session
+            HTTP session used for all requests made by this object. If not provided, a keep-alive session
+            is created for this object on its first request, see `create_session`.
+            Its default adapters are replaced by rate limited ones keeping their retry and pool settings,
+            custom adapter classes are kept as they are, see `mount_adapter`.
+
+        http2: bool
+            Create a dedicated HTTP/2 session for this object. Requires `pip install httpx[http2]`.
+
+        rate: float
+            Maximum number of requests per second sent by this object, across all threads.
+            If not provided, it will be read from the environment variable DATAGOVINDIA_RATE, no limit if not found.
+
+        limiter: RateLimiter
+            Rate limiter to use for all requests of this object, e.g. to share a limit between several objects.
+            Concurrency adapts to throttling (429/5xx responses, Retry-After headers) and latency, see `RateLimiter`.
+            With the process engine, worker processes use their own session limited by DATAGOVINDIA_RATE instead.
+
+        cache: bool, str or ResponseCache
+            Cache responses on disk, keyed by url without the API key. True uses ~/.datagovindia/cache.db, a string is used as the path.
+            If not provided, it will be read from the environment variable DATAGOVINDIA_CACHE, no cache if not found.
+            Only used when `session` is not provided. See `ResponseCache` for TTLs and size limits.
+        
+        """
+        self.api_key = api_key or os.environ.get("DATAGOVINDIA_API_KEY")
+        self.db_path = db_path or os.environ.get(
+            "DATAGOVINDIA_DB_PATH", os.path.join(os.path.expanduser("~"), "datagovindia.db")
+        )
+        self.limiter = limiter or RateLimiter(rate=resolve_rate(rate))
+        if isinstance(session, requests.Session):
+            mount_adapter(session, DEFAULT_THREAD_NJOBS, limiter=self.limiter)
+            if not all(isinstance(session.get_adapter(prefix), RateLimitedAdapter) for prefix in ("https://", "http://")):
+                logger.warning("Requests sent through the custom adapters of the session are not rate limited.")
+        # Created on first request, an object only reading or writing the database never opens a connection pool
+        self._session = session
+        self._session_options = {"http2": http2, "cache": resolve_cache(cache)}
+        self._pool_maxsize = DEFAULT_THREAD_NJOBS
+        if validate_key:            
+            self.validate_api_key()
+
+    @property
+    def session(self):
+        """HTTP session used for all requests of this object, created on first use if not passed in, see `create_session`."""
+        if self._session is None:
+            self._session = create_session(limiter=self.limiter, **self._session_options)
+        return self._session
+
+    def validate_api_key(self):
+        if not self.api_key:
+            # Raise error if API key is not found
+            raise ValueError(
+                "API key not found. Please set it as an environment variable `DATAGOVINDIA_API_KEY` or pass it as an argument while initializing the DataGovIndia object."
+            )        
+        if not check_api_key(self.api_key, session=self.session):
+            raise ValueError("Invalid API key. Please check if the API key is valid.")
+
+    def _session_for(self, njobs: int = None, engine: str = None):
+        """Session to share with the workers of an engine, growing its connection pool to `njobs`.
+        None for the process engine, where each worker process uses its own session."""
+        if resolve_engine(engine) != "thread":
+            return None
+        njobs = resolve_njobs(njobs, engine)
+        self.limiter.set_max_concurrency(njobs)
+        if njobs > self._pool_maxsize and isinstance(self.session, requests.Session):
+            mount_adapter(self.session, njobs, limiter=self.limiter)
+            self._pool_maxsize = njobs
+        return self.session
+        
+
+    def connect(self, verify: bool = False):
+        """Connect to datagovindia.db sqlite database using a context manager"""
+        conn = sqlite3.connect(self.db_path)
+        conn.create_function("regexmatch", 2, regexmatch)
+        # `INSERT OR REPLACE` fires delete triggers only with recursive triggers enabled,
+        # which keeps `resources_fts` in sync with `resources`.
+        conn.execute("PRAGMA recursive_triggers = ON")
+        if verify:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='resources'")
+                if cursor.fetchone() is None:
+                    raise ValueError(
+                        f"""
+                        Could not find tables in {self.db_path}.
+                        If this is the first time you are using this package, please run the following commands:
+                            >>> from datagovindia import DataGovIndia
+                            >>> data_gov = DataGovIndia()
+                            >>> data_gov.update_metadata()
+                        """
+                    )
+        return conn
+
+    def search(
+        self,
+        query: str = None,
+        search_fields: list = ["title"],
+        sort_by: str = None,
+        ascending: bool = True,
+        mode: str = "fts",
+        orgs: list = None,
+        sectors: list = None,
+        field_ids: list = None,
+        org_type: str = None,
+        source: str = None,
+        updated_after: str = None,
+        updated_before: str = None,
+    ) -> pd.DataFrame:
+        """Search for a query in the database.
+
+            query: (str) - Search query. See `build_fts_query` for the supported syntax in "fts" mode.
+            Can be empty to list every resource matching the filters below.
+
+            search_fields: (list) - Fields to search in. Defaults to ["title"].
+
+            sort_by: (str) - Field to sort results by. Defaults to None, which sorts by relevance in "fts" mode.
+
+            ascending: (bool) - Whether to sort results in ascending order. Defaults to True.
+
+            mode: (str) - "fts" to use the full-text index (default) or "regex" to scan every row with `regexmatch`.
+
+        Faceted filters, answered from indexes and combined with AND:
+
+            orgs: (list) - Organisation names, resources of any of them match (case-insensitive exact names).
+
+            sectors: (list) - Sector names, resources in any of them match (case-insensitive exact names).
+
+            field_ids: (list) - Field ids, resources having any of these fields match.
+
+            org_type: (str) - Organisation type, e.g. "Central" or "State".
+
+            source: (str) - Source of the resource, e.g. "data.gov.in".
+
+            updated_after: (str) - Only resources updated on or after this date.
+
+            updated_before: (str) - Only resources updated before this date.
+
+        Returns: pd.DataFrame
+        """
+        if mode not in ("fts", "regex"):
+            raise ValueError(f"Invalid search mode {mode}, valid modes are ['fts', 'regex']")
+        import pandas as pd
+
+        conditions, params = self._facet_conditions(
+            orgs=orgs,
+            sectors=sectors,
+            field_ids=field_ids,
+            org_type=org_type,
+            source=source,
+            updated_after=updated_after,
+            updated_before=updated_before,
+        )
+        with self.connect(verify=True) as conn:
+            cursor = conn.cursor()
+            # Searches never change the database, older databases are migrated by `ensure_schema`
+            if (orgs or sectors or field_ids) and not self._has_facet_tables(conn):
+                raise ValueError(
+                    f"The database {self.db_path} has no organisation, sector and field tables. "
+                    "Run `sync_metadata()` or `ensure_schema()` to build them."
+                )
+            if query and mode == "fts" and not self._has_fts_index(conn):
+                logger.warning(
+                    f"The database {self.db_path} has no full-text index, scanning every resource instead. "
+                    "Run `sync_metadata()` or `ensure_schema()` to build it."
+                )
+                mode = "regex"
+            if not query:
+                sql_query = self.gen_filter_query(conditions, sort_by, ascending)
+                cursor.execute(sql_query, params)
+            elif mode == "fts":
+                sql_query = self.gen_fts_query(search_fields, sort_by, ascending, conditions)
+                try:
+                    cursor.execute(sql_query, (build_fts_query(query, search_fields), *params))
+                except sqlite3.OperationalError as e:
+                    raise ValueError(f"Invalid search query '{query}': {e}")
+            else:
+                sql_query = self.gen_sql_query(query, search_fields, sort_by, ascending, conditions)
+                cursor.execute(sql_query, params)
+            keys = [desc[0] for desc in cursor.description]
+            values = cursor.fetchall()
+            records = [dict(zip(keys, row)) for row in values]
+            data = pd.DataFrame(records)
+            if len(data) > 0:
+                for col in ["fields", "orgs", "sectors"]:
+                    data[col] = data[col].str.split(" | ", regex=False)
+        return data
+
+    def gen_sql_query(
+        self,
+        query: str,
+        search_fields: list = ["title"],
+        sort_by: str = None,
+        ascending: bool = True,
+        conditions: list = None,
+    ) -> str:
+        """Construct SQL query for searching the database, `conditions` are extra SQL conditions ANDed with the search."""
+        searchable_attributes = SEARCHABLE_ATTRIBUTES
+        sql_query = "SELECT * FROM resources WHERE ("
+        for field in search_fields:
+            if field not in searchable_attributes:
+                raise ValueError(f"Invalid search field {field}, valid fields are {searchable_attributes}")
+            sql_query += f"regexmatch({field}, '{query}') OR "
+        sql_query = sql_query[:-4] + ")"  # Remove the last " OR "
+        for condition in conditions or []:
+            sql_query += f" AND {condition}"
+        if sort_by:
+            assert (
+                sort_by in searchable_attributes
+            ), f"Invalid sort_by field {sort_by}, valid fields are {searchable_attributes}"
+            sql_query += f" ORDER BY {sort_by} {'ASC' if ascending else 'DESC'}"
+        return sql_query
+
+    def gen_fts_query(
+        self, search_fields: list = ["title"], sort_by: str = None, ascending: bool = True, conditions: list = None
+    ) -> str:
+        """Construct SQL query for searching the full-text index, ranked by bm25 unless `sort_by` is given.
+        The MATCH expression is passed as a parameter, see `build_fts_query`."""
+        weights = ", ".join(str(weight) for weight in FTS_ATTRIBUTES.values())
+        sql_query = (
+            "SELECT resources.* FROM resources_fts "
+            "JOIN resources ON resources.rowid = resources_fts.rowid "
+            "WHERE resources_fts MATCH ?"
+        )
+        for condition in conditions or []:
+            sql_query += f" AND {condition}"
+        if sort_by:
+            assert (
+                sort_by in SEARCHABLE_ATTRIBUTES
+            ), f"Invalid sort_by field {sort_by}, valid fields are {SEARCHABLE_ATTRIBUTES}"
+            sql_query += f" ORDER BY resources.{sort_by} {'ASC' if ascending else 'DESC'}"
+        else:
+            sql_query += f" ORDER BY bm25(resources_fts, {weights})"
+        return sql_query
+
+    def gen_filter_query(self, conditions: list = None, sort_by: str = None, ascending: bool = True) -> str:
+        """Construct SQL query listing the resources matching `conditions`, without a search query."""
+        sql_query = "SELECT resources.* FROM resources"
+        if conditions:
+            sql_query += " WHERE " + " AND ".join(conditions)
+        if sort_by:
+            assert (
+                sort_by in SEARCHABLE_ATTRIBUTES
+            ), f"Invalid sort_by field {sort_by}, valid fields are {SEARCHABLE_ATTRIBUTES}"
+            sql_query += f" ORDER BY resources.{sort_by} {'ASC' if ascending else 'DESC'}"
+        return sql_query
+
+    def _facet_conditions(
+        self,
+        orgs: list = None,
+        sectors: list = None,
+        field_ids: list = None,
+        org_type: str = None,
+        source: str = None,
+        updated_after: str = None,
+        updated_before: str = None,
+    ) -> tuple:
+        """Translate faceted search filters into SQL conditions on `resources` and their parameters."""
+        conditions, params = [], []
+        for table, values in (("resource_org", orgs), ("resource_sector", sectors), ("resource_field", field_ids)):
+            if not values:
+                continue
+            values = [values] if isinstance(values, str) else list(values)
+            key = FACET_TABLES[table][0]
+            placeholders = ", ".join(["?"] * len(values))
+            conditions.append(f"resources.resource_id IN (SELECT resource_id FROM {table} WHERE {key} IN ({placeholders}))")
+            params.extend(values)
+        for column, value in (("org_type", org_type), ("source", source)):
+            if value:
+                conditions.append(f"resources.{column} = ?")
+                params.append(value)
+        for operator, value in ((">=", updated_after), ("<", updated_before)):
+            if value:
+                date = normalize_date(str(value))
+                if date is None:
+                    raise ValueError(f"Invalid date {value}")
+                conditions.append(f"resources.date_updated {operator} ?")
+                params.append(date)
+        return conditions, params
+
+    def _has_facet_tables(self, conn) -> bool:
+        """Check if the join tables of `FACET_TABLES` exist."""
+        placeholders = ", ".join(["?"] * len(FACET_TABLES))
+        cursor = conn.execute(
+            f"SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ({placeholders})", tuple(FACET_TABLES)
+        )
+        return cursor.fetchone()[0] == len(FACET_TABLES)
+
+    def _has_fts_index(self, conn) -> bool:
+        """Check if the `resources_fts` full-text index exists."""
+        cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='resources_fts'")
+        return cursor.fetchone() is not None
+
+    def rebuild_search_index(self):
+        """Rebuild the `resources_fts` full-text index from the `resources` table."""
+        with self.connect(verify=True) as conn:
+            conn.execute("INSERT INTO resources_fts(resources_fts) VALUES('rebuild')")
+            conn.commit()
+
+    def get_resource_info(self, resource_id: str, filters: Dict[str, str] = None) -> dict:
+        """Fetches information about a resource. With `filters`, "total" is the number of records matching them."""
+        url = build_url(
+            api_key=self.api_key,
+            resource_id=resource_id,
+            filters=filters or {},
+            fields=[],
+            sort_by="",
+            sort_order="asc",
+            offset=0,
+            limit=0,
+        )
+        api_info = get_api_info(url, session=self.session)
+        return api_info
+
+    def get_update_info(self) -> dict:
+        """Fetches information about the last update of the database."""
+        with self.connect(verify=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {', '.join(METADATA_COLUMNS)} FROM metadata ORDER BY id DESC LIMIT 1")
+            info_ = dict(zip(METADATA_COLUMNS, cursor.fetchone()))
+        return info_
+
+    def get_data(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        njobs: int = None,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        engine: str = None,
+        chunksize: int = None,
+        resume: bool = False,
+        checkpoint_dir: str = None,
+        typed: bool = False,
+        dtype_backend: str = "numpy",
+        where=None,
+        use_mirror: bool = False,
+        mirror_dir: str = None,
+    ) -> pd.DataFrame:
+        """Returns requested data as a pandas dataframe.
+            resource_id: (str) (required) - Unique identifier of the resource.
+
+            sort_by: (str) - Field to sort results by. Defaults to None.
+
+            ascending: (bool) - Whether to sort results in ascending order. Defaults to True. Only applicable if sort_by is not None.
+
+            offset: (int) - Offset of the records to be fetched. Defaults to 0.
+
+            batch_size: (int) - Number of records to be fetched in a single request. Defaults to 2000.
+            Increasing batch_size will increase the speed of data collection but will also increase the memory usage. Reduce `batch_size` if you are facing memory issues or timeout errors.
+
+            limit: (int) - Number of records to be fetched. Defaults to None. If None, it will be set to the total number of records available in the resource.
+
+            filters: (dict) - Filters to be applied on the records, should be a dict of the form {<field>:<value>}.
+
+            fields: (list) - Fields to be fetched. Defaults to []. Use `.get_resource_info` to get a list of all available fields for a resource.
+
+            njobs: (int) - Number of parallel requests to use for collecting data. Defaults to None, see `resolve_njobs`.
+
+            engine: (str) - "thread" or "process". Defaults to None, which uses the `DATAGOVINDIA_ENGINE` environment variable or "thread".
+
+            chunksize: (int) - Return an iterator of DataFrames with `chunksize` rows each instead of a single DataFrame. See `iter_data`.
+
+            resume: (bool) - Spool every completed page to a checkpoint on disk, and only fetch the pages missing from
+            the checkpoint of a previous, interrupted call with the same arguments. The checkpoint is deleted once all pages are fetched.
+
+            checkpoint_dir: (str) - Directory to store checkpoints in. Defaults to the environment variable
+            DATAGOVINDIA_CHECKPOINT_DIR or ~/.datagovindia/checkpoints
+
+            typed: (bool) - Parse columns into numeric, datetime and categorical dtypes using the field types of the resource.
+            Defaults to False, which returns every column as strings.
+
+            dtype_backend: (str) - "numpy" (default) or "pyarrow" for Arrow-backed dtypes. Only applicable if typed is True.
+
+            where: (dict or list) - Predicates the records must match, see `datagovindia.query.parse_where`, e.g.
+            {"state": ["Kerala", "Goa"], "year": {">=": 2015}}. Equality predicates are sent to the API as filters,
+            `in` predicates fan out into one filtered request per value, and the rest are applied locally to each page.
+            `offset` and `limit` then apply to the matching records. With a fan-out, records are sorted within
+            each value of the `in` list.
+
+            use_mirror: (bool) - Serve the request from a local mirror of the whole resource, see `sync_mirror`.
+            The mirror is refreshed first if the resource changed, downloading only the new records when records
+            were appended. sort_by, offset, limit, filters, fields and where are then applied locally, sorting as strings.
+            Requires pyarrow.
+
+            mirror_dir: (str) - Directory to store mirrors in. Defaults to the environment variable
+            DATAGOVINDIA_MIRROR_DIR or ~/.datagovindia/mirror
+
+        
+        Returns: pd.Dataframe        
+        """
+        if use_mirror:
+            return self._get_mirrored_data(
+                resource_id,
+                sort_by=sort_by,
+                ascending=ascending,
+                offset=offset,
+                batch_size=batch_size,
+                njobs=njobs,
+                limit=limit,
+                filters=filters,
+                fields=fields,
+                engine=engine,
+                chunksize=chunksize,
+                typed=typed,
+                dtype_backend=dtype_backend,
+                where=where,
+                mirror_dir=mirror_dir,
+            )
+        if chunksize is not None:
+            return self.iter_data(
+                resource_id,
+                sort_by=sort_by,
+                ascending=ascending,
+                offset=offset,
+                batch_size=batch_size,
+                njobs=njobs,
+                limit=limit,
+                filters=filters,
+                fields=fields,
+                engine=engine,
+                chunksize=chunksize,
+                resume=resume,
+                checkpoint_dir=checkpoint_dir,
+                typed=typed,
+                dtype_backend=dtype_backend,
+                where=where,
+            )
+        pages, info = self._open_pages(
+            resource_id,
+            sort_by=sort_by,
+            ascending=ascending,
+            offset=offset,
+            batch_size=batch_size,
+            njobs=njobs,
+            limit=limit,
+            filters=filters,
+            fields=fields,
+            engine=engine,
+            resume=resume,
+            checkpoint_dir=checkpoint_dir,
+            where=where,
+            columnar=True,
+        )
+        columns = concat_columns(pages)
+        return build_frame(columns, self._field_info(resource_id, info) if typed else None, typed, dtype_backend)
+
+    def iter_data(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        njobs: int = None,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        engine: str = None,
+        chunksize: int = None,
+        as_frame: bool = True,
+        resume: bool = False,
+        checkpoint_dir: str = None,
+        typed: bool = False,
+        dtype_backend: str = "numpy",
+        where=None,
+    ):
+        """Yields requested data in chunks as pages arrive, in the order of the records.
+            Takes the same arguments as `get_data`, and:
+
+            chunksize: (int) - Number of rows in each chunk. Defaults to None, which yields one chunk per page of `batch_size` records.
+
+            as_frame: (bool) - Yield pandas DataFrames if True (default), lists of record dicts otherwise.
+
+            At most 2 * njobs pages are fetched ahead of the consumer, so peak memory depends on `njobs` and `batch_size`
+            and not on the size of the resource.
+
+            resume: (bool) - Resume from the checkpoint of a previous, interrupted call, see `get_data`.
+
+            typed: (bool) - Parse each chunk into typed columns, see `get_data`. Only applicable if as_frame is True.
+
+            where: (dict or list) - Predicates the records must match, see `get_data`.
+
+        Returns: Iterator[pd.DataFrame]
+        """
+        pages, info = self._open_pages(
+            resource_id,
+            sort_by=sort_by,
+            ascending=ascending,
+            offset=offset,
+            batch_size=batch_size,
+            njobs=njobs,
+            limit=limit,
+            filters=filters,
+            fields=fields,
+            engine=engine,
+            resume=resume,
+            checkpoint_dir=checkpoint_dir,
+            where=where,
+        )
+        field_info = self._field_info(resource_id, info) if typed and as_frame else None
+        buffer = []
+        for page in pages:
+            chunks, buffer = split_chunks(buffer, page, chunksize)
+            for chunk in chunks:
+                yield build_frame(chunk, field_info, typed, dtype_backend) if as_frame else chunk
+        if buffer:
+            yield build_frame(buffer, field_info, typed, dtype_backend) if as_frame else buffer
+
+    def get_data_many(
+        self,
+        resource_ids: list,
+        output_dir: str = None,
+        file_format: str = "csv",
+        batch_size: int = 2000,
+        njobs: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        engine: str = None,
+        typed: bool = False,
+        dtype_backend: str = "numpy",
+    ) -> dict:
+        """Download several resources at once, sharing one pool of workers, connection pool and rate limit.
+
+            resource_ids: (list) - Unique identifiers of the resources, e.g. the resource_id column of `search` results.
+
+            output_dir: (str) - Directory to write one file per resource to, named <resource_id>.<file_format>.
+            Defaults to None, which returns the data of every resource as a DataFrame.
+
+            file_format: (str) - "csv" (default), "jsonl", "parquet" or "feather". See `save_dataframe_chunks`.
+
+            batch_size, njobs, filters, fields, engine, typed, dtype_backend: see `get_data`, applied to every resource.
+
+        The first page of every resource is fetched first, then the remaining pages of all resources are interleaved
+        round-robin on the same workers, so a few large resources do not hold up the others. Pages are written to
+        their file in order as soon as they can be.
+
+        Resources that cannot be fetched are logged and skipped.
+
+        Returns: dict - resource_id -> number of records written, or DataFrame if output_dir is None.
+        """
+        import pandas as pd
+
+        resource_ids = list(dict.fromkeys(resource_ids))
+        extension = "." + file_format.lstrip(".")
+        if output_dir is not None:
+            if extension not in STREAMING_EXTENSIONS:
+                raise ValueError(f"Invalid file format {file_format}, valid formats are {STREAMING_EXTENSIONS}")
+            os.makedirs(output_dir, exist_ok=True)
+        session = self._session_for(njobs, engine)
+
+        def open_request(resource_id):
+            try:
+                return self._open_request(resource_id, batch_size=batch_size, filters=filters, fields=fields, session=session)
+            except (RetryError, ValueError, *REQUEST_EXCEPTIONS) as e:
+                logger.error(f"Skipping resource {resource_id}: {e}")
+                return None
+
+        opened = run_parallel(open_request, [(rid,) for rid in resource_ids], njobs=njobs, engine="thread")
+
+        results = {}
+        sinks = {}  # resource_id -> output of a resource still being written, see `open_sink`
+
+        def open_sink(resource_id, field_info, num_pages):
+            path = None if output_dir is None else os.path.join(output_dir, f"{resource_id}{extension}")
+            sinks[resource_id] = {
+                "path": path,
+                "output": [] if path is None else ChunkWriter(path),
+                "field": field_info,
+                "next_page": 0,
+                "num_pages": num_pages,
+                "waiting": {},  # Page index -> records of pages that completed before an earlier page
+            }
+
+        def write_page(resource_id, index, records):
+            """Write the pages of a resource in order, closing its output after the last page."""
+            sink = sinks[resource_id]
+            sink["waiting"][index] = records
+            while sink["next_page"] in sink["waiting"]:
+                data = build_frame(sink["waiting"].pop(sink["next_page"]), sink["field"], typed, dtype_backend)
+                if sink["path"] is None:
+                    sink["output"].append(data)
+                else:
+                    sink["output"].write(data)
+                sink["next_page"] += 1
+            if sink["next_page"] == sink["num_pages"]:
+                sinks.pop(resource_id)
+                if sink["path"] is None:
+                    results[resource_id] = pd.concat(sink["output"], ignore_index=True) if sink["output"] else pd.DataFrame()
+                else:
+                    results[resource_id] = sink["output"].close()
+
+        def discard(resource_id, error):
+            logger.error(f"Skipping resource {resource_id}: {error}")
+            sink = sinks.pop(resource_id)
+            results[resource_id] = None
+            if sink["path"] is not None:
+                sink["output"].close()
+                os.remove(sink["path"])
+
+        queues = []
+        try:
+            for resource_id, request in zip(resource_ids, opened):
+                if request is None:
+                    results[resource_id] = None
+                    continue
+                param_list, records, meta = request
+                field_info = (meta.get("field") or self.get_resource_info(resource_id).get("field")) if typed else None
+                open_sink(resource_id, field_info, max(1, len(param_list)))
+                write_page(resource_id, 0, records)
+                queues.append([(resource_id, i, params) for i, params in enumerate(param_list[1:], start=1)])
+
+            # Round-robin over resources: the n-th page of every resource is scheduled before any (n+1)-th page
+            schedule = [page for pages in zip_longest(*queues) for page in pages if page is not None]
+            fetched = iter_parallel(
+                _get_api_records_or_error,
+                ((build_url(api_key=self.api_key, **params), session) for _, _, params in schedule),
+                njobs=njobs,
+                engine=engine,
+                ordered=False,
+            )
+            for k, records in fetched:
+                resource_id, index, _ = schedule[k]
+                if resource_id not in sinks:
+                    continue  # An earlier page of the resource failed
+                if isinstance(records, Exception):
+                    discard(resource_id, records)
+                else:
+                    write_page(resource_id, index, records)
+        finally:
+            for sink in sinks.values():
+                if sink["path"] is not None:
+                    sink["output"].close()
+        return results
+
+    def sync_mirror(
+        self, resource_id: str, batch_size: int = 2000, njobs: int = None, engine: str = None, mirror_dir: str = None
+    ) -> dict:
+        """Bring the local mirror of a resource up to date with the OGD platform, see `datagovindia.mirror`.
+
+        The mirror is left as is while the "updated" date and "total" reported by the platform are unchanged.
+        If records were only appended, which is checked by fetching the last mirrored record again, only the new
+        records are downloaded. Otherwise the resource is downloaded again and swapped in once complete.
+        If the platform cannot be reached, an existing mirror is served as is.
+
+        Returns: dict - manifest of the mirror.
+        """
+        from datagovindia.mirror import DatasetMirror
+
+        mirror = DatasetMirror(mirror_dir)
+        manifest = mirror.manifest(resource_id)
+        info = self.get_resource_info(resource_id)
+        if "total" not in info:
+            if manifest is None:
+                raise ValueError(f"Could not fetch information about resource {resource_id}")
+            logger.warning(f"Could not reach the OGD platform, serving the mirror of {resource_id} as is.")
+            return manifest
+        version = {"updated": info.get("updated"), "updated_date": info.get("updated_date"), "total": int(info["total"])}
+        if manifest is not None and all(manifest.get(key) == value for key, value in version.items()):
+            return manifest
+
+        field_ids = {f["id"] for f in info.get("field") or [] if "id" in f}
+        if (
+            manifest is not None
+            and manifest["num_records"] < version["total"]
+            and (not field_ids or not manifest["columns"] or field_ids == set(manifest["columns"]))
+            and self._mirror_tail_matches(resource_id, manifest)
+        ):
+            logger.info(f"Appending {version['total'] - manifest['num_records']} new records to the mirror of {resource_id}")
+            pages, _ = self._open_pages(
+                resource_id, offset=manifest["num_records"], batch_size=batch_size, njobs=njobs, engine=engine, columnar=True
+            )
+            return mirror.append(resource_id, pages, version)
+
+        logger.info(f"Downloading {version['total']} records to the mirror of {resource_id}")
+        pages, meta = self._open_pages(resource_id, batch_size=batch_size, njobs=njobs, engine=engine, columnar=True)
+        return mirror.replace(resource_id, pages, version, field=info.get("field") or meta.get("field"))
+
+    def _mirror_tail_matches(self, resource_id: str, manifest: dict) -> bool:
+        """Whether the last mirrored record is still at the same position, i.e. records were only appended since."""
+        if not manifest["num_records"]:
+            return True
+        url = build_url(api_key=self.api_key, resource_id=resource_id, offset=manifest["num_records"] - 1, limit=1)
+        try:
+            records = get_api_records(url, session=self.session)
+        except (RetryError, ValueError, *REQUEST_EXCEPTIONS):
+            return False
+
+        def as_strings(record):
+            return {key: None if value is None else str(value) for key, value in record.items()}
+
+        return bool(records) and as_strings(records[0]) == as_strings(manifest["last_record"] or {})
+
+    def _get_mirrored_data(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        njobs: int = None,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        engine: str = None,
+        chunksize: int = None,
+        typed: bool = False,
+        dtype_backend: str = "numpy",
+        where=None,
+        mirror_dir: str = None,
+    ):
+        """`get_data` served from the local mirror of a resource, see `get_data` for the arguments."""
+        from datagovindia.mirror import DatasetMirror
+        from datagovindia.query import parse_where, filter_frame
+        from datagovindia.schema import apply_schema
+
+        manifest = self.sync_mirror(resource_id, batch_size=batch_size, njobs=njobs, engine=engine, mirror_dir=mirror_dir)
+        predicates = [(field, "==", value) for field, value in (filters or {}).items()] + parse_where(where)
+        # Only read the columns needed to filter, sort and return the records
+        columns = None
+        if fields:
+            columns = list(dict.fromkeys([*fields, *(p[0] for p in predicates), *([sort_by] if sort_by else [])]))
+        data = DatasetMirror(mirror_dir).read(resource_id, columns=columns)
+        data = filter_frame(data, predicates)
+        if sort_by:
+            data = data.sort_values(sort_by, ascending=ascending, kind="stable")
+        data = data.iloc[offset : None if limit is None else offset + limit]
+        if fields:
+            data = data[[field for field in fields if field in data.columns]]
+        data = data.reset_index(drop=True)
+        if typed:
+            data = apply_schema(data, manifest.get("field"), dtype_backend)
+        if chunksize is not None:
+            return (data.iloc[i : i + chunksize].reset_index(drop=True) for i in range(0, len(data), chunksize))
+        return data
+
+    def plan_data_shards(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        njobs: int = None,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        where=None,
+        shard_dir: str = None,
+    ) -> str:
+        """Plan the pages requested by `get_data` as the units of a sharded job, see `datagovindia.shard`.
+            Takes the same arguments as `get_data`, and:
+
+            shard_dir: (str) - Shard directory shared with the workers. Defaults to the environment variable
+            DATAGOVINDIA_SHARD_DIR or ~/.datagovindia/shards
+
+        The first page of every request is fetched to plan the remaining pages and stored as a completed unit.
+        The other pages are fetched by `run_shard_worker` and assembled by `merge_shards`. Predicates of `where`
+        that are not sent to the API are applied by the workers, `offset` and `limit` then apply to the merged records.
+        Planning the same request again before it is merged returns the existing job.
+
+        Returns: (str) - id of the job.
+        """
+        from datagovindia.query import plan_request
+        from datagovindia.shard import WorkQueue
+
+        predicates, branches, residual, local_window = plan_request(where, filters)
+        param_list, prefetched, info = self._open_branches(
+            resource_id, branches, sort_by, ascending, offset, batch_size, njobs, limit, fields, "thread", local_window
+        )
+        params = {
+            "resource_id": resource_id,
+            "sort_by": sort_by,
+            "ascending": ascending,
+            "offset": offset,
+            "limit": limit,
+            "batch_size": batch_size,
+            "filters": filters or {},
+            "fields": list(fields or []),
+            "where": predicates,
+        }
+        units = [{"filters": p["filters"], "offset": p["offset"], "limit": p["limit"]} for p in param_list]
+        state = {"field": info.get("field"), "residual": residual, "local_window": local_window}
+        work_queue = WorkQueue(shard_dir)
+        job_id = work_queue.create_job("get_data", params, units, state=state)
+        for unit, records in prefetched.items():
+            if residual:
+                from datagovindia.query import filter_records
+
+                records = filter_records(records, residual)
+            work_queue.write_unit(job_id, unit, records_to_columns(records))
+            work_queue.complete(job_id, unit, len(records))
+        logger.info(f"Planned {len(units)} units of {resource_id} as job {job_id} in {work_queue.root}")
+        return job_id
+
+    def plan_sync_shards(self, batch_size: int = 1000, shard_dir: str = None) -> str:
+        """Plan a full `sync_metadata` as the units of a sharded job, one unit per page of `batch_size` resources,
+        see `datagovindia.shard`. Units are fetched by `run_shard_worker` and loaded into the database by `merge_shards`.
+        Planning again before the merge, with the same number of available resources, returns the existing job.
+
+        Returns: (str) - id of the job.
+        """
+        from datagovindia.shard import WorkQueue
+
+        _num_available = get_total_available_resources(session=self.session)
+        units = [{"start": start, "end": min(_num_available, start + batch_size)} for start in range(0, _num_available, batch_size)]
+        work_queue = WorkQueue(shard_dir)
+        job_id = work_queue.create_job(
+            "sync_metadata",
+            {"num_available": _num_available, "batch_size": batch_size},
+            units,
+            state={"num_available": _num_available},
+        )
+        logger.info(f"Planned {len(units)} units of the catalog as job {job_id} in {work_queue.root}")
+        return job_id
+
+    def run_shard_worker(
+        self, job_id: str = None, njobs: int = None, shard_dir: str = None, worker_id: str = None, lease: float = None
+    ) -> int:
+        """Claim and fetch the units of sharded jobs until none is left to claim, see `datagovindia.shard`.
+        Run it in as many processes, or on as many hosts, as needed with the same shard directory.
+
+            job_id: (str) - Only work on this job. Defaults to None, which works on every job of the queue, oldest first.
+
+            njobs: (int) - Number of units fetched in parallel by this worker. Defaults to None, see `resolve_njobs`.
+
+            shard_dir: (str) - Shard directory. Defaults to the environment variable DATAGOVINDIA_SHARD_DIR or ~/.datagovindia/shards
+
+            worker_id: (str) - Name of this worker in the queue. Defaults to <hostname>:<pid>.
+
+            lease: (float) - Seconds after which a unit claimed by another worker that did not complete it is claimed again.
+            Defaults to `DEFAULT_LEASE_SECONDS`, it must be longer than a unit takes to fetch.
+
+        A unit that fails is given back to the queue and retried by any worker, see `WorkQueue.fail`.
+        On KeyboardInterrupt, the units in flight are completed before exiting.
+
+        Returns: (int) - number of units completed by this worker.
+        """
+        from datagovindia.shard import WorkQueue, default_worker_id, DEFAULT_LEASE_SECONDS
+
+        work_queue = WorkQueue(shard_dir, lease=lease or DEFAULT_LEASE_SECONDS)
+        worker_id = worker_id or default_worker_id()
+        njobs = resolve_njobs(njobs, "thread")
+        session = self._session_for(njobs, "thread")
+        jobs = {}  # Job id -> job, read once per job
+        stop = threading.Event()
+
+        def work() -> int:
+            completed = 0
+            while not stop.is_set():
+                unit = work_queue.claim(worker_id, job_id)
+                if unit is None:
+                    return completed
+                if unit["job_id"] not in jobs:
+                    jobs[unit["job_id"]] = work_queue.job(unit["job_id"])
+                try:
+                    num_records = self._run_shard_unit(work_queue, jobs[unit["job_id"]], unit, session)
+                except (RetryError, ValueError, *REQUEST_EXCEPTIONS) as e:
+                    logger.error(f"Unit {unit['unit']} of job {unit['job_id']} failed: {e}")
+                    work_queue.fail(unit["job_id"], unit["unit"], f"{type(e).__name__}: {e}")
+                    continue
+                work_queue.complete(unit["job_id"], unit["unit"], num_records)
+                completed += 1
+            return completed
+
+        executor = ThreadPoolExecutor(max_workers=njobs)
+        futures = [executor.submit(work) for _ in range(njobs)]
+        try:
+            completed = sum(future.result() for future in futures)
+        except KeyboardInterrupt:
+            logger.warning("Received KeyboardInterrupt, completing the units in flight...")
+            stop.set()
+            raise
+        finally:
+            executor.shutdown(wait=True)
+        logger.info(f"Worker {worker_id} completed {completed} units.")
+        return completed
+
+    def _run_shard_unit(self, work_queue, job: dict, unit: dict, session=None) -> int:
+        """Fetch a unit of a sharded job and write its output, returns the number of records."""
+        params = unit["params"]
+        if job["kind"] == "sync_metadata":
+            records = _fetch_metadata(self.api_key, params["start"], params["end"], 1, session)
+            work_queue.write_unit(job["job_id"], unit["unit"], records)
+            return len(records)
+        request = job["params"]
+        url = build_url(
+            api_key=self.api_key,
+            **self._request_params(
+                request["resource_id"], request["sort_by"], request["ascending"], params["filters"], request["fields"]
+            ),
+            offset=params["offset"],
+            limit=params["limit"],
+        )
+        records = get_api_records(url, session=session)
+        residual = [tuple(predicate) for predicate in job["state"]["residual"]]
+        if residual:
+            from datagovindia.query import filter_records
+
+            records = filter_records(records, residual)
+        work_queue.write_unit(job["job_id"], unit["unit"], records_to_columns(records))
+        return len(records)
+
+    def merge_shards(
+        self,
+        job_id: str,
+        output: str = None,
+        typed: bool = False,
+        dtype_backend: str = "numpy",
+        shard_dir: str = None,
+        keep: bool = False,
+    ):
+        """Assemble the outputs of a completed sharded job, see `datagovindia.shard`.
+
+            job_id: (str) - Job returned by `plan_data_shards` or `plan_sync_shards`.
+
+            output: (str) - Save the records of a get_data job to this file instead of returning them. CSV, JSONL,
+            Parquet and Feather files are written unit by unit, see `ChunkWriter`.
+
+            typed: (bool) - Parse the records of a get_data job into typed columns, see `get_data`.
+
+            dtype_backend: (str) - "numpy" (default) or "pyarrow", see `get_data`.
+
+            shard_dir: (str) - Shard directory. Defaults to the environment variable DATAGOVINDIA_SHARD_DIR or ~/.datagovindia/shards
+
+            keep: (bool) - Keep the job and the outputs of its units once merged. Defaults to False, which deletes them.
+
+        A sync_metadata job is loaded into the database like a full bulk `sync_metadata`.
+
+        Returns: pd.DataFrame for a get_data job, the number of records if `output` is given,
+        the number of resources in the database for a sync_metadata job.
+        """
+        from datagovindia.shard import WorkQueue
+
+        work_queue = WorkQueue(shard_dir)
+        job = work_queue.job(job_id)
+        if job is None:
+            raise ValueError(f"No sharded job '{job_id}' in {work_queue.root}")
+        progress = work_queue.progress(job_id)
+        if progress["done"] != progress["units"]:
+            raise ValueError(
+                f"Sharded job '{job_id}' is not complete: {progress['done']} of {progress['units']} units done, "
+                f"{progress['failed']} failed. Run more workers, after `WorkQueue.retry_failed` if units failed."
+            )
+        if job["kind"] == "sync_metadata":
+            result = self._merge_sync_shards(work_queue, job)
+        else:
+            result = self._merge_data_shards(work_queue, job, output=output, typed=typed, dtype_backend=dtype_backend)
+        if not keep:
+            work_queue.remove(job_id)
+        return result
+
+    def _merge_data_shards(self, work_queue, job: dict, output: str = None, typed: bool = False, dtype_backend: str = "numpy"):
+        """Records of a get_data job in the order of its units, see `merge_shards`."""
+        import pandas as pd
+        from datagovindia.schema import apply_schema
+
+        request, state = job["params"], job["state"]
+        pages = (work_queue.read_unit(job["job_id"], unit) for unit in range(job["num_units"]))
+        if state["local_window"]:
+            pages = window_columns(pages, request["offset"], request["limit"])
+        field_info = self._field_info(request["resource_id"], state) if typed else None
+
+        def to_frame(columns):
+            with METRICS.stage("dataframe_build", len(next(iter(columns.values()), []))):
+                data = pd.DataFrame(columns)
+            if not typed:
+                return data
+            with METRICS.stage("apply_schema", len(data)):
+                return apply_schema(data, field_info, dtype_backend)
+
+        if output is not None and os.path.splitext(output)[-1] in STREAMING_EXTENSIONS:
+            return save_dataframe_chunks((to_frame(page) for page in pages if page), output)
+        data = to_frame(concat_columns(pages))
+        if output is None:
+            return data
+        save_dataframe(data, output)
+        return len(data)
+
+    def _merge_sync_shards(self, work_queue, job: dict) -> int:
+        """Load the resources of a sync_metadata job into the database, see `merge_shards`."""
+        start_time = time.time()
+        _num_available = job["state"]["num_available"]
+        _num_fetched = 0
+        _seen_ids = set()
+        self.ensure_schema()
+        conn = self._bulk_connection()
+        try:
+            conn.execute("DROP TABLE IF EXISTS resources_staging")
+            self._create_resources_table(conn.cursor(), "resources_staging")
+            conn.commit()
+            for unit in range(job["num_units"]):
+                records = work_queue.read_unit(job["job_id"], unit)
+                if records:
+                    self._stage_records(conn, records)
+                    _seen_ids.update(r["resource_id"] for r in records)
+                _num_fetched += len(records)
+            # Only swap after a complete listing, a short read must never wipe the catalog
+            if len(_seen_ids) >= _num_available:
+                _num_inserted, _num_removed = self._swap_staging(conn)
+            else:
+                _num_inserted, _num_removed = self._merge_staging(conn), 0
+        finally:
+            conn.close()
+        _num_resources = self._count_resources()
+        self._save_update_info(
+            _num_resources,
+            sync_mode="sharded",
+            watermark=None,
+            num_fetched=_num_fetched,
+            num_inserted=_num_inserted,
+            num_updated=_num_fetched - _num_inserted,
+            num_removed=_num_removed,
+            duration_seconds=round(time.time() - start_time, 3),
+        )
+        logger.info(f"Merged {_num_fetched} resources of job {job['job_id']}, {_num_resources} resources in the database.")
+        return _num_resources
+
+    def _open_pages(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        njobs: int = None,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        engine: str = None,
+        resume: bool = False,
+        checkpoint_dir: str = None,
+        where=None,
+        columnar: bool = False,
+    ) -> tuple:
+        """Plan the pages requested by `get_data` and start fetching them, see `get_data` for the arguments.
+
+        The first page of every request is fetched right away and the remaining pages are planned from the "total"
+        it reports, so the number of records is never requested separately. See `adapt_batch_size` for the size
+        of the remaining pages.
+
+            columnar: (bool) - Yield each page as columns (see `records_to_columns`) instead of a list of records.
+
+        Returns: (iterator of the records of each page in order, metadata of the first response)
+        """
+        from datagovindia.query import plan_request, filter_pages
+
+        # offset and limit are sent to the API unless records are filtered or merged locally
+        predicates, branches, residual, local_window = plan_request(where, filters)
+
+        checkpoint = None
+        if resume:
+            checkpoint_params = {
+                "resource_id": resource_id,
+                "sort_by": sort_by,
+                "ascending": ascending,
+                "offset": offset,
+                "limit": limit,
+                "batch_size": batch_size,
+                "filters": filters or {},
+                "fields": list(fields or []),
+                "where": predicates,
+            }
+            checkpoint = Checkpoint.for_request("get_data", checkpoint_params, root=checkpoint_dir)
+
+        if checkpoint is not None and "pages" in checkpoint.state:
+            # Reuse the plan of the interrupted call so that pages line up
+            logger.info(f"Resuming from checkpoint {checkpoint.directory}, {len(checkpoint.done)} pages already fetched.")
+            param_list = [
+                {**self._request_params(resource_id, sort_by, ascending, page_filters, fields), "offset": o, "limit": l}
+                for page_filters, o, l in checkpoint.state["pages"]
+            ]
+            prefetched, info = {}, {"field": checkpoint.state.get("field")}
+        else:
+            param_list, prefetched, info = self._open_branches(
+                resource_id, branches, sort_by, ascending, offset, batch_size, njobs, limit, fields, engine, local_window
+            )
+            if checkpoint is not None:
+                checkpoint.state = {
+                    "pages": [[params["filters"], params["offset"], params["limit"]] for params in param_list],
+                    "field": info.get("field"),
+                }
+                checkpoint.save_manifest()
+
+        # Pages filtered locally are transposed once filtered
+        pages = self._iter_pages(
+            param_list,
+            njobs=njobs,
+            engine=engine,
+            checkpoint=checkpoint,
+            prefetched=prefetched,
+            columnar=columnar and not local_window,
+        )
+        if local_window:
+            pages = filter_pages(pages, residual, offset=offset, limit=limit)
+            if columnar:
+                pages = map(records_to_columns, pages)
+        return self._clear_when_done(pages, checkpoint), info
+
+    def _open_branches(
+        self,
+        resource_id: str,
+        branches: list,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        njobs: int = None,
+        limit: int = None,
+        fields: List = None,
+        engine: str = None,
+        local_window: bool = False,
+    ) -> tuple:
+        """Open one request per branch (filters) of a query plan, see `_open_request`. With `local_window`,
+        offset and limit are applied locally and every branch is requested from its first record.
+
+        Returns: (parameters of every page, {index of a page: records} of the pages already fetched, metadata of the first response)
+        """
+        session = self._session_for(njobs, engine)
+        opened = run_parallel(
+            self._open_request,
+            [
+                (*args, session)
+                for args in self._branch_args(
+                    resource_id, branches, sort_by, ascending, offset, batch_size, limit, fields, local_window
+                )
+            ],
+            njobs=max(1, min(len(branches), resolve_njobs(njobs, "thread"))),
+            engine="thread",
+        )
+        return merge_branches(opened)
+
+    def _branch_args(
+        self,
+        resource_id: str,
+        branches: list,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        limit: int = None,
+        fields: List = None,
+        local_window: bool = False,
+    ) -> list:
+        """Arguments of `_open_request` for every branch of a query plan, see `_open_branches`."""
+        return [
+            (resource_id, sort_by, ascending, 0 if local_window else offset, batch_size,
+             None if local_window else limit, branch, fields)
+            for branch in branches
+        ]
+
+    def _clear_when_done(self, pages, checkpoint: Checkpoint = None):
+        """Yield from `pages`, then delete the checkpoint of the completed request."""
+        yield from pages
+        if checkpoint is not None:
+            checkpoint.clear()
+
+    def _field_info(self, resource_id: str, info: dict) -> list:
+        """Field metadata of a resource, from a response when it has it, otherwise with `get_resource_info`."""
+        return info.get("field") or self.get_resource_info(resource_id).get("field")
+
+    def _open_request(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+        session=None,
+    ) -> tuple:
+        """Fetch the first page of a request and plan the remaining pages from the "total" it reports.
+
+        Returns: (parameters of every page, records of the first page, metadata of the response)
+        """
+        first = self._first_page_params(resource_id, sort_by, ascending, offset, batch_size, limit, filters, fields)
+        if first is None:
+            return [], [], {}
+        started = time.monotonic()
+        meta = get_api_page(build_url(api_key=self.api_key, **first), session=session)
+        seconds = time.monotonic() - started
+        records = meta.pop("records")
+        total = meta.get("total")
+        if total is None:
+            total = self._count_records(resource_id, filters)
+        return [first, *self._plan_after_first(first, batch_size, limit, len(records), total, seconds)], records, meta
+
+    def _first_page_params(
+        self,
+        resource_id: str,
+        sort_by: str = None,
+        ascending: bool = True,
+        offset: int = 0,
+        batch_size: int = 2000,
+        limit: int = None,
+        filters: Dict[str, str] = None,
+        fields: List = None,
+    ) -> dict:
+        """Parameters of the first page of a request, see `_open_request`. None if no record is requested."""
+        first_limit = batch_size if limit is None else min(batch_size, limit)
+        if first_limit <= 0:
+            return None
+        return {**self._request_params(resource_id, sort_by, ascending, filters, fields), "offset": offset, "limit": first_limit}
+
+    def _plan_after_first(
+        self, first: dict, batch_size: int, limit: int, num_records: int, total: int, seconds: float
+    ) -> list:
+        """Plan the pages following the `first` page of a request, which returned `num_records` records in `seconds`
+        and reported `total` records. See `adapt_batch_size` for the size of the pages."""
+        offset = first["offset"]
+        end = int(total) if limit is None else min(offset + limit, int(total))
+        next_offset = offset + num_records
+        batch_size = adapt_batch_size(batch_size, first["limit"], num_records, seconds, more=next_offset < end)
+        if not num_records:
+            return []
+        if batch_size != first["limit"] and next_offset < end:
+            logger.debug(f"Fetching the remaining pages of {first['resource_id']} with batch_size={batch_size}")
+        params_ = {key: value for key, value in first.items() if key not in ("offset", "limit")}
+        return [{**params_, "offset": o, "limit": l} for o, l in plan_windows(next_offset, end, batch_size)]
+
+    def _iter_pages(
+        self,
+        param_list: list,
+        njobs: int = None,
+        engine: str = None,
+        checkpoint: Checkpoint = None,
+        prefetched: dict = None,
+        columnar: bool = False,
+    ):
+        """Fetch the pages in `param_list` in parallel and yield the records of each page in order, as columns if `columnar`.
+        `prefetched` maps the index of pages already fetched to their records, they are not fetched again.
+        With a checkpoint, pages are spooled to disk by the workers and completed pages are skipped.
+        Pages are keyed in the checkpoint by their position in the plan, which stays unique across filtered requests."""
+        session = self._session_for(njobs, engine)
+        prefetched = dict(prefetched or {})
+        if checkpoint is None:
+            missing = [params for i, params in enumerate(param_list) if i not in prefetched]
+            fetched = iter_parallel(
+                get_api_columns if columnar else get_api_records,
+                [(build_url(api_key=self.api_key, **params), session) for params in missing],
+                njobs=njobs,
+                engine=engine,
+            )
+            for i in range(len(param_list)):
+                if i not in prefetched:
+                    yield next(fetched)
+                else:
+                    records = prefetched.pop(i)
+                    yield records_to_columns(records) if columnar else records
+            return
+
+        windows = []
+        position = param_list[0]["offset"] if param_list else 0
+        for params in param_list:
+            windows.append((position, params["limit"]))
+            position += params["limit"]
+        for i, records in prefetched.items():
+            if not checkpoint.is_done(*windows[i]):
+                checkpoint.write_page(*windows[i], records)
+                checkpoint.mark_done(*windows[i], len(records))
+        missing = [i for i, window in enumerate(windows) if not checkpoint.is_done(*window)]
+        spooled = iter_parallel(
+            spool_page,
+            [
+                (build_url(api_key=self.api_key, **param_list[i]), checkpoint.page_path(*windows[i]), session)
+                for i in missing
+            ],
+            njobs=njobs,
+            engine=engine,
+        )
+        for window in windows:
+            if not checkpoint.is_done(*window):
+                checkpoint.mark_done(*window, next(spooled))
+            records = checkpoint.read_page(*window)
+            yield records_to_columns(records) if columnar else records
+
+    def _count_records(self, resource_id: str, filters: Dict[str, str] = None) -> int:
+        """Number of records of a resource matching `filters`, 0 if the request fails."""
+        return int(self.get_resource_info(resource_id, filters=filters).get("total") or 0)
+
+    def _request_params(
+        self, resource_id: str, sort_by: str = None, ascending: bool = True, filters: Dict[str, str] = None, fields: List = None
+    ) -> dict:
+        """Parameters of `build_url` shared by every page of a request."""
+        return {
+            "resource_id": resource_id,
+            "sort_by": sort_by,
+            "sort_order": "asc" if ascending else "desc",
+            "filters": filters,
+            "fields": fields,
+        }
+
+    def ensure_schema(self):
+        """Create the tables of the database, or migrate a database created by an older version: add the full-text
+        index, the organisation, sector and field tables and the stats columns of `metadata`. `sync_metadata` runs it,
+        run it once to search an older database with the full-text index and facets without syncing. `search` never
+        changes the database."""
+        self.create_tables()
+
+    def create_tables(self):
+        """Create tables in database if they don't exist, see `ensure_schema`."""
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            self._create_resources_table(cursor)
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS metadata(
+                    id INTEGER PRIMARY KEY,
+                    last_updated TEXT,
+                    number_of_resources INTEGER
+                )
+            """
+            )
+            # Add per-run stats columns to `metadata` tables created by older versions
+            cursor.execute("PRAGMA table_info(metadata)")
+            existing_columns = {row[1] for row in cursor.fetchall()}
+            for column, dtype in METADATA_COLUMNS.items():
+                if column not in existing_columns:
+                    cursor.execute(f"ALTER TABLE metadata ADD COLUMN {column} {dtype}")
+            self._create_indexes(cursor)
+            self._create_facet_tables(conn)
+            self._create_fts_index(conn)
+            conn.commit()
+
+    def _create_resources_table(self, cursor, table_name: str = "resources"):
+        """Create the table of resources, or a staging table with the same schema."""
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_name}(
+                resource_id TEXT PRIMARY KEY,
+                title TEXT,
+                description TEXT,
+                org_type TEXT,
+                fields TEXT,
+                orgs TEXT,
+                source TEXT,
+                sectors TEXT,
+                date_created TEXT,
+                date_updated TEXT
+            )
+        """
+        )
+
+    def _create_indexes(self, cursor):
+        """Create the indexes of `INDEXED_COLUMNS` on `resources`."""
+        for column in INDEXED_COLUMNS:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS resources_{column} ON resources({column})")
+
+    def _create_facet_tables(self, conn):
+        """Create the join tables of `FACET_TABLES` and the trigger removing their rows with a resource.
+        Populates the tables from existing rows if they did not exist before. Runs in the caller's transaction."""
+        if self._has_facet_tables(conn):
+            return
+        cursor = conn.cursor()
+        for table, (key, _) in FACET_TABLES.items():
+            cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table}(
+                    {key} TEXT COLLATE NOCASE,
+                    resource_id TEXT,
+                    PRIMARY KEY ({key}, resource_id)
+                ) WITHOUT ROWID
+            """
+            )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_resource_id ON {table}(resource_id)")
+        deletes = "\n".join(f"DELETE FROM {table} WHERE resource_id = old.resource_id;" for table in FACET_TABLES)
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS resources_facets_delete AFTER DELETE ON resources BEGIN
+                {deletes}
+            END
+        """
+        )
+        cursor.execute("SELECT resource_id, fields, orgs, sectors FROM resources")
+        self._insert_facets(
+            cursor, [dict(zip(("resource_id", "fields", "orgs", "sectors"), row)) for row in cursor.fetchall()]
+        )
+
+    def _insert_facets(self, cursor, data_dicts: list):
+        """Insert the join table rows of resource records, see `FACET_TABLES`."""
+        for table, (key, column) in FACET_TABLES.items():
+            rows = [
+                (value, data_dict["resource_id"])
+                for data_dict in data_dicts
+                for value in split_joined(data_dict.get(column))
+            ]
+            cursor.executemany(f"INSERT OR IGNORE INTO {table} ({key}, resource_id) VALUES (?, ?)", rows)
+
+    def _create_fts_index(self, conn):
+        """Create the `resources_fts` full-text index and the triggers that keep it in sync with `resources`.
+        Populates the index from existing rows if it did not exist before. Runs in the caller's transaction."""
+        if self._has_fts_index(conn):
+            return
+        columns = ", ".join(FTS_ATTRIBUTES)
+        new_values = ", ".join(f"new.{col}" for col in FTS_ATTRIBUTES)
+        old_values = ", ".join(f"old.{col}" for col in FTS_ATTRIBUTES)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"""
+                CREATE VIRTUAL TABLE resources_fts USING fts5(
+                    {columns},
+                    content='resources',
+                    content_rowid='rowid',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Full-text search is not available, falling back to regex search: {e}")
+            return
+        # Statements are executed one by one, `executescript` would commit the caller's transaction
+        for statement in [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS resources_fts_insert AFTER INSERT ON resources BEGIN
+                INSERT INTO resources_fts(rowid, {columns}) VALUES (new.rowid, {new_values});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS resources_fts_delete AFTER DELETE ON resources BEGIN
+                INSERT INTO resources_fts(resources_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS resources_fts_update AFTER UPDATE ON resources BEGIN
+                INSERT INTO resources_fts(resources_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+                INSERT INTO resources_fts(rowid, {columns}) VALUES (new.rowid, {new_values});
+            END
+            """,
+            "INSERT INTO resources_fts(resources_fts) VALUES('rebuild')",
+        ]:
+            cursor.execute(statement)
+
+    def upsert_records(self, table_name: str, data_dicts: list):
+        """Insert or replace records in the database."""
+        with METRICS.stage("upsert_records", len(data_dicts)), self.connect(verify=True) as conn:
+            cursor = conn.cursor()
+            placeholders = ", ".join(["?"] * len(data_dicts[0]))
+            columns = ", ".join(data_dicts[0].keys())
+            sql = f"""INSERT OR REPLACE INTO {table_name} 
+                      ({columns}) 
+                      VALUES ({placeholders})"""
+
+            def convert_value(value):
+                if isinstance(value, (str, int, float, type(None))):
+                    return value
+                return str(value)  # Convert unsupported types to strings
+            data_values = [tuple(convert_value(v) for v in data_dict.values()) for data_dict in data_dicts]
+            cursor.executemany(sql, data_values)
+            if table_name == "resources" and self._has_facet_tables(conn):
+                # Rows of replaced resources were removed by the `resources_facets_delete` trigger
+                self._insert_facets(cursor, data_dicts)
+            conn.commit()
+
+    def _bulk_connection(self) -> sqlite3.Connection:
+        """Long-lived connection used to load the catalog during a full sync, with `BULK_PRAGMAS` applied."""
+        conn = self.connect()
+        for pragma, value in BULK_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def _stage_records(self, conn, records: list):
+        """Insert a batch of records into `resources_staging` in a single transaction.
+        The staging table has no index or trigger besides its primary key."""
+        columns = ", ".join(RESOURCE_COLUMNS)
+        placeholders = ", ".join(["?"] * len(RESOURCE_COLUMNS))
+        with METRICS.stage("stage_records", len(records)), conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO resources_staging ({columns}) VALUES ({placeholders})",
+                [tuple(record.get(column) for column in RESOURCE_COLUMNS) for record in records],
+            )
+
+    def _swap_staging(self, conn) -> tuple:
+        """Replace `resources` with `resources_staging` in a single transaction, then build its indexes, join tables
+        and full-text index. Readers see either the previous or the new catalog, never a partial one.
+
+        Returns: (number of inserted resources, number of removed resources)
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            num_inserted = conn.execute(
+                "SELECT COUNT(*) FROM resources_staging WHERE resource_id NOT IN (SELECT resource_id FROM resources)"
+            ).fetchone()[0]
+            num_removed = conn.execute(
+                "SELECT COUNT(*) FROM resources WHERE resource_id NOT IN (SELECT resource_id FROM resources_staging)"
+            ).fetchone()[0]
+            conn.execute("DROP TABLE IF EXISTS resources_fts")
+            for table in FACET_TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute("DROP TABLE resources")
+            conn.execute("ALTER TABLE resources_staging RENAME TO resources")
+            cursor = conn.cursor()
+            self._create_indexes(cursor)
+            self._create_facet_tables(conn)
+            self._create_fts_index(conn)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return num_inserted, num_removed
+
+    def _merge_staging(self, conn) -> int:
+        """Upsert `resources_staging` into `resources` without removing any resource, used when the listing
+        was incomplete. Returns the number of inserted resources."""
+        columns = ", ".join(RESOURCE_COLUMNS)
+        with conn:
+            num_inserted = conn.execute(
+                "SELECT COUNT(*) FROM resources_staging WHERE resource_id NOT IN (SELECT resource_id FROM resources)"
+            ).fetchone()[0]
+            conn.execute(f"INSERT OR REPLACE INTO resources ({columns}) SELECT {columns} FROM resources_staging")
+            cursor = conn.execute("SELECT resource_id, fields, orgs, sectors FROM resources_staging")
+            self._insert_facets(
+                cursor, [dict(zip(("resource_id", "fields", "orgs", "sectors"), row)) for row in cursor.fetchall()]
+            )
+            conn.execute("DROP TABLE resources_staging")
+        return num_inserted
+
+    def _save_update_info(self, _num_updated: int, **stats):
+        """Save info about last update, along with the stats of the sync run, to the database.
+        One row is kept per sync run, `get_update_info` reads the latest one."""
+        stats = {"last_updated": current_datetime(), "number_of_resources": _num_updated, **stats}
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            columns = ", ".join(stats.keys())
+            placeholders = ", ".join(["?"] * len(stats))
+            cursor.execute(f"INSERT INTO metadata ({columns}) VALUES ({placeholders})", tuple(stats.values()))
+            conn.commit()
+
+    def _get_watermark(self) -> str:
+        """Get the most recent `date_updated` stored in the database, None if the database is empty."""
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(date_updated) FROM resources")
+            return cursor.fetchone()[0]
+
+    def _count_resources(self) -> int:
+        """Count resources stored in the database."""
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM resources").fetchone()[0]
+
+    def _existing_resource_ids(self, resource_ids: list) -> set:
+        """Return the subset of `resource_ids` that are already stored in the database."""
+        existing = set()
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            for i in range(0, len(resource_ids), 500):
+                chunk = resource_ids[i : i + 500]
+                placeholders = ", ".join(["?"] * len(chunk))
+                cursor.execute(f"SELECT resource_id FROM resources WHERE resource_id IN ({placeholders})", chunk)
+                existing.update(row[0] for row in cursor.fetchall())
+        return existing
+
+    def _remove_resources(self, resource_ids: list) -> int:
+        """Delete resources from the database, returns the number of rows deleted."""
+        if not resource_ids:
+            return 0
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("DELETE FROM resources WHERE resource_id = ?", [(rid,) for rid in resource_ids])
+            conn.commit()
+            return cursor.rowcount
+
+    def _sync_deactivated(self, watermark: str, batch_size: int, njobs: int, engine: str = None) -> int:
+        """Remove resources deactivated on the OGD platform since `watermark`, returns the number removed."""
+        _batch = njobs * batch_size
+        _num_removed = 0
+        start = 0
+        while True:
+            records = fetch_metadata_records(
+                self.api_key,
+                start=start,
+                end=start + _batch,
+                batch_size=batch_size,
+                njobs=njobs,
+                active=0,
+                engine=engine,
+                session=self._session_for(njobs, engine),
+            )
+            recent = updated_since(records, watermark)
+            _num_removed += self._remove_resources([r["resource_id"] for r in recent])
+            if len(recent) < _batch:
+                return _num_removed
+            start += _batch
+
+    def sync_metadata(
+        self,
+        batch_size=1000,
+        njobs=None,
+        incremental: bool = False,
+        engine: str = None,
+        resume: bool = False,
+        checkpoint_dir: str = None,
+        bulk: bool = True,
+    ):
+        """Updates metadata in datagovindia.db sqlite database
+
+            batch_size: (int) - Number of records to be fetched in a single request. Defaults to 1000.
+
+            njobs: (int) - Number of parallel requests to use for collecting data. Defaults to None, see `resolve_njobs`.
+
+            incremental: (bool) - Only fetch resources updated since the last sync. Defaults to False.
+            Records are fetched newest first and paging stops at the first record older than the most recent
+            `date_updated` in the database. Resources deactivated since then are removed. Falls back to a full
+            sync if the database is empty.
+            A full sync removes resources that are no longer available on the OGD platform.
+
+            engine: (str) - "thread" or "process". Defaults to None, which uses the `DATAGOVINDIA_ENGINE` environment variable or "thread".
+
+            resume: (bool) - Record every completed offset range in a checkpoint, and skip the ranges completed by a previous,
+            interrupted sync of the same database. The checkpoint is deleted once the sync completes.
+
+            checkpoint_dir: (str) - Directory to store checkpoints in. Defaults to the environment variable
+            DATAGOVINDIA_CHECKPOINT_DIR or ~/.datagovindia/checkpoints
+
+            bulk: (bool) - Load a full sync into a staging table over a single connection, one transaction per batch,
+            and swap it in for `resources` once complete, building indexes and the full-text index once at the end.
+            Searches running during the sync see the previous catalog. Defaults to True, incremental syncs always
+            update `resources` in place.
+        """
+        start_time = time.time()
+
+        checkpoint = None
+        if resume:
+            checkpoint_params = {
+                "db_path": os.path.abspath(self.db_path),
+                "incremental": incremental,
+                "bulk": bulk,
+                "batch_size": batch_size,
+            }
+            checkpoint = Checkpoint.for_request("sync_metadata", checkpoint_params, root=checkpoint_dir)
+
+        self.ensure_schema()
+        njobs = resolve_njobs(njobs, engine)
+
+        if checkpoint is not None and checkpoint.state:
+            # Reuse the plan of the interrupted sync so that pages line up
+            logger.info(f"Resuming from checkpoint {checkpoint.directory}, {len(checkpoint.done)} pages already synced.")
+            _num_available = checkpoint.state["num_available"]
+            watermark = checkpoint.state["watermark"]
+        else:
+            _num_available = get_total_available_resources(session=self.session)
+            watermark = self._get_watermark() if incremental else None
+            if checkpoint is not None:
+                checkpoint.state = {"num_available": _num_available, "watermark": watermark}
+                checkpoint.save_manifest()
+
+        sync = MetadataSync(self, _num_available, watermark, bulk=bulk, checkpoint=checkpoint, start_time=start_time)
+        try:
+            pages = sync.plan_pages(batch_size)
+            session = self._session_for(njobs, engine)
+
+            def page_args():
+                # Pages are listed newest first, pages after one reaching the watermark are not needed
+                for start, end in pages:
+                    if sync.reached_watermark:
+                        return
+                    yield (self.api_key, start, end, 1, session)
+
+            # Workers fetch pages ahead while this thread, the only writer, stores pages in completion order
+            for index, records in iter_parallel(_fetch_metadata, page_args(), njobs=njobs, engine=engine, ordered=False):
+                sync.store(*pages[index], records)
+            sync.end_listing()
+
+            _num_removed = None
+            if watermark:
+                _num_removed = self._sync_deactivated(watermark, batch_size=batch_size, njobs=njobs, engine=engine)
+            sync.finish(_num_removed)
+        finally:
+            sync.close()
+
+class MetadataSync:
+    """Database side of a `sync_metadata` run, shared by `DataGovIndia` and `AsyncDataGovIndia`: stores pages of the
+    catalog as they are fetched, then swaps, merges or prunes the stored resources and saves the stats of the run.
+    Every method uses the database and must be called from the thread that created the object.
+
+        local: (DataGovIndia) - Client whose database is synced, its tables must exist, see `ensure_schema`.
+
+        num_available: (int) - Number of resources listed by the OGD platform.
+
+        watermark: (str) - Most recent `date_updated` of the database for an incremental sync, None for a full sync.
+
+        bulk: (bool) - Load a full sync into a staging table, see `sync_metadata`.
+
+        checkpoint: (Checkpoint) - Checkpoint recording the stored pages, see `sync_metadata(resume=True)`.
+
+        start_time: (float) - `time.time()` when the run started. Defaults to now.
+    """
+
+    def __init__(
+        self,
+        local: DataGovIndia,
+        num_available: int,
+        watermark: str = None,
+        bulk: bool = True,
+        checkpoint: Checkpoint = None,
+        start_time: float = None,
+    ):
+        self.local = local
+        self.num_available = num_available
+        self.watermark = watermark
+        self.sync_mode = "incremental" if watermark else "full"
+        self.checkpoint = checkpoint
+        self.start_time = start_time or time.time()
+        self.num_updated = 0
+        self.num_inserted = 0
+        self.seen_ids = set()
+        self.reached_watermark = False
+        self.conn = None
+        if bulk and self.sync_mode == "full":
+            self.conn = local._bulk_connection()
+            if not (checkpoint is not None and checkpoint.done):
+                # Rows staged by an interrupted sync are only kept when resuming it
+                self.conn.execute("DROP TABLE IF EXISTS resources_staging")
+            local._create_resources_table(self.conn.cursor(), "resources_staging")
+            self.conn.commit()
+        display_progress_bar(self.num_updated, self.num_available)
+
+    def plan_pages(self, batch_size: int) -> list:
+        """(start, end) of the pages of `batch_size` resources still to fetch. Pages stored by an interrupted run
+        of the checkpoint are counted as synced and skipped."""
+        pages = [(start, min(self.num_available, start + batch_size)) for start in range(0, self.num_available, batch_size)]
+        checkpoint = self.checkpoint
+        if checkpoint is None:
+            return pages
+        for start, end in pages:
+            if checkpoint.is_done(start, end):
+                resource_ids = checkpoint.read_page(start, end)
+                self.seen_ids.update(resource_ids)
+                self.num_updated += len(resource_ids)
+        if checkpoint.state.get("fetch_complete"):
+            return []
+        return [page for page in pages if not checkpoint.is_done(*page)]
+
+    def store(self, start: int, end: int, records: list):
+        """Store the compiled records of the page from `start` to `end` of the catalog. With a watermark, records older
+        than the watermark are dropped and `reached_watermark` is set: later pages are not needed."""
+        if self.watermark:
+            fresh = updated_since(records, self.watermark)
+            self.reached_watermark = self.reached_watermark or len(fresh) < len(records)
+            records = fresh
+        if records:
+            resource_ids = [r["resource_id"] for r in records]
+            self.seen_ids.update(resource_ids)
+            if self.conn is not None:
+                self.local._stage_records(self.conn, records)
+            else:
+                self.num_inserted += len(resource_ids) - len(self.local._existing_resource_ids(resource_ids))
+                self.local.upsert_records("resources", records)
+        self.num_updated += len(records)
+        if self.checkpoint is not None:
+            self.checkpoint.write_page(start, end, [r["resource_id"] for r in records])
+            self.checkpoint.mark_done(start, end, len(records))
+
+        # Calculate ETA
+
+        elapsed_time = time.time() - self.start_time
+        avg_time = elapsed_time / (self.num_updated if self.num_updated else 1)
+        _num_remaining = max(0, self.num_available - self.num_updated)
+        eta = avg_time * _num_remaining
+        display_progress_bar(min(self.num_updated, self.num_available), self.num_available, eta=format_seconds(eta))
+
+    def end_listing(self):
+        """Call once every page is stored, before removing the deactivated resources."""
+        if self.reached_watermark:
+            # Only marked once every page before the watermark is stored
+            if self.checkpoint is not None:
+                self.checkpoint.state["fetch_complete"] = True
+                self.checkpoint.save_manifest()
+            display_progress_bar(self.num_available, self.num_available)
+
+    def finish(self, num_removed: int = None):
+        """Swap in, merge or prune the stored resources, then save the stats of the run and delete its checkpoint.
+        `num_removed` is the number of deactivated resources removed by an incremental sync."""
+        local = self.local
+        num_inserted = self.num_inserted
+        complete = len(self.seen_ids) >= self.num_available
+        if self.watermark:
+            num_removed = num_removed or 0
+        elif self.conn is not None:
+            # Only swap after a complete listing, a short read must never wipe the catalog
+            if complete:
+                num_inserted, num_removed = local._swap_staging(self.conn)
+            else:
+                num_inserted, num_removed = local._merge_staging(self.conn), 0
+        elif complete:
+            # Only prune after a complete listing, a short read must never wipe the catalog
+            with local.connect() as conn:
+                stale_ids = [row[0] for row in conn.execute("SELECT resource_id FROM resources")]
+            num_removed = local._remove_resources([rid for rid in stale_ids if rid not in self.seen_ids])
+        else:
+            num_removed = 0
+
+        num_resources = local._count_resources()
+        if num_resources > self.num_available:
+            logger.warning(
+                f"\n{num_resources - self.num_available} resources in the database are no longer available on the OGD platform. "
+                "Run `sync_metadata(incremental=False)` to remove them."
+            )
+        total_time = time.time() - self.start_time
+        logger.info(f"\nTotal time taken: {format_seconds(total_time)} to update {self.num_updated} resources.")
+        local._save_update_info(
+            num_resources,
+            sync_mode=self.sync_mode,
+            watermark=self.watermark,
+            num_fetched=self.num_updated,
+            num_inserted=num_inserted,
+            num_updated=self.num_updated - num_inserted,
+            num_removed=num_removed,
+            duration_seconds=round(total_time, 3),
+        )
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+
+    def close(self):
+        """Close the connection to the staging table, a staging table left by an interrupted run is dropped by the next one."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
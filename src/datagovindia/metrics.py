@@ -0,0 +1,227 @@
+"""Instrumentation of the fetch and sync hot paths: counters, latency histograms and their export.
+
+Collection is off until `METRICS.enable()` is called, or the `DATAGOVINDIA_METRICS` environment variable names a file
+the metrics are written to at exit. Metrics are collected in the process sending the requests: with the process engine,
+requests sent by worker processes are not counted.
+
+Exports are a Prometheus textfile (OpenMetrics text format, for the node_exporter textfile collector) or a JSON run report
+with estimated p50/p99 latencies and records/sec per stage, chosen by the file extension (.json for the report).
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from urllib.parse import urlsplit, parse_qsl
+
+# Upper bounds of the latency histograms, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = "datagovindia"
+
+# Help text of the metrics exported in the Prometheus textfile
+METRIC_HELP = {
+    "requests_total": ("counter", "HTTP requests sent to the OGD API, by endpoint and status."),
+    "request_retries_total": ("counter", "HTTP requests retried after an error, by endpoint."),
+    "page_failures_total": ("counter", "Pages that could not be fetched after all retries, by endpoint."),
+    "response_bytes_total": ("counter", "Bytes of the (decompressed) response bodies, by endpoint."),
+    "request_seconds": ("histogram", "Latency of HTTP requests, by endpoint."),
+    "records_total": ("counter", "Records processed, by stage."),
+    "stage_seconds": ("histogram", "Time spent per call of a hot-path stage, by stage."),
+}
+
+def endpoint_of(url: str) -> str:
+    """Endpoint of an OGD API url, used both as metric label and as cache TTL key (see `DEFAULT_CACHE_TTL`):
+    "lists" for the catalog, "resource_info" for `limit=0` resource requests, "resource" for other resource
+    requests and "other" for any other url."""
+    parts = urlsplit(url)
+    path = parts.path.rstrip("/")
+    if path.endswith("/lists"):
+        return "lists"
+    if "/resource/" not in path:
+        return "other"
+    if dict(parse_qsl(parts.query)).get("limit") == "0":
+        return "resource_info"
+    return "resource"
+
+class Histogram:
+    """Cumulative-bucket histogram, as exported to Prometheus."""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation within its bucket, like Prometheus' histogram_quantile,
+        clamped to the smallest and largest values observed."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        estimate = self.max
+        for i, count in enumerate(self.counts[:-1]):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                estimate = lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+                break
+            cumulative += count
+        return min(max(estimate, self.min), self.max)
+
+class Metrics:
+    """Thread-safe registry of labelled counters and histograms, see the module docstring."""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop every metric collected so far and restart the run clock."""
+        with self._lock:
+            self.counters = {}  # (name, labels) -> value, labels are sorted (key, value) tuples
+            self.histograms = {}  # (name, labels) -> Histogram
+            self.started = time.time()
+
+    def enable(self, reset: bool = True):
+        if reset:
+            self.reset()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def stage(self, stage: str, records: int = None):
+        """Time a hot-path stage, counting the `records` it processes.
+        Yields a dict where the number of records can be set once known, as `counter["records"]`."""
+        counter = {"records": records}
+        if not self.enabled:
+            yield counter
+            return
+        start = time.perf_counter()
+        try:
+            yield counter
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage)
+            if counter["records"] is not None:
+                self.inc("records_total", counter["records"], stage=stage)
+
+    def report(self) -> dict:
+        """JSON-serializable summary of the run: totals, estimated p50/p99 latencies and records/sec per stage."""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {key: (h.count, h.sum, h.quantile(0.5), h.quantile(0.99)) for key, h in self.histograms.items()}
+        elapsed = time.time() - self.started
+        report = {"started": self.started, "elapsed_seconds": round(elapsed, 3), "requests": {}, "stages": {}}
+        for (name, labels), (count, total, p50, p99) in sorted(histograms.items()):
+            label = dict(labels)
+            summary = {"count": count, "seconds": round(total, 4), "p50_ms": _ms(p50), "p99_ms": _ms(p99)}
+            if name == "request_seconds":
+                endpoint = label.get("endpoint")
+                summary["bytes"] = counters.get(("response_bytes_total", labels), 0)
+                summary["retries"] = counters.get(("request_retries_total", labels), 0)
+                summary["failed_pages"] = counters.get(("page_failures_total", labels), 0)
+                summary["status"] = {
+                    dict(l)["status"]: v for (n, l), v in counters.items() if n == "requests_total" and dict(l)["endpoint"] == endpoint
+                }
+                report["requests"][endpoint] = summary
+            elif name == "stage_seconds":
+                records = counters.get(("records_total", labels))
+                if records is not None:
+                    summary["records"] = records
+                    summary["records_per_sec"] = round(records / total, 1) if total else None
+                report["stages"][label.get("stage")] = summary
+        return report
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+        lines, described = [], set()
+
+        def describe(name):
+            if name not in described:
+                kind, text = METRIC_HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {METRIC_PREFIX}_{name} {text}")
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{METRIC_PREFIX}_{name}{_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                lines.append(f"{METRIC_PREFIX}_{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{METRIC_PREFIX}_{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{METRIC_PREFIX}_{name}_count{_labels(labels)} {histogram.count}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_run_start_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_run_start_seconds {self.started}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the metrics to `path`, as a JSON run report if it ends with .json, as a Prometheus textfile otherwise.
+        The file is replaced atomically, so the textfile collector never reads a partial file."""
+        content = json.dumps(self.report(), indent=2) if path.endswith(".json") else self.to_prometheus()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+def _ms(seconds: float) -> float:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+def _labels(labels: tuple, **extra) -> str:
+    items = [*labels, *extra.items()]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+# Registry of the current process
+METRICS = Metrics()
+
+def enable_metrics(path: str = None) -> Metrics:
+    """Start collecting metrics, written to `path` at exit if given. Returns the registry of the current process."""
+    METRICS.enable()
+    if path:
+        atexit.register(METRICS.write, path)
+    return METRICS
+
+if os.environ.get("DATAGOVINDIA_METRICS"):
+    enable_metrics(os.environ["DATAGOVINDIA_METRICS"])
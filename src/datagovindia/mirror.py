@@ -0,0 +1,165 @@
+"""Local mirror of downloaded resources, stored as Parquet parts per resource. Requires pyarrow.
+
+A mirror is a directory per resource holding:
+    manifest.json : the remote version ("updated", "updated_date", "total") it was synced with, its field metadata,
+        the number of records and the last record, used to check that new records were only appended
+    part-<n>.parquet : records, in the order of the resource, one part per full download or appended tail
+
+All values are stored as strings like on the OGD platform, see `datagovindia.schema` for typed frames.
+"""
+
+import os
+import json
+import shutil
+from datagovindia.checkpoint import write_json_atomic
+from datagovindia.core import import_pyarrow
+
+# Appended parts beyond which the mirror of a resource is compacted into a single part
+MAX_PARTS = 16
+
+def default_mirror_root() -> str:
+    """Directory holding all mirrors. Read from the environment variable DATAGOVINDIA_MIRROR_DIR,
+    defaults to ~/.datagovindia/mirror"""
+    return os.environ.get("DATAGOVINDIA_MIRROR_DIR", os.path.join(os.path.expanduser("~"), ".datagovindia", "mirror"))
+
+def _string_array(pa, values: list):
+    """Arrow string array of a column, values that are not strings (rare on the OGD platform) are converted."""
+    try:
+        return pa.array(values, type=pa.string())
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+class DatasetMirror:
+    """Mirrors of resources under `root`, see the module docstring.
+
+        root: (str) - Directory holding the mirrors. Defaults to `default_mirror_root()`.
+    """
+
+    def __init__(self, root: str = None):
+        self.pa = import_pyarrow()
+        self.root = root or default_mirror_root()
+
+    def directory(self, resource_id: str) -> str:
+        return os.path.join(self.root, resource_id)
+
+    def manifest(self, resource_id: str) -> dict:
+        """Manifest of the mirror of a resource, None if the resource is not mirrored."""
+        path = os.path.join(self.directory(resource_id), "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_part(self, directory: str, name: str, pages, columns: list = None) -> tuple:
+        """Write columnar pages (see `records_to_columns`) to one Parquet part as they arrive.
+        Returns (number of records, columns, last record)."""
+        pa = self.pa
+        writer, schema, num_records, last = None, None, 0, None
+        path = os.path.join(directory, name)
+        try:
+            for page in pages:
+                if not page:
+                    continue
+                if schema is None:
+                    columns = list(columns or page)
+                    schema = pa.schema([(column, pa.string()) for column in columns])
+                    writer = pa.parquet.ParquetWriter(path, schema)
+                size = len(next(iter(page.values())))
+                arrays = [
+                    _string_array(pa, page[column]) if column in page else pa.nulls(size, pa.string()) for column in columns
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                num_records += size
+                last = {column: page[column][-1] for column in columns if column in page}
+        finally:
+            if writer is not None:
+                writer.close()
+        return num_records, columns, last
+
+    def replace(self, resource_id: str, pages, version: dict, field: list = None) -> dict:
+        """Replace the mirror of a resource with columnar pages. Returns the new manifest.
+        The new part is written next to the current parts and swapped in by rewriting the manifest atomically:
+        readers see either the previous or the new mirror, and an interrupted replace leaves the mirror unchanged."""
+        directory = self.directory(resource_id)
+        os.makedirs(directory, exist_ok=True)
+        previous = self.manifest(resource_id)
+        next_part = previous["next_part"] if previous else 0
+        name = f"part-{next_part:05d}.parquet"
+        try:
+            num_records, columns, last = self._write_part(directory, name, pages)
+        except BaseException:
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+            raise
+        manifest = {
+            **version,
+            "field": field,
+            "columns": columns or [],
+            "num_records": num_records,
+            "last_record": last,
+            "parts": [name] if num_records else [],
+            "next_part": next_part + 1,
+        }
+        write_json_atomic(os.path.join(directory, "manifest.json"), manifest)
+        self._remove_unused_parts(directory, manifest)
+        return manifest
+
+    def append(self, resource_id: str, pages, version: dict) -> dict:
+        """Append columnar pages to the mirror of a resource as a new part. Returns the new manifest.
+        The manifest is only updated once the part is complete, an interrupted append leaves the mirror unchanged."""
+        manifest = self.manifest(resource_id)
+        directory = self.directory(resource_id)
+        name = f"part-{manifest['next_part']:05d}.parquet"
+        num_records, _, last = self._write_part(directory, name, pages, columns=manifest["columns"] or None)
+        manifest = {**manifest, **version, "next_part": manifest["next_part"] + 1}
+        if num_records:
+            manifest.update(
+                num_records=manifest["num_records"] + num_records, last_record=last, parts=[*manifest["parts"], name]
+            )
+        write_json_atomic(os.path.join(directory, "manifest.json"), manifest)
+        if len(manifest["parts"]) > MAX_PARTS:
+            manifest = self.compact(resource_id)
+        return manifest
+
+    def read(self, resource_id: str, columns: list = None):
+        """Read the mirror of a resource as a DataFrame of strings, optionally only some columns."""
+        import pandas as pd
+
+        manifest = self.manifest(resource_id)
+        if not manifest or not manifest["parts"]:
+            return pd.DataFrame(columns=columns or (manifest or {}).get("columns", []))
+        directory = self.directory(resource_id)
+        if columns is not None:
+            columns = [column for column in columns if column in manifest["columns"]]
+        tables = [self.pa.parquet.read_table(os.path.join(directory, part), columns=columns) for part in manifest["parts"]]
+        return self.pa.concat_tables(tables).to_pandas()
+
+    def compact(self, resource_id: str) -> dict:
+        """Rewrite the parts of a mirror into a single part."""
+        manifest = self.manifest(resource_id)
+        directory = self.directory(resource_id)
+        tables = [self.pa.parquet.read_table(os.path.join(directory, part)) for part in manifest["parts"]]
+        name = f"part-{manifest['next_part']:05d}.parquet"
+        self.pa.parquet.write_table(self.pa.concat_tables(tables), os.path.join(directory, name))
+        manifest["parts"] = [name]
+        manifest["next_part"] += 1
+        write_json_atomic(os.path.join(directory, "manifest.json"), manifest)
+        self._remove_unused_parts(directory, manifest)
+        return manifest
+
+    def _remove_unused_parts(self, directory: str, manifest: dict):
+        """Delete the parts not listed in the manifest: parts it replaced and parts of interrupted writes."""
+        for name in os.listdir(directory):
+            if name.startswith("part-") and name.endswith(".parquet") and name not in manifest["parts"]:
+                os.remove(os.path.join(directory, name))
+
+    def remove(self, resource_id: str):
+        shutil.rmtree(self.directory(resource_id), ignore_errors=True)
+
+    def resource_ids(self) -> list:
+        """Resources with a mirror under `root`."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root) if os.path.exists(os.path.join(self.root, name, "manifest.json"))
+        )
@@ -0,0 +1,217 @@
+"""Predicates of `get_data(where=...)`: pushdown into the filters of the OGD API and local evaluation of the rest."""
+
+import re
+import operator
+from datetime import date
+from itertools import product
+import pandas as pd
+from datagovindia.schema import convert_column
+
+COMPARATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+OPERATORS = [*COMPARATORS, "in"]
+
+# Maximum number of filtered requests an `in` predicate (or several) may fan out into
+MAX_FANOUT = 32
+
+PREDICATE_PATTERN = re.compile(r"^\s*([\w.\-]+)\s*(==|!=|<=|>=|<|>|=|\s+in\s+)\s*(.+?)\s*$", re.I)
+
+def _parse_literal(value: str):
+    """Parse a value of a string predicate: numbers become int/float, quotes are stripped from strings."""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+def parse_predicate(predicate: str) -> tuple:
+    """Parse a predicate string such as "year >= 2015" or "state in (Kerala, Goa)" into (field, op, value)."""
+    match = PREDICATE_PATTERN.match(predicate)
+    if match is None:
+        raise ValueError(f"Invalid predicate '{predicate}', expected '<field> <op> <value>' with op in {OPERATORS}")
+    field, op, value = match.group(1), match.group(2).strip().lower(), match.group(3)
+    if op == "in":
+        return field, "in", [_parse_literal(v) for v in value.strip("()[]").split(",") if v.strip()]
+    return field, "==" if op == "=" else op, _parse_literal(value)
+
+def parse_where(where) -> list:
+    """Normalize a `where` argument into a list of (field, op, value) predicates, all combined with AND.
+
+        where: (dict or list) - Either a dict mapping fields to
+            a value: equality, e.g. {"state": "Kerala"}
+            a list, tuple or set of values: membership, e.g. {"state": ["Kerala", "Goa"]}
+            a dict of operators to values: comparisons, e.g. {"year": {">=": 2015, "<": 2020}}
+        or a list of (field, op, value) tuples or predicate strings such as "year >= 2015".
+
+    Operators are "==", "!=", "<", "<=", ">", ">=" and "in".
+    """
+    if not where:
+        return []
+    if isinstance(where, dict):
+        items = []
+        for field, value in where.items():
+            if isinstance(value, dict):
+                items.extend((field, op, v) for op, v in value.items())
+            elif isinstance(value, (list, tuple, set)):
+                items.append((field, "in", list(value)))
+            else:
+                items.append((field, "==", value))
+    else:
+        items = [parse_predicate(item) if isinstance(item, str) else tuple(item) for item in where]
+    predicates = []
+    for field, op, value in items:
+        op = "==" if op == "=" else op
+        if op not in OPERATORS:
+            raise ValueError(f"Invalid operator {op} for field {field}, valid operators are {OPERATORS}")
+        if op == "in":
+            value = list(dict.fromkeys(value))  # Drop duplicate values, keeping their order
+        predicates.append((field, op, value))
+    return predicates
+
+def plan_query(predicates: list, filters: dict = None, max_fanout: int = MAX_FANOUT) -> tuple:
+    """Split predicates into the filters the OGD API can evaluate and the predicates left to evaluate locally.
+
+    The API only supports exact matches, so equality predicates are merged into `filters` and `in` predicates
+    fan out into one filtered request per value, as long as the number of requests stays within `max_fanout`.
+    `in` predicates on the same field are intersected first.
+    Comparisons, `!=` and `in` predicates beyond the fan-out limit are left to evaluate locally.
+
+    Returns: (list of filter dicts, one per request, list of residual predicates).
+    No request is needed if the list of filter dicts is empty, the predicates contradict each other.
+    """
+    base = {field: str(value) for field, value in (filters or {}).items()}
+    residual = []
+    for field, op, value in predicates:
+        if op != "==":
+            continue
+        if field in base and base[field] != str(value):
+            return [], []  # Two different values for the same field
+        base[field] = str(value)
+
+    # Several `in` predicates on a field only match the values they have in common
+    in_values = {}
+    for field, op, values in predicates:
+        if op != "in":
+            continue
+        strings = {str(value) for value in values}
+        in_values[field] = [value for value in in_values.get(field, values) if str(value) in strings]
+
+    fanout, fanout_size = [], 1
+    for field, values in sorted(in_values.items(), key=lambda item: len(item[1])):
+        strings = [str(value) for value in values]
+        if field in base:
+            if base[field] not in strings:
+                return [], []
+            continue
+        if not strings:
+            return [], []
+        if fanout_size * len(strings) <= max_fanout:
+            fanout.append((field, strings))
+            fanout_size *= len(strings)
+        else:
+            residual.append((field, "in", values))
+    residual.extend(p for p in predicates if p[1] not in ("==", "in"))
+
+    branches = [
+        {**base, **dict(zip([field for field, _ in fanout], combination))}
+        for combination in product(*[values for _, values in fanout])
+    ]
+    return branches, residual
+
+def plan_request(where, filters: dict = None) -> tuple:
+    """Plan the requests of `get_data(where=..., filters=...)`, see `plan_query`.
+
+    Returns: (predicates, list of filter dicts, one per request, residual predicates, local_window).
+    `local_window` is True when offset and limit must be applied locally, i.e. when records are filtered
+    or merged from several requests, and False when they can be sent to the API.
+    """
+    predicates = parse_where(where)
+    branches, residual = plan_query(predicates, filters) if predicates else ([filters or {}], [])
+    return predicates, branches, residual, bool(residual) or len(branches) != 1
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _column_for(series: pd.Series, value):
+    """Convert a column of strings to the type of the constant it is compared with."""
+    values = value if isinstance(value, list) else [value]
+    if values and all(_is_number(v) for v in values):
+        return convert_column(series, "float"), values
+    if values and all(isinstance(v, (date, pd.Timestamp)) for v in values):
+        return convert_column(series, "datetime"), [pd.Timestamp(v) for v in values]
+    return series.astype("string"), [str(v) for v in values]
+
+def predicate_mask(df: pd.DataFrame, predicate: tuple) -> pd.Series:
+    """Evaluate a predicate on every row of a DataFrame of records, missing values never match."""
+    field, op, value = predicate
+    if field not in df.columns:
+        return pd.Series(False, index=df.index)
+    column, values = _column_for(df[field], value)
+    mask = column.isin(values) if op == "in" else COMPARATORS[op](column, values[0])
+    return pd.Series(mask, index=df.index).fillna(False).astype(bool) & column.notna()
+
+def frame_mask(df: pd.DataFrame, predicates: list) -> pd.Series:
+    """Rows of a DataFrame of records matching every predicate, evaluated with one vectorized pass per predicate."""
+    mask = pd.Series(True, index=df.index)
+    for predicate in predicates:
+        mask &= predicate_mask(df, predicate)
+    return mask
+
+def filter_frame(df: pd.DataFrame, predicates: list) -> pd.DataFrame:
+    """Keep the rows of a DataFrame of records matching every predicate."""
+    if not predicates or df.empty:
+        return df
+    return df[frame_mask(df, predicates)]
+
+def filter_records(records: list, predicates: list) -> list:
+    """Keep the records matching every predicate, evaluated with one vectorized pass per predicate."""
+    if not predicates or not records:
+        return records
+    mask = frame_mask(pd.DataFrame(records), predicates)
+    return [record for record, keep in zip(records, mask.tolist()) if keep]
+
+class PageWindow:
+    """Apply predicates to pages of records in order, then skip the first `offset` matching records and keep `limit`
+    of them. Call it with every page in turn, `done` is True once `limit` records were kept."""
+
+    def __init__(self, predicates: list, offset: int = 0, limit: int = None):
+        self.predicates = predicates
+        self.offset = offset
+        self.limit = limit
+
+    @property
+    def done(self) -> bool:
+        return self.limit == 0
+
+    def __call__(self, page: list) -> list:
+        page = filter_records(page, self.predicates)
+        if self.offset:
+            skipped = min(self.offset, len(page))
+            page, self.offset = page[skipped:], self.offset - skipped
+        if self.limit is not None:
+            page = page[: self.limit]
+            self.limit -= len(page)
+        return page
+
+def filter_pages(pages, predicates: list, offset: int = 0, limit: int = None):
+    """Apply predicates to pages of records as they stream in, then skip the first `offset` matching records
+    and stop after `limit` of them, see `PageWindow`. Pages left empty are dropped.
+    Stopping early closes `pages`, which cancels the pages still in flight."""
+    window = PageWindow(predicates, offset, limit)
+    for page in pages:
+        page = window(page)
+        if page:
+            yield page
+        if window.done:
+            return
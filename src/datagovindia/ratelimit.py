@@ -0,0 +1,275 @@
+"""Client-side rate limiting and adaptive concurrency control for requests to the OGD platform."""
+
+import os
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Status codes that signal the server is overloaded or throttling the client
+THROTTLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Seconds between two attempts of `RateLimiter.acquire_async` waiting for a request in flight to complete
+ASYNC_POLL_SECONDS = 0.01
+
+def resolve_rate(rate: float = None) -> float:
+    """Resolve the request rate limit (requests/second) from the argument or the `DATAGOVINDIA_RATE` environment variable.
+    None means no rate limit."""
+    if rate is None and os.environ.get("DATAGOVINDIA_RATE"):
+        rate = float(os.environ["DATAGOVINDIA_RATE"])
+    if rate is not None and rate <= 0:
+        raise ValueError(f"Invalid rate {rate}, rate must be positive")
+    return rate
+
+def parse_retry_after(value: str) -> float:
+    """Parse a Retry-After header (seconds or HTTP date) into a number of seconds, None if invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RateLimiter:
+    """Token bucket rate limiter with an AIMD (additive increase, multiplicative decrease) concurrency controller.
+
+    Shared by all threads making requests, every request calls `acquire` before and `release` after.
+
+        rate: (float) - Maximum sustained requests per second. None for no rate limit.
+        burst: (int) - Maximum number of requests sent back to back when tokens have accumulated. Defaults to max(1, rate).
+        max_concurrency: (int) - Upper bound of requests in flight.
+        min_concurrency: (int) - Lower bound of requests in flight.
+        latency_factor: (float) - Treat a response slower than `latency_factor` times the fastest typical latency as a congestion signal.
+        min_latency: (float) - Latencies below this many seconds are never a congestion signal.
+
+    The concurrency limit starts at `max_concurrency`, is halved on 429/5xx responses, connection errors and slow responses
+    (at most once per `decrease_interval` seconds), and grows by one request per window of successful responses.
+    A Retry-After header pauses all requests for the requested duration.
+    """
+
+    def __init__(
+        self,
+        rate: float = None,
+        burst: int = None,
+        max_concurrency: int = 256,
+        min_concurrency: int = 1,
+        latency_factor: float = 4.0,
+        min_latency: float = 0.05,
+        decrease_interval: float = 1.0,
+    ):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate or 1))
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_factor = latency_factor
+        self.min_latency = min_latency
+        self.decrease_interval = decrease_interval
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.tokens = float(self.burst)
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.latency = None
+        self.base_latency = None
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def _wait_time(self, now: float) -> float:
+        """Seconds to wait before a request can be sent, 0 if it can be sent now."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.concurrency):
+            return None  # Wait for a release
+        if self.rate is not None and self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0
+
+    def _try_acquire(self):
+        """Take a slot if a request may be sent now and return 0, otherwise return the wait time (see `_wait_time`).
+        Must be called with the condition held."""
+        now = time.monotonic()
+        self._refill(now)
+        wait = self._wait_time(now)
+        if wait == 0:
+            if self.rate is not None:
+                self.tokens -= 1
+            self.in_flight += 1
+        return wait
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        with self._condition:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return
+                self._condition.wait(wait)
+
+    async def acquire_async(self):
+        """Wait until a request may be sent without blocking the event loop, for requests sent by coroutines."""
+        import asyncio
+
+        while True:
+            with self._condition:
+                wait = self._try_acquire()
+            if wait == 0:
+                return
+            await asyncio.sleep(ASYNC_POLL_SECONDS if wait is None else wait)
+
+    def release(self, status: int = None, latency: float = None, retry_after: str = None):
+        """Report the outcome of a request sent after `acquire`.
+
+            status: (int) - HTTP status code of the response, None if the request failed without a response.
+            latency: (float) - Seconds taken by the request.
+            retry_after: (str) - Value of the Retry-After header of the response.
+        """
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+            pause = parse_retry_after(retry_after)
+            if pause:
+                self.paused_until = max(self.paused_until, now + pause)
+            if status is None or status in THROTTLE_STATUS_CODES:
+                self._decrease(now)
+            elif latency is not None and self._is_slow(latency):
+                self._decrease(now)
+            else:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self._condition.notify_all()
+
+    def cancel(self):
+        """Report a request sent after `acquire` that was cancelled by the client, which is not a congestion signal."""
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._condition.notify_all()
+
+    def _is_slow(self, latency: float) -> bool:
+        """Track an exponentially weighted latency and its best value, a request is slow if the average degrades."""
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.base_latency = self.latency if self.base_latency is None else min(self.base_latency, self.latency)
+        return self.latency > self.latency_factor * max(self.base_latency, self.min_latency)
+
+    def _decrease(self, now: float):
+        if now - self.last_decrease < self.decrease_interval:
+            return  # Errors of requests sent before the last decrease
+        self.last_decrease = now
+        self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+        if self.latency is not None:
+            # Forget the degraded latency so that recovery is measured against the new load
+            self.base_latency = self.latency
+
+    def set_max_concurrency(self, max_concurrency: int):
+        """Change the upper bound of requests in flight, e.g. to the number of workers."""
+        with self._condition:
+            self.max_concurrency = max(self.min_concurrency, max_concurrency)
+            self.concurrency = min(self.concurrency, self.max_concurrency)
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        """Current state of the limiter."""
+        with self._condition:
+            return {
+                "rate": self.rate,
+                "concurrency": round(self.concurrency, 2),
+                "in_flight": self.in_flight,
+                "latency": self.latency,
+                "paused_for": max(0.0, self.paused_until - time.monotonic()),
+            }
+
+class RateLimitedAdapter(HTTPAdapter):
+    """`requests` transport adapter that sends every request through a `RateLimiter`."""
+
+    def __init__(self, limiter: RateLimiter = None, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        limiter = getattr(self, "limiter", None)  # Not restored when the adapter is unpickled
+        if limiter is None:
+            return super().send(request, **kwargs)
+        limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            limiter.release(status=None, latency=time.monotonic() - started)
+            raise
+        except BaseException:
+            limiter.cancel()  # Interrupted, e.g. by KeyboardInterrupt
+            raise
+        limiter.release(
+            status=response.status_code,
+            latency=time.monotonic() - started,
+            retry_after=response.headers.get("Retry-After"),
+        )
+        return response
+
+if httpx is not None:
+
+    class RateLimitedTransport(httpx.HTTPTransport):
+        """`httpx` transport that sends every request through a `RateLimiter`."""
+
+        def __init__(self, limiter: RateLimiter = None, **kwargs):
+            self.limiter = limiter
+            super().__init__(**kwargs)
+
+        def handle_request(self, request):
+            if self.limiter is None:
+                return super().handle_request(request)
+            self.limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = super().handle_request(request)
+            except Exception:
+                self.limiter.release(status=None, latency=time.monotonic() - started)
+                raise
+            except BaseException:
+                self.limiter.cancel()  # Interrupted, e.g. by KeyboardInterrupt
+                raise
+            self.limiter.release(
+                status=response.status_code,
+                latency=time.monotonic() - started,
+                retry_after=response.headers.get("Retry-After"),
+            )
+            return response
+
+    class AsyncRateLimitedTransport(httpx.AsyncHTTPTransport):
+        """`httpx` async transport that sends every request through a `RateLimiter`, see `AsyncDataGovIndia`."""
+
+        def __init__(self, limiter: RateLimiter = None, **kwargs):
+            self.limiter = limiter
+            super().__init__(**kwargs)
+
+        async def handle_async_request(self, request):
+            if self.limiter is None:
+                return await super().handle_async_request(request)
+            await self.limiter.acquire_async()
+            started = time.monotonic()
+            try:
+                response = await super().handle_async_request(request)
+            except Exception:
+                self.limiter.release(status=None, latency=time.monotonic() - started)
+                raise
+            except BaseException:
+                self.limiter.cancel()  # The task sending the request was cancelled
+                raise
+            self.limiter.release(
+                status=response.status_code,
+                latency=time.monotonic() - started,
+                retry_after=response.headers.get("Retry-After"),
+            )
+            return response
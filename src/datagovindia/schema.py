@@ -0,0 +1,106 @@
+"""Typed DataFrame construction from the field metadata of OGD resources."""
+
+import warnings
+import pandas as pd
+
+# OGD field types and the kind of column they are parsed into
+FIELD_TYPE_MAP = {
+    "double": "float",
+    "float": "float",
+    "decimal": "float",
+    "long": "integer",
+    "integer": "integer",
+    "int": "integer",
+    "date": "datetime",
+    "datetime": "datetime",
+    "timestamp": "datetime",
+    "keyword": "category",
+    "text": "string",
+    "string": "string",
+}
+
+DTYPE_BACKENDS = ["numpy", "pyarrow"]
+
+# dtype of every kind of column. A kind always gives the same dtype whatever the values of a chunk,
+# so that typed chunks of a resource can be streamed to a single Parquet or Feather file.
+KIND_DTYPES = {
+    "float": "float64",
+    "integer": "Int64",
+    "datetime": "datetime64[ns]",
+    "category": "category",
+}
+
+def field_kinds(fields: list) -> dict:
+    """Map field ids to the kind of column they are parsed into, from the `field` list of `get_resource_info`."""
+    return {f["id"]: FIELD_TYPE_MAP.get(str(f.get("type", "")).lower(), "string") for f in fields or [] if "id" in f}
+
+def _to_integer(series: pd.Series) -> pd.Series:
+    """Parse into nullable integers, values with a fractional part or out of the int64 range become missing."""
+    numbers = pd.to_numeric(series, errors="coerce")
+    if numbers.dtype.kind != "i":
+        whole = (numbers % 1 == 0) & numbers.between(-(2**63), 2**63 - 1)
+        num_invalid = int((numbers.notna() & ~whole).sum())
+        if num_invalid:
+            warnings.warn(f"{num_invalid} values of integer column {series.name!r} are not integers and were set to missing.")
+        numbers = numbers.where(whole)
+    return numbers.astype("Int64")
+
+def _to_nanoseconds(dates: pd.Series) -> pd.Series:
+    """Timezone-naive nanosecond dates, whatever the resolution pandas inferred: timezone-aware dates are converted
+    to UTC, dates outside the nanosecond range (years 1677-2262) become missing."""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce", utc=True)  # Dates with different UTC offsets
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+    if dates.dtype != "datetime64[ns]":
+        dates = dates.where(dates.between(pd.Timestamp.min, pd.Timestamp.max)).astype("datetime64[ns]")
+    return dates
+
+def _to_datetime(series: pd.Series) -> pd.Series:
+    """Parse ISO 8601 dates, falling back to day-first dates (dd/mm/yyyy) common on the OGD platform."""
+    dates = None
+    try:
+        # utc=True accepts dates with different UTC offsets, naive dates are kept as they are by `_to_nanoseconds`
+        dates = _to_nanoseconds(pd.to_datetime(series, errors="coerce", format="ISO8601", utc=True))
+        if dates.notna().sum() >= series.notna().sum():
+            return dates
+    except (ValueError, TypeError):
+        pass  # pandas<2.0 does not support format="ISO8601"
+    # Columns mixing both formats keep their ISO 8601 dates, only the other values are parsed again: pandas infers
+    # the format of a column from its first value
+    rest = series if dates is None else series[dates.isna()]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        fallback = _to_nanoseconds(pd.to_datetime(rest, errors="coerce", dayfirst=True, utc=True))
+    return fallback if dates is None else dates.fillna(fallback)
+
+def convert_column(series: pd.Series, kind: str) -> pd.Series:
+    """Parse a column of strings into the dtype of `kind` (see `KIND_DTYPES`), values that cannot be parsed become missing."""
+    if kind == "float":
+        series = pd.to_numeric(series, errors="coerce")
+    elif kind == "integer":
+        series = _to_integer(series)
+    elif kind == "datetime":
+        series = _to_datetime(series)
+    return series.astype(KIND_DTYPES[kind]) if kind in KIND_DTYPES else series
+
+def apply_schema(df: pd.DataFrame, fields: list, dtype_backend: str = "numpy") -> pd.DataFrame:
+    """Convert the string columns of a DataFrame of OGD records to typed columns, one vectorized pass per column.
+
+        fields: (list) - `field` list of `get_resource_info`, dicts with an "id" and a "type".
+
+        dtype_backend: (str) - "numpy" (default) for numpy/pandas extension dtypes, "pyarrow" for Arrow-backed dtypes (requires pyarrow).
+
+    Columns without field metadata are left unchanged.
+    """
+    if dtype_backend not in DTYPE_BACKENDS:
+        raise ValueError(f"Invalid dtype_backend {dtype_backend}, valid backends are {DTYPE_BACKENDS}")
+    kinds = field_kinds(fields)
+    columns = {col: convert_column(df[col], kinds[col]) for col in df.columns if col in kinds}
+    if columns:
+        df = df.assign(**columns)
+    if dtype_backend == "pyarrow":
+        df = df.convert_dtypes(dtype_backend="pyarrow")
+        # convert_dtypes turns float columns of whole numbers into integers
+        df = df.astype({col: "double[pyarrow]" for col in columns if kinds[col] == "float"})
+    return df
@@ -0,0 +1,268 @@
+"""Sharded execution of `get_data` and `sync_metadata` across worker processes or hosts.
+
+A coordinator plans the pages of a request into work units stored in a SQLite work queue. Any number of workers,
+in other processes or on other hosts sharing the shard directory, claim units, fetch them and write one partial
+output per unit. Once every unit is done, a merge step assembles the outputs in the order of the plan.
+See `DataGovIndia.plan_data_shards`, `DataGovIndia.plan_sync_shards`, `DataGovIndia.run_shard_worker`
+and `DataGovIndia.merge_shards`.
+
+The shard directory holds:
+    queue.db : jobs and their units, with the status, worker and lease of every unit
+    <job_id>/unit-<n>.json : output of every completed unit
+
+Units are claimed for `lease` seconds: the units of a worker that died are handed out again once their lease expires,
+up to `max_attempts` claims per unit. Workers on several hosts need a shared filesystem with working POSIX locks
+(local disks, NFSv4 and most network filesystems with locking enabled), the queue does not use WAL for this reason.
+"""
+
+import os
+import json
+import time
+import shutil
+import socket
+import sqlite3
+import hashlib
+from datetime import datetime
+from datagovindia.checkpoint import write_json_atomic
+
+# Seconds after which a claimed unit that was not completed is handed out again
+DEFAULT_LEASE_SECONDS = 600
+
+# Claims of a unit after which it is marked as failed
+DEFAULT_MAX_ATTEMPTS = 5
+
+UNIT_STATUSES = ["pending", "claimed", "done", "failed"]
+
+def default_shard_root() -> str:
+    """Directory holding the work queue and unit outputs. Read from the environment variable DATAGOVINDIA_SHARD_DIR,
+    defaults to ~/.datagovindia/shards"""
+    return os.environ.get("DATAGOVINDIA_SHARD_DIR", os.path.join(os.path.expanduser("~"), ".datagovindia", "shards"))
+
+def default_worker_id() -> str:
+    """Identifier of the current worker process: <hostname>:<pid>"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class WorkQueue:
+    """SQLite work queue of sharded requests under `root`, see the module docstring.
+
+        root: (str) - Shard directory, shared by the coordinator and every worker. Defaults to `default_shard_root()`.
+        lease: (float) - Seconds a unit stays claimed by a worker. Defaults to `DEFAULT_LEASE_SECONDS`.
+        max_attempts: (int) - Claims of a unit after which it is marked as failed. Defaults to `DEFAULT_MAX_ATTEMPTS`.
+    """
+
+    def __init__(self, root: str = None, lease: float = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.root = root or default_shard_root()
+        self.lease = lease
+        self.max_attempts = max_attempts
+        os.makedirs(self.root, exist_ok=True)
+        self.path = os.path.join(self.root, "queue.db")
+        with self.connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    state TEXT,
+                    num_units INTEGER NOT NULL,
+                    created TEXT NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS units (
+                    job_id TEXT NOT NULL,
+                    unit INTEGER NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    claimed_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    num_records INTEGER,
+                    error TEXT,
+                    PRIMARY KEY (job_id, unit)
+                ) WITHOUT ROWID"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_units_status ON units (status, job_id)")
+
+    def connect(self) -> sqlite3.Connection:
+        """Connection in autocommit mode, writes use explicit `BEGIN IMMEDIATE` transactions.
+        Waits up to a minute for the lock held by another worker."""
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create_job(self, kind: str, params: dict, units: list, state: dict = None) -> str:
+        """Add a job whose units have the parameters in `units`, returns its id. The job is keyed by a hash of its kind
+        and parameters: planning the same request again while its job exists returns the existing job."""
+        key = hashlib.sha1(json.dumps([kind, params], sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        job_id = f"{kind}-{key}"
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is None:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, kind, params, state, num_units, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, json.dumps(params), json.dumps(state or {}), len(units),
+                     datetime.now().isoformat(timespec="seconds")),
+                )
+                conn.executemany(
+                    "INSERT INTO units (job_id, unit, params) VALUES (?, ?, ?)",
+                    [(job_id, i, json.dumps(unit)) for i, unit in enumerate(units)],
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        os.makedirs(self.directory(job_id), exist_ok=True)
+        return job_id
+
+    def job(self, job_id: str) -> dict:
+        """Kind, parameters, state and number of units of a job, None if there is no such job."""
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {**dict(row), "params": json.loads(row["params"]), "state": json.loads(row["state"] or "{}")}
+
+    def jobs(self) -> list:
+        """Every job of the queue along with its progress, oldest first."""
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT job_id, kind FROM jobs ORDER BY created, job_id").fetchall()
+        finally:
+            conn.close()
+        return [{"job_id": job_id, "kind": kind, **self.progress(job_id)} for job_id, kind in rows]
+
+    def claim(self, worker: str, job_id: str = None) -> dict:
+        """Claim the next unit of `job_id` (of any job if None) that is pending or whose lease expired.
+        Units whose lease expired after `max_attempts` claims are marked as failed.
+        Returns the unit as {"job_id", "unit", "params", "attempts"}, None if no unit is available."""
+        now = time.time()
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # A unit whose last allowed claim expired will never be completed, its worker died
+            conn.execute(
+                """UPDATE units SET status = 'failed', error = 'Lease of worker ' || worker || ' expired'
+                   WHERE status = 'claimed' AND claimed_at < ? AND attempts >= ?""",
+                (now - self.lease, self.max_attempts),
+            )
+            row = conn.execute(
+                """SELECT units.job_id, units.unit, units.params, units.attempts FROM units
+                   JOIN jobs ON jobs.job_id = units.job_id
+                   WHERE (units.status = 'pending' OR (units.status = 'claimed' AND units.claimed_at < ?))
+                     AND units.attempts < ? AND (? IS NULL OR units.job_id = ?)
+                   ORDER BY jobs.created, units.job_id, units.unit
+                   LIMIT 1""",
+                (now - self.lease, self.max_attempts, job_id, job_id),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    """UPDATE units SET status = 'claimed', worker = ?, claimed_at = ?, attempts = attempts + 1
+                       WHERE job_id = ? AND unit = ?""",
+                    (worker, now, row["job_id"], row["unit"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {"job_id": row["job_id"], "unit": row["unit"], "params": json.loads(row["params"]), "attempts": row["attempts"] + 1}
+
+    def complete(self, job_id: str, unit: int, num_records: int):
+        """Mark a unit as done, its output must already be written."""
+        self._update(
+            "UPDATE units SET status = 'done', num_records = ?, error = NULL WHERE job_id = ? AND unit = ?",
+            (num_records, job_id, unit),
+        )
+
+    def fail(self, job_id: str, unit: int, error: str):
+        """Give a unit back after a failed attempt. It is marked as failed once claimed `max_attempts` times."""
+        self._update(
+            """UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?
+               WHERE job_id = ? AND unit = ? AND status != 'done'""",
+            (self.max_attempts, error, job_id, unit),
+        )
+
+    def retry_failed(self, job_id: str) -> int:
+        """Make the failed units of a job pending again, with a fresh number of attempts. Returns the number of units."""
+        return self._update(
+            "UPDATE units SET status = 'pending', attempts = 0 WHERE job_id = ? AND status = 'failed'", (job_id,)
+        )
+
+    def _update(self, sql: str, params: tuple) -> int:
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rowcount = conn.execute(sql, params).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return rowcount
+
+    def progress(self, job_id: str) -> dict:
+        """Number of units of a job per status, along with the number of records of the completed units."""
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                "SELECT status, COUNT(*), SUM(num_records) FROM units WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        progress = {status: 0 for status in UNIT_STATUSES}
+        progress["records"] = 0
+        for status, count, num_records in rows:
+            progress[status] = count
+            if status == "done":
+                progress["records"] = num_records or 0
+        progress["units"] = sum(progress[status] for status in UNIT_STATUSES)
+        return progress
+
+    def errors(self, job_id: str) -> dict:
+        """Last error of the failed units of a job, by unit."""
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT unit, error FROM units WHERE job_id = ? AND status = 'failed'", (job_id,)).fetchall()
+        finally:
+            conn.close()
+        return {unit: error for unit, error in rows}
+
+    def directory(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def unit_path(self, job_id: str, unit: int) -> str:
+        """Path of the output of a unit."""
+        return os.path.join(self.directory(job_id), f"unit-{unit:08d}.json")
+
+    def write_unit(self, job_id: str, unit: int, data):
+        """Write the output of a unit, replaced atomically so that a unit completed twice is never partially written."""
+        write_json_atomic(self.unit_path(job_id, unit), data)
+
+    def read_unit(self, job_id: str, unit: int):
+        with open(self.unit_path(job_id, unit), encoding="utf-8") as f:
+            return json.load(f)
+
+    def remove(self, job_id: str):
+        """Delete a job, its units and their outputs."""
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM units WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        shutil.rmtree(self.directory(job_id), ignore_errors=True)
@@ -0,0 +1,46 @@
+"""Fixtures shared by the tests: a mock OGD API (see `benchmarks/mock_server.py`) and a client pointed at it."""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from mock_server import MockOGDServer, catalog_record
+
+@pytest.fixture(autouse=True)
+def datagovindia_env(tmp_path, monkeypatch):
+    """Keep every test away from the home directory and the real OGD API."""
+    monkeypatch.setenv("DATAGOVINDIA_API_KEY", "test")
+    monkeypatch.setenv("DATAGOVINDIA_API_URL", "http://127.0.0.1:9")
+    monkeypatch.setenv("DATAGOVINDIA_CACHE", "0")
+    monkeypatch.delenv("DATAGOVINDIA_RATE", raising=False)
+    monkeypatch.delenv("DATAGOVINDIA_ENGINE", raising=False)
+    for name, directory in (
+        ("DATAGOVINDIA_DB_PATH", "datagovindia.db"),
+        ("DATAGOVINDIA_CHECKPOINT_DIR", "checkpoints"),
+        ("DATAGOVINDIA_MIRROR_DIR", "mirror"),
+        ("DATAGOVINDIA_SHARD_DIR", "shards"),
+    ):
+        monkeypatch.setenv(name, str(tmp_path / directory))
+
+@pytest.fixture
+def server(monkeypatch):
+    """Mock OGD API with a small catalog and resources, served for the duration of a test."""
+    with MockOGDServer(catalog_size=1200, resource_size=2500, num_fields=2, max_page_size=1000) as mock:
+        monkeypatch.setenv("DATAGOVINDIA_API_URL", mock.url)
+        yield mock
+
+@pytest.fixture
+def client(server, tmp_path):
+    """`DataGovIndia` client of the mock API, with its database in the temporary directory of the test."""
+    from datagovindia import DataGovIndia
+
+    return DataGovIndia(db_path=str(tmp_path / "datagovindia.db"))
+
+@pytest.fixture
+def catalog():
+    """Compiled metadata records of the first resources of the mock catalog, as stored in `resources`."""
+    from datagovindia.core import compile_records
+
+    return compile_records([catalog_record(i) for i in range(50)])
@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+
+pytest.importorskip("httpx")
+
+from datagovindia.aio import AsyncDataGovIndia  # noqa: E402
+
+@pytest.fixture
+def aclient(server, tmp_path):
+    return AsyncDataGovIndia(db_path=str(tmp_path / "datagovindia.db"))
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"offset": 37, "limit": 1234, "batch_size": 500},
+        {"filters": {"state": "Goa"}, "fields": ["id", "value"]},
+        {"where": {"state": ["Kerala", "Goa"]}, "offset": 5, "limit": 300},
+        {"where": ["value > 100"], "batch_size": 700},
+        {"limit": 700, "typed": True},
+    ],
+)
+def test_get_data_matches_sync_client(aclient, client, kwargs):
+    async def run():
+        async with aclient:
+            return await aclient.get_data("resource", **kwargs)
+
+    assert asyncio.run(run()).equals(client.get_data("resource", **kwargs))
+
+def test_iter_data_matches_sync_client(aclient, client):
+    async def run():
+        async with aclient:
+            return await collect(aclient.iter_data("resource", offset=10, limit=2100, batch_size=500, chunksize=800))
+
+    chunks = asyncio.run(run())
+    expected = list(client.iter_data("resource", offset=10, limit=2100, batch_size=500, chunksize=800))
+    assert [len(chunk) for chunk in chunks] == [800, 800, 500]
+    assert all(chunk.equals(other) for chunk, other in zip(chunks, expected))
+
+def test_closing_iter_data_early_stops_fetching(aclient, server):
+    async def run():
+        async with aclient:
+            chunks = aclient.iter_data("resource", batch_size=100, njobs=2)
+            async for chunk in chunks:
+                break
+            await chunks.aclose()
+            return chunk
+
+    requests = server.stats["requests"]
+    assert len(asyncio.run(run())) == 100
+    assert server.stats["requests"] - requests <= 6
+
+def test_sync_metadata_matches_sync_client(aclient, client):
+    async def run():
+        async with aclient:
+            await aclient.sync_metadata(batch_size=500)
+            return await aclient.search(source="data.gov.in")
+
+    # Pages are stored as they arrive, compare the resources regardless of their order
+    results = asyncio.run(run()).sort_values("resource_id", ignore_index=True)
+    client.sync_metadata(batch_size=500)
+    expected = client.search(source="data.gov.in").sort_values("resource_id", ignore_index=True)
+    assert len(results) > 0
+    assert results.equals(expected)
+    assert aclient.local.get_update_info()["number_of_resources"] == client.get_update_info()["number_of_resources"]
+    # The helper client shares the database but never opens an HTTP session
+    assert aclient.local._session is None
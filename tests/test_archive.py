@@ -0,0 +1,72 @@
+import gzip
+import json
+import os
+import pytest
+import datagovindia.archive as archive
+from datagovindia.archive import ArchiveIndex, build_archive_index, resource_id_from_bytes, resource_id_to_bytes
+
+IDS = [f"{i:08x}-0000-4000-8000-{i:012x}" for i in range(6)]
+
+def write_gz(path, data):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(data, f)
+
+@pytest.fixture
+def data_dir(tmp_path):
+    directory = tmp_path / "data"
+    directory.mkdir()
+    write_gz(directory / "orgtypeidx_map.gz", {"Central": IDS[:4], "State": IDS[4:]})
+    # Maps are also archived as lists of dicts
+    write_gz(directory / "sourceidx_map.gz", [{"data.gov.in": IDS[::2]}, {"tn.data.gov.in": IDS[1::2]}])
+    write_gz(directory / "attributes.gz", {"sources": ["tn.data.gov.in", "data.gov.in"], "org_types": ["State", "Central"]})
+    write_gz(directory / "fielddtype_map.gz", {"last_updated": "date"})
+    write_gz(directory / "fieldlabel_map.gz", {"last_updated": "Last Updated"})
+    return str(directory)
+
+def test_resource_id_round_trip():
+    assert resource_id_from_bytes(resource_id_to_bytes(IDS[3])) == IDS[3]
+    assert resource_id_from_bytes(resource_id_to_bytes(IDS[3].replace("-", ""))) == IDS[3]
+    assert len(resource_id_to_bytes(IDS[3])) == 16
+
+def test_archive_index_lookups(data_dir, tmp_path):
+    path = build_archive_index(data_dir, str(tmp_path / "archive.db"))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+    index = ArchiveIndex(path)
+    try:
+        assert index.lookup(IDS[1]) == {"org_type": "Central", "source": "tn.data.gov.in"}
+        assert index.lookup(IDS[4]) == {"org_type": "State", "source": "data.gov.in"}
+        assert index.lookup("ffffffff-0000-4000-8000-000000000000") is None
+        assert index.lookup("not-a-resource-id") is None
+        assert index.count() == 6
+        assert index.count(org_type="Central", source="data.gov.in") == 2
+        assert index.resource_ids(org_type="State") == IDS[4:]
+        assert index.resource_ids(source="tn.data.gov.in", org_type="State") == [IDS[5]]
+        assert index.resource_ids(org_type="Unknown") == [] and index.count(source="Unknown") == 0
+        assert index.attribute_values("sources") == ["data.gov.in", "tn.data.gov.in"]
+        assert index.field_info() == {"last_updated": {"dtype": "date", "label": "Last Updated"}}
+    finally:
+        index.close()
+
+def test_missing_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "default_archive_dir", lambda: None)
+    with pytest.raises(ValueError, match="DATAGOVINDIA_ARCHIVE_DIR"):
+        build_archive_index(path=str(tmp_path / "archive.db"))
+    with pytest.raises(ValueError, match="build_archive_index"):
+        ArchiveIndex(str(tmp_path / "archive.db"))
+
+def test_default_archive_dir(data_dir, monkeypatch):
+    monkeypatch.setenv("DATAGOVINDIA_ARCHIVE_DIR", data_dir)
+    assert archive.default_archive_dir() == os.path.normpath(data_dir)
+
+def test_bundled_archive(tmp_path):
+    data_dir = os.path.join(os.path.dirname(__file__), os.pardir, "data")
+    if not os.path.exists(os.path.join(data_dir, "orgtypeidx_map.gz")):
+        pytest.skip("The archived maps are only part of a source checkout")
+    index = ArchiveIndex(build_archive_index(data_dir, str(tmp_path / "archive.db")))
+    try:
+        org_types = archive._load_map(os.path.join(data_dir, "orgtypeidx_map.gz"))
+        assert {name: index.count(org_type=name) for name in org_types} == {name: len(set(ids)) for name, ids in org_types.items()}
+        name, resource_ids = next(iter(org_types.items()))
+        assert index.lookup(resource_ids[0])["org_type"] == name
+    finally:
+        index.close()
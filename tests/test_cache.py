@@ -0,0 +1,190 @@
+import json
+import threading
+import pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from datagovindia.cache import CachedSession, ResponseCache, canonical_cache_key, resolve_cache
+
+class ETagServer:
+    """Serves a JSON body with an ETag, answers conditional requests for the current ETag with 304."""
+
+    def __init__(self):
+        self.version = 1
+        self.statuses = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                etag = f'"v{server.version}"'
+                if self.headers.get("If-None-Match") == etag:
+                    server.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps({"version": server.version, "records": []}).encode()
+                server.statuses.append(200)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, query: str = "offset=0&limit=10") -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/resource/abc?api-key=secret&{query}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class KeyServer:
+    """OGD API stand-in that only answers /resource requests sent with the API key "good"."""
+
+    def __init__(self):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.startswith("/lists"):
+                    status, body = 200, {"records": [{"index_name": "abc"}]}
+                elif "api-key=good" in self.path:
+                    status, body = 200, {"records": [{"id": "1"}]}
+                else:
+                    status, body = 403, {"error": "Invalid key"}
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.httpd.server_address[:2]
+        self.url = f"http://{host}:{port}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def etag_server():
+    server = ETagServer()
+    yield server
+    server.close()
+
+def test_canonical_cache_key():
+    key = canonical_cache_key("HTTPS://API.data.gov.in/resource/abc?limit=10&api-key=secret&offset=0")
+    assert key == "https://api.data.gov.in/resource/abc?limit=10&offset=0"
+    assert canonical_cache_key("https://api.data.gov.in/resource/abc?offset=0&limit=10&api-key=other") == key
+
+def test_fresh_responses_are_served_from_cache(tmp_path, etag_server):
+    session = CachedSession(ResponseCache(str(tmp_path / "cache.db")))
+    assert session.get(etag_server.url()).json()["version"] == 1
+    response = session.get(etag_server.url().replace("secret", "other-key"))
+    assert response.from_cache
+    assert response.json()["version"] == 1
+    assert etag_server.statuses == [200]
+
+def test_stale_responses_are_revalidated(tmp_path, etag_server):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl={"resource": 0})
+    session = CachedSession(cache)
+    session.get(etag_server.url())
+    key = canonical_cache_key(etag_server.url())
+    stored_at = cache.get(key)["stored_at"]
+
+    response = session.get(etag_server.url())
+    assert response.status_code == 200 and response.from_cache
+    assert response.json()["version"] == 1
+    assert cache.get(key)["stored_at"] > stored_at
+
+    etag_server.version = 2
+    assert session.get(etag_server.url()).json()["version"] == 2
+    assert etag_server.statuses == [200, 304, 200]
+    assert json.loads(cache.get(key)["body"])["version"] == 2
+
+def test_ttl_is_per_endpoint(tmp_path, etag_server):
+    session = CachedSession(ResponseCache(str(tmp_path / "cache.db"), ttl={"resource_info": 0}))
+    session.get(etag_server.url("offset=0&limit=0"))
+    session.get(etag_server.url("offset=0&limit=0"))
+    session.get(etag_server.url())
+    session.get(etag_server.url())
+    assert etag_server.statuses == [200, 304, 200]
+
+def test_least_recently_used_responses_are_evicted(tmp_path, etag_server):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_size=60)
+    session = CachedSession(cache)
+    for offset in range(3):
+        session.get(etag_server.url(f"offset={offset}&limit=10"))
+    assert cache.get(canonical_cache_key(etag_server.url("offset=0&limit=10"))) is None
+    assert cache.get(canonical_cache_key(etag_server.url("offset=2&limit=10"))) is not None
+
+def test_resolve_cache(tmp_path, monkeypatch):
+    assert resolve_cache() is None
+    assert resolve_cache(False) is None
+    path = str(tmp_path / "cache.db")
+    monkeypatch.setenv("DATAGOVINDIA_CACHE", path)
+    assert resolve_cache().path == path
+    cache = ResponseCache(path)
+    assert resolve_cache(cache) is cache
+
+def test_client_caches_resource_pages(server, tmp_path):
+    from datagovindia import DataGovIndia
+
+    datagovin = DataGovIndia(db_path=str(tmp_path / "datagovindia.db"), cache=str(tmp_path / "cache.db"))
+    first = datagovin.get_data("resource", limit=100)
+    requests = server.stats["requests"]
+    assert datagovin.get_data("resource", limit=100).equals(first)
+    assert server.stats["requests"] == requests
+
+def test_requests_can_bypass_the_cache(tmp_path, etag_server):
+    session = CachedSession(ResponseCache(str(tmp_path / "cache.db")))
+    session.get(etag_server.url())
+    response = session.get(etag_server.url(), cache=False)
+    assert not getattr(response, "from_cache", False)
+    assert etag_server.statuses == [200, 200]
+
+def test_api_key_validation_bypasses_the_cache(tmp_path, monkeypatch):
+    from datagovindia.core import check_api_key, create_session
+
+    server = KeyServer()
+    try:
+        monkeypatch.setenv("DATAGOVINDIA_API_URL", server.url)
+        session = create_session(cache=ResponseCache(str(tmp_path / "cache.db")))
+        assert check_api_key("good", session=session)
+        assert not check_api_key("bad", session=session)
+    finally:
+        server.close()
+
+def test_cache_is_only_summed_once_it_may_be_full(tmp_path, etag_server, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_size=100)
+    session = CachedSession(cache)
+    evictions = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: evictions.append(1) or evict())
+    # Bodies are 29 bytes: the cache is summed when the first one is stored, then once 4 bodies may exceed 100 bytes
+    for offset in range(3):
+        session.get(etag_server.url(f"offset={offset}&limit=10"))
+    assert len(evictions) == 1
+    session.get(etag_server.url("offset=3&limit=10"))
+    assert len(evictions) == 2
+    total = cache.connect().execute("SELECT SUM(size) FROM responses").fetchone()[0]
+    assert total <= 100
+    cache.clear()
+    session.get(etag_server.url("offset=4&limit=10"))
+    assert len(evictions) == 2
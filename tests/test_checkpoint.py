@@ -0,0 +1,78 @@
+import os
+import pytest
+from urllib.parse import urlsplit, parse_qs
+import datagovindia.core as core
+from datagovindia.checkpoint import Checkpoint
+
+def offset_of(url: str) -> int:
+    return int(parse_qs(urlsplit(url).query)["offset"][0])
+
+def test_checkpoint_records_completed_pages(tmp_path):
+    checkpoint = Checkpoint.for_request("get_data", {"resource_id": "resource"}, root=str(tmp_path))
+    checkpoint.state = {"pages": [[{}, 0, 2]]}
+    checkpoint.save_manifest()
+    checkpoint.write_page(0, 2, [{"id": "0"}, {"id": "1"}])
+    checkpoint.mark_done(0, 2, 2)
+
+    reopened = Checkpoint.for_request("get_data", {"resource_id": "resource"}, root=str(tmp_path))
+    assert reopened.directory == checkpoint.directory
+    assert reopened.state == {"pages": [[{}, 0, 2]]}
+    assert reopened.is_done(0, 2) and not reopened.is_done(2, 2)
+    assert reopened.read_page(0, 2) == [{"id": "0"}, {"id": "1"}]
+    assert Checkpoint.for_request("get_data", {"resource_id": "other"}, root=str(tmp_path)).directory != checkpoint.directory
+    reopened.clear()
+    assert not os.path.exists(checkpoint.directory)
+
+def test_get_data_resumes_missing_pages(client, tmp_path, monkeypatch):
+    expected = client.get_data("resource", batch_size=500)
+    spool_page = core.spool_page
+    fetched = []
+
+    def failing_spool_page(url, path, session=None):
+        if offset_of(url) == 1500:
+            raise ValueError("Page failed")
+        fetched.append(offset_of(url))
+        return spool_page(url, path, session)
+
+    monkeypatch.setattr(core, "spool_page", failing_spool_page)
+    with pytest.raises(ValueError):
+        client.get_data("resource", batch_size=500, njobs=1, resume=True)
+    assert 1500 not in fetched
+
+    def recording_spool_page(url, path, session=None):
+        fetched.append(offset_of(url))
+        return spool_page(url, path, session)
+
+    fetched.clear()
+    monkeypatch.setattr(core, "spool_page", recording_spool_page)
+    data = client.get_data("resource", batch_size=500, njobs=1, resume=True)
+    assert data.equals(expected)
+    assert 1500 in fetched and 0 not in fetched and 500 not in fetched
+    assert os.listdir(os.environ["DATAGOVINDIA_CHECKPOINT_DIR"]) == []
+
+def test_sync_metadata_resumes_missing_pages(client, server, monkeypatch):
+    fetch_metadata = core._fetch_metadata
+    fetched = []
+
+    def failing_fetch_metadata(api_key, start, end, active, session):
+        if start == 800:
+            raise ValueError("Page failed")
+        fetched.append(start)
+        return fetch_metadata(api_key, start, end, active, session)
+
+    monkeypatch.setattr(core, "_fetch_metadata", failing_fetch_metadata)
+    with pytest.raises(ValueError):
+        client.sync_metadata(batch_size=400, njobs=1, resume=True)
+
+    def recording_fetch_metadata(api_key, start, end, active, session):
+        fetched.append(start)
+        return fetch_metadata(api_key, start, end, active, session)
+
+    fetched.clear()
+    monkeypatch.setattr(core, "_fetch_metadata", recording_fetch_metadata)
+    client.sync_metadata(batch_size=400, njobs=1, resume=True)
+    assert fetched == [800]
+    info = client.get_update_info()
+    assert info["number_of_resources"] == server.catalog_size
+    assert info["num_fetched"] == server.catalog_size
+    assert os.listdir(os.environ["DATAGOVINDIA_CHECKPOINT_DIR"]) == []
@@ -0,0 +1,54 @@
+import json
+import pandas as pd
+import datagovindia.core as core
+from datagovindia.core import concat_columns, decode_json, records_to_columns, window_columns
+
+class Response:
+    def __init__(self, data):
+        self.content = json.dumps(data).encode()
+
+    def json(self):
+        return json.loads(self.content)
+
+def test_records_to_columns():
+    assert records_to_columns([]) == {}
+    assert records_to_columns([{"a": "1", "b": "2"}, {"a": "3", "b": "4"}]) == {"a": ["1", "3"], "b": ["2", "4"]}
+    assert records_to_columns([{"a": "1"}, {"b": "2"}]) == {"a": ["1", None], "b": [None, "2"]}
+
+def test_concat_columns():
+    pages = [
+        [{"a": "1", "b": "2"}],
+        [],
+        [{"a": "3", "c": "4"}, {"a": "5", "c": "6"}],
+        [{"b": "7"}],
+    ]
+    columns = concat_columns(records_to_columns(page) for page in pages)
+    assert columns == {"a": ["1", "3", "5", None], "b": ["2", None, None, "7"], "c": [None, "4", "6", None]}
+    assert concat_columns([]) == {}
+
+def test_window_columns():
+    pages = [{"v": list(range(start, start + 5))} for start in range(0, 25, 5)]
+    assert concat_columns(window_columns(pages, offset=3, limit=9)) == {"v": list(range(3, 12))}
+    assert concat_columns(window_columns(pages, offset=7)) == {"v": list(range(7, 25))}
+    assert concat_columns(window_columns(pages, offset=30)) == {"v": []}
+
+    consumed = []
+
+    def generate():
+        for page in pages:
+            consumed.append(page["v"][0])
+            yield page
+
+    list(window_columns(generate(), limit=6))
+    assert consumed == [0, 5]
+
+def test_decode_json_with_and_without_orjson(monkeypatch):
+    data = {"total": 2, "records": [{"a": "1"}, {"a": "ä"}]}
+    assert decode_json(Response(data)) == data
+    monkeypatch.setattr(core, "orjson", None)
+    assert decode_json(Response(data)) == data
+
+def test_get_data_builds_frames_from_columns(client):
+    data = client.get_data("resource", offset=10, limit=2000, batch_size=700)
+    expected = pd.DataFrame(core.get_api_records(core.build_url(client.api_key, "resource", offset=10, limit=1000)))
+    assert data.iloc[:1000].equals(expected)
@@ -0,0 +1,27 @@
+import pytest
+from mock_server import catalog_record
+from datagovindia.core import compile_record_info, compile_records, format_date, normalize_date
+
+@pytest.mark.parametrize(
+    "date_string",
+    [
+        "2024-06-01T10:20:30Z",
+        "2024-06-01",
+        "2024-06-01T10:20:30+05:30",
+        "2024-06-01T10:20:30",
+        "2024-06-01 10:20:30",
+        "01/06/2024",
+        "June 1, 2024",
+        "not a date",
+        "",
+        None,
+    ],
+)
+def test_normalize_date_matches_format_date(date_string):
+    assert normalize_date(date_string) == format_date(date_string)
+
+def test_compile_records_matches_compile_record_info():
+    records = [catalog_record(i) for i in range(100)]
+    records.append({"index_name": "empty"})
+    records.append({"index_name": "nested", "org": [["Ministry", ["of Data"]]], "updated_date": "12/01/2020"})
+    assert compile_records(records) == [compile_record_info(record) for record in records]
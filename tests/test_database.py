@@ -0,0 +1,55 @@
+import sqlite3
+import pytest
+from datagovindia import DataGovIndia
+from datagovindia.core import FACET_TABLES, METADATA_COLUMNS
+
+@pytest.fixture
+def old_database(tmp_path, catalog):
+    """Database of a version without facet tables, full-text index or sync stats."""
+    path = str(tmp_path / "old.db")
+    datagovin = DataGovIndia(db_path=path)
+    with datagovin.connect() as conn:
+        datagovin._create_resources_table(conn.cursor())
+        conn.execute("CREATE TABLE metadata(id INTEGER PRIMARY KEY, last_updated TEXT, number_of_resources INTEGER)")
+        conn.execute("INSERT INTO metadata (last_updated, number_of_resources) VALUES ('2024-01-01T00:00:00', 50)")
+        conn.commit()
+    datagovin.upsert_records("resources", catalog)
+    return datagovin
+
+def facet_rows(datagovin, table: str, resource_id: str) -> set:
+    key = FACET_TABLES[table][0]
+    with datagovin.connect() as conn:
+        return {row[0] for row in conn.execute(f"SELECT {key} FROM {table} WHERE resource_id = ?", (resource_id,))}
+
+def test_ensure_schema_migrates_old_database(old_database, catalog):
+    old_database.ensure_schema()
+    with old_database.connect() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(metadata)")}
+    assert set(METADATA_COLUMNS) <= columns
+    assert old_database.get_update_info()["number_of_resources"] == 50
+    record = catalog[0]
+    assert facet_rows(old_database, "resource_field", record["resource_id"]) == set(record["fields"].split(" | "))
+    assert record["resource_id"] in set(old_database.search(orgs=[record["orgs"]])["resource_id"])
+    assert len(old_database.search(record["title"].split()[0])) > 0
+    # Running it again is a no-op
+    old_database.ensure_schema()
+    assert len(old_database.search(source=record["source"])) == sum(r["source"] == record["source"] for r in catalog)
+
+def test_facets_follow_replaced_and_deleted_resources(old_database, catalog):
+    old_database.ensure_schema()
+    record = dict(catalog[0], orgs="Ministry of Tests", sectors="Testing")
+    old_database.upsert_records("resources", [record])
+    assert facet_rows(old_database, "resource_org", record["resource_id"]) == {"Ministry of Tests"}
+    assert facet_rows(old_database, "resource_sector", record["resource_id"]) == {"Testing"}
+    assert list(old_database.search(orgs=["ministry of tests"])["resource_id"]) == [record["resource_id"]]
+
+    old_database._remove_resources([record["resource_id"]])
+    for table in FACET_TABLES:
+        assert facet_rows(old_database, table, record["resource_id"]) == set()
+
+def test_search_rejects_missing_database(tmp_path):
+    datagovin = DataGovIndia(db_path=str(tmp_path / "missing.db"))
+    with pytest.raises(ValueError):
+        datagovin.search("mgnrega")
+    with sqlite3.connect(str(tmp_path / "missing.db")) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0
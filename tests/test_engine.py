@@ -0,0 +1,42 @@
+import time
+import pytest
+from datagovindia.core import iter_parallel, run_parallel, resolve_engine, resolve_njobs
+
+def slow_square(x: int) -> int:
+    time.sleep(0.01 * (x % 3))
+    return x * x
+
+@pytest.mark.parametrize("engine", ["thread", "process"])
+def test_run_parallel_keeps_order(engine):
+    assert run_parallel(slow_square, [(x,) for x in range(20)], njobs=4, engine=engine) == [x * x for x in range(20)]
+
+def test_iter_parallel_unordered_yields_every_index():
+    results = list(iter_parallel(slow_square, [(x,) for x in range(20)], njobs=4, ordered=False))
+    assert sorted(results) == [(x, x * x) for x in range(20)]
+
+def test_iter_parallel_consumes_args_lazily():
+    consumed = []
+
+    def args():
+        for x in range(100):
+            consumed.append(x)
+            yield (x,)
+
+    results = iter_parallel(slow_square, args(), njobs=2, max_in_flight=4)
+    assert next(results) == 0
+    assert len(consumed) <= 5
+    results.close()
+
+def test_resolve_engine(monkeypatch):
+    assert resolve_engine() == "thread"
+    monkeypatch.setenv("DATAGOVINDIA_ENGINE", "process")
+    assert resolve_engine() == "process"
+    assert resolve_njobs(0, "thread") == 1
+    with pytest.raises(ValueError):
+        resolve_engine("fork")
+
+def test_get_data_engines_agree(client):
+    thread = client.get_data("resource", batch_size=300, limit=1000, engine="thread")
+    process = client.get_data("resource", batch_size=300, limit=1000, njobs=2, engine="process")
+    assert len(thread) == 1000
+    assert thread.equals(process)
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+def test_iter_data_chunks_concatenate_to_get_data(client):
+    data = client.get_data("resource", batch_size=400)
+    assert len(data) == 2500
+    assert list(data["id"]) == [str(j) for j in range(2500)]
+    chunks = list(client.iter_data("resource", batch_size=400, chunksize=700))
+    assert [len(chunk) for chunk in chunks] == [700, 700, 700, 400]
+    assert pd.concat(chunks, ignore_index=True).equals(data)
+
+def test_iter_data_pages_as_records(client):
+    pages = list(client.iter_data("resource", batch_size=1000, limit=2200, as_frame=False))
+    assert [len(page) for page in pages] == [1000, 1000, 200]
+    assert pages[2][-1]["id"] == "2199"
+
+def test_get_data_chunksize_returns_iterator(client):
+    chunks = client.get_data("resource", limit=50, chunksize=20)
+    assert not isinstance(chunks, pd.DataFrame)
+    assert [len(chunk) for chunk in chunks] == [20, 20, 10]
+
+def test_iter_data_closed_early_stops_fetching(client, server):
+    chunks = client.iter_data("resource", batch_size=100, njobs=2)
+    next(chunks)
+    chunks.close()
+    # The first page, then at most 2 * njobs pages fetched ahead
+    assert server.stats["requests"] <= 6
+
+@pytest.mark.parametrize("chunksize, expected", [(None, [[]]), (1, []), (999, [])])
+def test_iter_data_past_the_end(client, chunksize, expected):
+    assert list(client.iter_data("resource", offset=5000, chunksize=chunksize, as_frame=False)) == expected
+    assert client.get_data("resource", offset=5000).empty
+
+def test_plan_windows():
+    from datagovindia.core import plan_windows
+
+    assert plan_windows(10, 35, 10) == [(10, 10), (20, 10), (30, 5)]
+    assert plan_windows(10, 10, 10) == []
+
+def test_adapt_batch_size():
+    from datagovindia.core import MIN_BATCH_SIZE, TARGET_PAGE_SECONDS, adapt_batch_size
+
+    assert adapt_batch_size(2000, 2000, 2000, 1.0) == 2000
+    # Capped by the API
+    assert adapt_batch_size(2000, 2000, 1000, 1.0) == 1000
+    # A short last page is not a cap
+    assert adapt_batch_size(2000, 2000, 1000, 1.0, more=False) == 2000
+    assert adapt_batch_size(2000, 2000, 2000, 2 * TARGET_PAGE_SECONDS) == 1000
+    assert adapt_batch_size(2000, 2000, 2000, 1000 * TARGET_PAGE_SECONDS) == MIN_BATCH_SIZE
+
+@pytest.mark.parametrize(
+    "offset, limit, batch_size",
+    [(0, None, 2000), (0, 1, 500), (37, 1234, 500), (2400, None, 300), (2400, 500, 300), (0, 2500, 2500), (999, 2, 1)],
+)
+def test_get_data_windows(client, server, offset, limit, batch_size):
+    everything = [str(j) for j in range(2500)]
+    requests = server.stats["requests"]
+    data = client.get_data("resource", offset=offset, limit=limit, batch_size=batch_size)
+    stop = None if limit is None else offset + limit
+    assert list(data["id"]) == everything[offset:stop]
+    # Pages of at most `max_page_size` records are planned from the first response, the total is never requested separately
+    page_size = min(batch_size, server.max_page_size)
+    assert server.stats["requests"] - requests == max(1, -(-len(data) // page_size))
@@ -0,0 +1,72 @@
+import os
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+import datagovindia.core as core
+from datagovindia.cli import cli
+
+RESOURCE_IDS = ["resource-a", "resource-b", "resource-c"]
+
+def test_get_data_many_matches_get_data(client, server):
+    expected = client.get_data("resource-a", batch_size=1000)
+    requests = server.stats["requests"]
+    results = client.get_data_many(RESOURCE_IDS + ["resource-a"], batch_size=1000)
+    assert sorted(results) == RESOURCE_IDS
+    for data in results.values():
+        assert data.equals(expected)
+    # 3 pages of every resource, the total is taken from the first page
+    assert server.stats["requests"] - requests == 9
+
+@pytest.mark.parametrize("file_format", ["csv", "jsonl", "parquet"])
+def test_get_data_many_writes_one_file_per_resource(client, tmp_path, file_format):
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    expected = client.get_data("resource-a", batch_size=1000)
+    results = client.get_data_many(RESOURCE_IDS, output_dir=str(tmp_path / "out"), file_format=file_format, batch_size=1000)
+    assert results == {rid: 2500 for rid in RESOURCE_IDS}
+    path = str(tmp_path / "out" / f"resource-b.{file_format}")
+    if file_format == "csv":
+        data = pd.read_csv(path, dtype=str, keep_default_na=False)
+    elif file_format == "jsonl":
+        data = pd.read_json(path, lines=True, dtype=str)
+    else:
+        data = pd.read_parquet(path)
+    assert data["id"].astype(str).tolist() == expected["id"].tolist()
+
+def test_get_data_many_skips_failed_resources(client, tmp_path, monkeypatch):
+    open_request = client._open_request
+
+    def failing_open_request(resource_id, **kwargs):
+        if resource_id == "resource-a":
+            raise ValueError("No such resource")
+        return open_request(resource_id, **kwargs)
+
+    def failing_records(url, session=None):
+        # Fail a later page of resource-c, after its first page was written
+        if "resource-c" in url and "offset=1000" in url:
+            raise ValueError("Broken page")
+        return get_api_records(url, session=session)
+
+    get_api_records = core.get_api_records
+    monkeypatch.setattr(client, "_open_request", failing_open_request)
+    monkeypatch.setattr(core, "get_api_records", failing_records)
+    output_dir = tmp_path / "out"
+    results = client.get_data_many(RESOURCE_IDS, output_dir=str(output_dir), batch_size=1000)
+    assert results == {"resource-a": None, "resource-b": 2500, "resource-c": None}
+    assert sorted(os.listdir(output_dir)) == ["resource-b.csv"]
+
+def test_get_data_batch_cli(server, tmp_path):
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text("# Nightly resources\nresource-a\n\nresource-b\n")
+    output_dir = tmp_path / "out"
+    result = CliRunner().invoke(
+        cli, ["get-data-batch", "--ids-file", str(ids_file), "--output-dir", str(output_dir), "--batch-size", "1000"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "5000 records of 2 resources" in result.output
+    assert sorted(os.listdir(output_dir)) == ["resource-a.csv", "resource-b.csv"]
+
+def test_get_data_batch_cli_requires_ids(server, tmp_path):
+    result = CliRunner().invoke(cli, ["get-data-batch", "--output-dir", str(tmp_path / "out")])
+    assert result.exit_code != 0
+    assert "No resource IDs" in result.output
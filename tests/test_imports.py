@@ -0,0 +1,15 @@
+import pytest
+import datagovindia
+from import_time import SCENARIOS, run_scenario
+
+@pytest.mark.parametrize("name", [name for name, (_, forbidden) in SCENARIOS.items() if forbidden])
+def test_imports_stay_lazy(name):
+    code, forbidden = SCENARIOS[name]
+    assert run_scenario(code, forbidden, repeat=1)["loaded"] == []
+
+def test_every_export_resolves():
+    for name in datagovindia.__all__:
+        assert getattr(datagovindia, name) is not None
+    assert set(datagovindia.__all__) <= set(dir(datagovindia))
+    with pytest.raises(AttributeError):
+        datagovindia.no_such_export
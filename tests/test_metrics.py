@@ -0,0 +1,70 @@
+import json
+import pytest
+from datagovindia.metrics import METRICS, Histogram, Metrics, endpoint_of
+
+@pytest.fixture
+def metrics():
+    METRICS.enable()
+    yield METRICS
+    METRICS.disable()
+    METRICS.reset()
+
+def test_endpoint_of():
+    assert endpoint_of("https://api.data.gov.in/lists?format=json&offset=0&limit=1000") == "lists"
+    assert endpoint_of("https://api.data.gov.in/resource/abc?format=json&offset=0&limit=0") == "resource_info"
+    assert endpoint_of("https://api.data.gov.in/resource/abc?format=json&offset=0&limit=1000") == "resource"
+    assert endpoint_of("https://api.data.gov.in/catalog/abc") == "other"
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    assert histogram.quantile(0.5) is None
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 0]
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(0.99) == 3.0  # Clamped to the largest value observed
+    assert histogram.quantile(0.0) == 0.5
+
+def test_disabled_metrics_collect_nothing():
+    metrics = Metrics()
+    metrics.inc("requests_total", endpoint="resource", status="200")
+    with metrics.stage("json_decode", 10):
+        pass
+    assert metrics.counters == {} and metrics.histograms == {}
+
+def test_exports():
+    metrics = Metrics()
+    metrics.enable()
+    metrics.inc("requests_total", endpoint="resource", status="200")
+    metrics.inc("response_bytes_total", 100, endpoint="resource")
+    metrics.observe("request_seconds", 0.02, endpoint="resource")
+    with metrics.stage("compile_records") as counter:
+        counter["records"] = 50
+    report = metrics.report()
+    assert report["requests"]["resource"]["status"] == {"200": 1}
+    assert report["requests"]["resource"]["bytes"] == 100
+    assert report["stages"]["compile_records"]["records"] == 50
+    text = metrics.to_prometheus()
+    assert "# TYPE datagovindia_requests_total counter" in text
+    assert 'datagovindia_requests_total{endpoint="resource",status="200"} 1' in text
+    assert 'datagovindia_request_seconds_bucket{endpoint="resource",le="0.025"} 1' in text
+    assert 'datagovindia_request_seconds_bucket{endpoint="resource",le="+Inf"} 1' in text
+
+def test_fetch_and_sync_are_instrumented(metrics, client, server, tmp_path):
+    client.sync_metadata(batch_size=500)
+    client.get_data("resource", batch_size=1000)
+    report = metrics.report()
+    # The size of the catalog, then 3 pages
+    assert report["requests"]["lists"]["status"] == {"200": 4}
+    assert report["requests"]["resource"]["status"] == {"200": 3}
+    assert report["stages"]["compile_records"]["records"] == 1200
+    assert report["stages"]["dataframe_build"]["records"] == 2500
+    for stage in ("json_decode", "stage_records"):
+        assert report["stages"][stage]["count"] > 0
+
+    metrics.write(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as f:
+        assert json.load(f)["requests"]["resource"]["count"] == 3
+    metrics.write(str(tmp_path / "metrics.prom"))
+    with open(tmp_path / "metrics.prom") as f:
+        assert 'datagovindia_records_total{stage="compile_records"} 1200' in f.read()
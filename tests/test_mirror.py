@@ -0,0 +1,71 @@
+import os
+from datetime import timedelta
+import pytest
+from datagovindia.mirror import DatasetMirror
+
+pytest.importorskip("pyarrow")
+
+def test_sync_mirror_downloads_once(client, server):
+    expected = client.get_data("resource")
+    manifest = client.sync_mirror("resource", batch_size=1000)
+    assert manifest["num_records"] == 2500 and manifest["total"] == 2500
+    assert len(manifest["parts"]) == 1
+    assert DatasetMirror().read("resource").equals(expected)
+
+    # Unchanged resources are served from the mirror after a single info request
+    requests = server.stats["requests"]
+    assert client.get_data("resource", use_mirror=True).equals(expected)
+    assert server.stats["requests"] - requests == 1
+
+def test_sync_mirror_appends_new_records(client, server):
+    client.sync_mirror("resource", batch_size=1000)
+    server.resource_size = 3100
+    server.updated += timedelta(minutes=1)
+    requests = server.stats["requests"]
+    manifest = client.sync_mirror("resource", batch_size=1000)
+    # The info request, the last mirrored record and one page of new records
+    assert server.stats["requests"] - requests == 3
+    assert manifest["num_records"] == 3100 and len(manifest["parts"]) == 2
+    assert DatasetMirror().read("resource").equals(client.get_data("resource"))
+
+def test_sync_mirror_replaces_changed_resources(client, server):
+    client.sync_mirror("resource", batch_size=1000)
+    server.resource_size = 2000
+    server.updated += timedelta(minutes=1)
+    manifest = client.sync_mirror("resource", batch_size=1000)
+    assert manifest["num_records"] == 2000 and len(manifest["parts"]) == 1
+    assert set(os.listdir(DatasetMirror().directory("resource"))) == {"manifest.json", *manifest["parts"]}
+    assert DatasetMirror().read("resource").equals(client.get_data("resource"))
+
+def test_interrupted_replace_leaves_the_mirror_unchanged(tmp_path):
+    mirror = DatasetMirror(str(tmp_path / "mirror"))
+    version = {"updated": 1, "updated_date": "2024-01-01", "total": 4}
+    manifest = mirror.replace("resource", [{"id": ["0", "1"]}, {"id": ["2", "3"]}], version)
+
+    def pages():
+        yield {"id": ["a", "b"]}
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        mirror.replace("resource", pages(), {**version, "updated": 2})
+    assert mirror.manifest("resource") == manifest
+    assert set(os.listdir(mirror.directory("resource"))) == {"manifest.json", *manifest["parts"]}
+    assert mirror.read("resource")["id"].tolist() == ["0", "1", "2", "3"]
+
+def test_offline_mirror_is_served_as_is(client, server, monkeypatch):
+    expected = client.get_data("resource")
+    client.sync_mirror("resource")
+    monkeypatch.setattr(client, "get_resource_info", lambda resource_id: {})
+    assert client.get_data("resource", use_mirror=True).equals(expected)
+    with pytest.raises(ValueError):
+        client.sync_mirror("other-resource")
+
+def test_mirrored_queries_match_the_api(client):
+    everything = client.get_data("resource")
+    data = client.get_data(
+        "resource", use_mirror=True, where={"state": ["Kerala", "Goa"]}, sort_by="state", offset=10, limit=300, fields=["id", "state"]
+    )
+    expected = everything[everything["state"].isin(["Kerala", "Goa"])].sort_values("state", kind="stable")
+    assert data.equals(expected[["id", "state"]].iloc[10:310].reset_index(drop=True))
+    chunks = list(client.get_data("resource", use_mirror=True, filters={"state": "Goa"}, chunksize=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
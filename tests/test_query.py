@@ -0,0 +1,130 @@
+import pandas as pd
+import pytest
+from datagovindia.query import (
+    PageWindow,
+    filter_pages,
+    filter_records,
+    parse_where,
+    plan_query,
+    plan_request,
+)
+
+def test_parse_where():
+    assert parse_where({"state": "Kerala", "district": ["A", "B", "A"], "year": {">=": 2015, "<": 2020}}) == [
+        ("state", "==", "Kerala"),
+        ("district", "in", ["A", "B"]),
+        ("year", ">=", 2015),
+        ("year", "<", 2020),
+    ]
+    assert parse_where(["year >= 2015", "state in (Kerala, 'Goa')", "name = 'x y'", ("value", "!=", 1.5)]) == [
+        ("year", ">=", 2015),
+        ("state", "in", ["Kerala", "Goa"]),
+        ("name", "==", "x y"),
+        ("value", "!=", 1.5),
+    ]
+    assert parse_where(None) == []
+    with pytest.raises(ValueError):
+        parse_where([("year", "~", 2015)])
+
+def test_plan_query_pushes_down_equality_and_fans_out():
+    branches, residual = plan_query(
+        [("state", "in", ["Kerala", "Goa"]), ("year", "in", [2015, 2016]), ("district", "==", "A"), ("value", ">", 1)],
+        filters={"source": "x"},
+    )
+    assert branches == [
+        {"source": "x", "district": "A", "state": "Kerala", "year": "2015"},
+        {"source": "x", "district": "A", "state": "Kerala", "year": "2016"},
+        {"source": "x", "district": "A", "state": "Goa", "year": "2015"},
+        {"source": "x", "district": "A", "state": "Goa", "year": "2016"},
+    ]
+    assert residual == [("value", ">", 1)]
+
+def test_plan_query_contradictions_need_no_request():
+    assert plan_query([("state", "==", "Kerala")], filters={"state": "Goa"}) == ([], [])
+    assert plan_query([("state", "==", "Kerala"), ("state", "in", ["Goa"])]) == ([], [])
+    assert plan_query([("state", "in", [])]) == ([], [])
+    # A value already fixed by an equality only needs to be in the list
+    assert plan_query([("state", "==", "Goa"), ("state", "in", ["Kerala", "Goa"])]) == ([{"state": "Goa"}], [])
+
+def test_plan_query_intersects_in_predicates_on_a_field():
+    assert plan_query(parse_where(["state in (A, B)", "state in (B, C)"])) == ([{"state": "B"}], [])
+    assert plan_query(parse_where(["state in (A, B)", "state in (C, D)"])) == ([], [])
+    values = [str(i) for i in range(10)]
+    branches, residual = plan_query([("a", "in", values), ("b", "in", values), ("b", "in", values[5:])], max_fanout=32)
+    assert len(branches) == 5
+    assert residual == [("a", "in", values)]
+
+def test_plan_query_fanout_limit():
+    values = [str(i) for i in range(10)]
+    branches, residual = plan_query([("a", "in", values), ("b", "in", values)], max_fanout=32)
+    assert len(branches) == 10
+    assert residual == [("b", "in", values)]
+
+def test_plan_request_local_window():
+    assert plan_request(None, {"state": "Goa"}) == ([], [{"state": "Goa"}], [], False)
+    assert plan_request({"state": "Goa"})[3] is False
+    assert plan_request({"state": ["Goa", "Assam"]})[3] is True
+    assert plan_request(["value > 1"])[3] is True
+
+def test_filter_records_compares_typed_values():
+    records = [{"value": "9"}, {"value": "10.5"}, {"value": ""}, {"date": "2020-01-01"}]
+    assert filter_records(records, [("value", ">", 9)]) == [{"value": "10.5"}]
+    assert filter_records(records, [("value", "in", ["9", "x"])]) == [{"value": "9"}]
+    assert filter_records(records, [("date", ">=", pd.Timestamp("2019-12-31"))]) == [{"date": "2020-01-01"}]
+
+def test_page_window_across_pages():
+    pages = [[{"v": str(i)} for i in range(start, start + 5)] for start in range(0, 30, 5)]
+    window = PageWindow([("v", ">=", 3)], offset=4, limit=10)
+    kept = [window(page) for page in pages]
+    assert [len(page) for page in kept] == [0, 3, 5, 2, 0, 0]
+    assert window.done
+    assert [r["v"] for page in kept for r in page] == [str(i) for i in range(7, 17)]
+
+def test_filter_pages_stops_consuming_at_limit():
+    consumed = []
+
+    def pages():
+        for start in range(0, 100, 10):
+            consumed.append(start)
+            yield [{"v": str(i)} for i in range(start, start + 10)]
+
+    assert sum(len(page) for page in filter_pages(pages(), [], offset=5, limit=12)) == 12
+    assert consumed == [0, 10]
+
+def test_get_data_fans_out_in_predicates(client, server):
+    everything = client.get_data("resource", batch_size=1000)
+    requests = server.stats["requests"]
+    data = client.get_data("resource", where={"state": ["Kerala", "Goa"]})
+    # One filtered request per state, sorted within each state
+    assert server.stats["requests"] - requests == 2
+    expected = pd.concat([everything[everything["state"] == state] for state in ("Kerala", "Goa")], ignore_index=True)
+    assert data.equals(expected)
+
+def test_get_data_intersects_in_predicates(client, server):
+    everything = client.get_data("resource", batch_size=1000)
+    data = client.get_data("resource", where=["state in (Kerala, Goa)", "state in (Goa, Assam)"])
+    assert data.equals(everything[everything["state"] == "Goa"].reset_index(drop=True))
+    requests = server.stats["requests"]
+    assert client.get_data("resource", where=["state in (Kerala)", "state in (Goa)"]).empty
+    assert server.stats["requests"] == requests
+
+def test_get_data_applies_residual_predicates_and_window(client):
+    everything = client.get_data("resource", batch_size=1000)
+    data = client.get_data("resource", batch_size=300, where=["value > 100", "state != Goa"], offset=25, limit=500)
+    values = pd.to_numeric(everything["value"])
+    expected = everything[(values > 100) & (everything["state"] != "Goa")].iloc[25:525].reset_index(drop=True)
+    assert len(data) == 500
+    assert data.equals(expected)
+
+def test_get_data_contradiction_sends_no_request(client, server):
+    requests = server.stats["requests"]
+    assert client.get_data("resource", filters={"state": "Goa"}, where={"state": "Kerala"}).empty
+    assert server.stats["requests"] == requests
+
+def test_filter_pages_drops_empty_pages():
+    pages = [[{"v": str(i)} for i in range(start, start + 10)] for start in range(0, 50, 10)]
+    assert [len(page) for page in filter_pages(iter(pages), [("v", ">=", 25)])] == [5, 10, 10]
+
+def test_iter_data_yields_no_empty_filtered_pages(client):
+    chunks = list(client.iter_data("resource", batch_size=500, where=["id >= 1500"]))
+    assert [len(chunk) for chunk in chunks] == [500, 500]
@@ -0,0 +1,120 @@
+import time
+import threading
+import pytest
+from email.utils import formatdate
+from datagovindia.ratelimit import RateLimiter, parse_retry_after, resolve_rate
+
+def test_token_bucket_limits_rate():
+    limiter = RateLimiter(rate=50, burst=1)
+    started = time.monotonic()
+    for _ in range(11):
+        limiter.acquire()
+        limiter.release(status=200, latency=0.001)
+    # The first token is available right away, the next 10 come at 50 per second
+    assert time.monotonic() - started >= 0.18
+
+def test_token_bucket_allows_burst():
+    limiter = RateLimiter(rate=1, burst=5)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.5
+    assert limiter.stats()["in_flight"] == 5
+
+def test_aimd_concurrency():
+    limiter = RateLimiter(max_concurrency=16, decrease_interval=60)
+    limiter.acquire()
+    limiter.release(status=429)
+    assert limiter.concurrency == 8
+    # Errors of requests sent before the decrease do not decrease it again
+    limiter.acquire()
+    limiter.release(status=503)
+    assert limiter.concurrency == 8
+    for _ in range(8):
+        limiter.acquire()
+        limiter.release(status=200)
+    assert 8.9 < limiter.concurrency < 9.1
+    limiter.set_max_concurrency(4)
+    assert limiter.concurrency == 4
+
+def test_slow_responses_decrease_concurrency():
+    limiter = RateLimiter(max_concurrency=8, decrease_interval=0)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(status=200, latency=0.1)
+    limiter.acquire()
+    limiter.release(status=200, latency=10)
+    assert limiter.concurrency < 8
+
+def test_concurrency_limit_blocks_until_release():
+    limiter = RateLimiter(max_concurrency=2)
+    limiter.acquire()
+    limiter.acquire()
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    waiter.start()
+    assert not acquired.wait(0.1)
+    limiter.release(status=200)
+    assert acquired.wait(1)
+    waiter.join()
+
+def test_retry_after_pauses_requests():
+    limiter = RateLimiter(decrease_interval=0)
+    limiter.acquire()
+    limiter.release(status=429, retry_after="0.2")
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert 55 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+def test_resolve_rate(monkeypatch):
+    assert resolve_rate() is None
+    monkeypatch.setenv("DATAGOVINDIA_RATE", "2.5")
+    assert resolve_rate() == 2.5
+    assert resolve_rate(10) == 10
+    with pytest.raises(ValueError):
+        resolve_rate(0)
+
+def test_client_requests_go_through_limiter(server, tmp_path):
+    from datagovindia import DataGovIndia
+
+    limiter = RateLimiter(rate=1000)
+    datagovin = DataGovIndia(db_path=str(tmp_path / "datagovindia.db"), limiter=limiter)
+    datagovin.get_data("resource", batch_size=500, njobs=3)
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.max_concurrency == 3
+    assert limiter.latency is not None
+
+def test_interrupted_requests_release_their_slot(monkeypatch):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from datagovindia.ratelimit import RateLimitedAdapter
+
+    def interrupted(self, request, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(HTTPAdapter, "send", interrupted)
+    limiter = RateLimiter()
+    adapter = RateLimitedAdapter(limiter=limiter)
+    with pytest.raises(KeyboardInterrupt):
+        adapter.send(requests.Request("GET", "http://127.0.0.1:9/").prepare())
+    assert limiter.in_flight == 0
+
+def test_interrupted_httpx_requests_release_their_slot(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    from datagovindia.ratelimit import RateLimitedTransport
+
+    def interrupted(self, request):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(httpx.HTTPTransport, "handle_request", interrupted)
+    limiter = RateLimiter()
+    with pytest.raises(KeyboardInterrupt):
+        RateLimitedTransport(limiter=limiter).handle_request(httpx.Request("GET", "http://127.0.0.1:9/"))
+    assert limiter.in_flight == 0
@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+from datagovindia.core import ChunkWriter
+from datagovindia.schema import KIND_DTYPES, apply_schema, convert_column, field_kinds
+
+FIELDS = [
+    {"id": "state", "type": "keyword"},
+    {"id": "year", "type": "integer"},
+    {"id": "value", "type": "double"},
+    {"id": "date", "type": "date"},
+    {"id": "note", "type": "text"},
+]
+
+def test_field_kinds():
+    kinds = field_kinds(FIELDS + [{"id": "other", "type": "geo_point"}, {"type": "double"}])
+    assert kinds == {
+        "state": "category",
+        "year": "integer",
+        "value": "float",
+        "date": "datetime",
+        "note": "string",
+        "other": "string",
+    }
+
+def test_apply_schema():
+    df = pd.DataFrame(
+        {
+            "state": ["Kerala", "Goa", "Kerala"],
+            "year": ["2015", "NA", "2017"],
+            "value": ["1.5", "2", ""],
+            "date": ["2024-06-01", "31/12/2023", "not a date"],
+            "note": ["a", "b", "c"],
+            "extra": ["x", "y", "z"],
+        }
+    )
+    typed = apply_schema(df, FIELDS)
+    assert typed["state"].dtype == "category"
+    assert typed["year"].dtype == "Int64" and typed["year"].isna().tolist() == [False, True, False]
+    assert typed["value"].dtype == "float64" and typed["value"].tolist()[:2] == [1.5, 2.0]
+    assert typed["date"].dtype == "datetime64[ns]"
+    assert typed["date"].tolist()[:2] == [pd.Timestamp("2024-06-01"), pd.Timestamp("2023-12-31")]
+    assert pd.isna(typed["date"].iloc[2])
+    assert typed["note"].equals(df["note"]) and typed["extra"].equals(df["extra"])
+    with pytest.raises(ValueError):
+        apply_schema(df, FIELDS, dtype_backend="arrow")
+
+@pytest.mark.parametrize(
+    "kind, values",
+    [
+        ("float", ["1", "2"]),
+        ("float", [None, None]),
+        ("integer", ["1", "2"]),
+        ("integer", ["", None]),
+        ("datetime", ["2024-01-01T10:00:00+05:30", "2024-01-02T00:00:00Z"]),
+        ("datetime", ["01/02/2024", None]),
+        ("datetime", ["3000-01-01", None]),
+        ("category", ["a", "b"]),
+    ],
+)
+def test_kind_dtype_does_not_depend_on_values(kind, values):
+    assert convert_column(pd.Series(values, name="column"), kind).dtype == KIND_DTYPES[kind]
+
+def test_dates_with_different_offsets_are_utc():
+    series = convert_column(pd.Series(["2024-01-01T10:00:00+05:30", "2024-01-01T00:00:00Z", "2024-01-01 08:00"]), "datetime")
+    assert series.tolist() == [pd.Timestamp("2024-01-01 04:30"), pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-01 08:00")]
+
+def test_fractional_integers_become_missing():
+    with pytest.warns(UserWarning, match="not integers"):
+        series = convert_column(pd.Series(["1", "2.5", "3"], name="year"), "integer")
+    assert series.isna().tolist() == [False, True, False]
+
+def test_pyarrow_backend():
+    pytest.importorskip("pyarrow")
+    typed = apply_schema(pd.DataFrame({"value": ["1", "2"], "year": ["1", None]}), FIELDS, dtype_backend="pyarrow")
+    assert str(typed["value"].dtype) == "double[pyarrow]"
+    assert str(typed["year"].dtype) == "int64[pyarrow]"
+
+@pytest.mark.parametrize("extension", [".parquet", ".feather"])
+def test_typed_chunks_stream_to_one_file(tmp_path, extension):
+    pytest.importorskip("pyarrow")
+    chunks = [
+        pd.DataFrame({"state": ["Kerala"], "year": ["2015"], "value": ["1"], "date": ["2024-06-01"]}),
+        pd.DataFrame({"state": ["Goa", "Assam"], "year": ["", "2016"], "value": ["2.5", ""], "date": [None, "01/01/2020"]}),
+        pd.DataFrame({"state": [None], "year": [None], "value": [None], "date": [None]}),
+    ]
+    path = str(tmp_path / f"data{extension}")
+    with ChunkWriter(path) as writer:
+        for chunk in chunks:
+            writer.write(apply_schema(chunk, FIELDS))
+    data = pd.read_parquet(path) if extension == ".parquet" else pd.read_feather(path)
+    assert len(data) == 4
+    assert data["state"].astype(object).tolist()[:3] == ["Kerala", "Goa", "Assam"]
+    assert data["value"].tolist()[:2] == [1.0, 2.5]
+
+def test_get_data_typed(client):
+    data = client.get_data("resource", limit=500, typed=True)
+    assert data["state"].dtype == "category"
+    assert data["date"].dtype == "datetime64[ns]"
+    assert data["value"].dtype == "float64"
+    chunks = list(client.iter_data("resource", limit=500, chunksize=200, typed=True))
+    assert [chunk["value"].dtype for chunk in chunks] == ["float64"] * 3
+    assert pd.concat(chunks, ignore_index=True)["value"].equals(data["value"])
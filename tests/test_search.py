@@ -0,0 +1,69 @@
+import sqlite3
+import pytest
+from datagovindia import DataGovIndia
+from datagovindia.core import build_fts_query
+
+@pytest.fixture
+def database(tmp_path, catalog):
+    datagovin = DataGovIndia(db_path=str(tmp_path / "search.db"))
+    datagovin.ensure_schema()
+    datagovin.upsert_records("resources", catalog)
+    return datagovin
+
+def resource_ids(data) -> set:
+    return set(data["resource_id"]) if len(data) else set()
+
+def test_fts_matches_regex_search(database):
+    fts = database.search("mgnrega", search_fields=["title", "description"])
+    regex = database.search("mgnrega", search_fields=["title", "description"], mode="regex")
+    assert len(fts) > 0
+    assert resource_ids(fts) == resource_ids(regex)
+
+def test_fts_index_follows_replaced_and_deleted_rows(database, catalog):
+    record = dict(catalog[0], title="Groundwater salinity survey")
+    database.upsert_records("resources", [record])
+    assert resource_ids(database.search("salinity")) == {record["resource_id"]}
+    assert record["resource_id"] not in resource_ids(database.search(catalog[0]["title"].split()[0]))
+
+    database._remove_resources([record["resource_id"]])
+    assert len(database.search("salinity")) == 0
+    with database.connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM resources_fts").fetchone()[0] == len(catalog) - 1
+
+def test_rebuild_search_index_keeps_results(database):
+    before = resource_ids(database.search("census"))
+    database.rebuild_search_index()
+    assert resource_ids(database.search("census")) == before
+
+def test_search_facets(database, catalog):
+    org = catalog[0]["orgs"].split(" | ")[0]
+    expected = {r["resource_id"] for r in catalog if org in r["orgs"].split(" | ")}
+    assert resource_ids(database.search(orgs=[org.upper()])) == expected
+    assert resource_ids(database.search(source="tn.data.gov.in")) == {
+        r["resource_id"] for r in catalog if r["source"] == "tn.data.gov.in"
+    }
+
+def test_search_is_read_only_without_fts_index(tmp_path, catalog, caplog):
+    path = str(tmp_path / "old.db")
+    datagovin = DataGovIndia(db_path=path)
+    with datagovin.connect() as conn:
+        datagovin._create_resources_table(conn.cursor())
+        conn.commit()
+    datagovin.upsert_records("resources", catalog)
+
+    data = datagovin.search("mgnrega")
+    assert len(data) > 0
+    assert "no full-text index" in caplog.text
+    with sqlite3.connect(path) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert tables == {"resources"}
+    with pytest.raises(ValueError, match="ensure_schema"):
+        datagovin.search(orgs=["Ministry of Census"])
+
+def test_build_fts_query():
+    assert build_fts_query("rural employ*") == '{title} : "rural" {title} : "employ"*'
+    assert build_fts_query('description:"crop production" OR mandi') == (
+        'description : "crop production" OR {title} : "mandi"'
+    )
+    with pytest.raises(ValueError):
+        build_fts_query("state:kerala")
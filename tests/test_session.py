@@ -0,0 +1,54 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datagovindia import DataGovIndia
+from datagovindia.core import DEFAULT_HEADERS, create_session, get_session
+from datagovindia.ratelimit import RateLimiter, RateLimitedAdapter
+
+def test_get_session_is_shared_and_grows():
+    session = get_session()
+    assert get_session() is session
+    assert get_session(pool_maxsize=64) is session
+    assert session.get_adapter("https://api.data.gov.in")._pool_maxsize >= 64
+
+def test_create_session_pools_and_compresses():
+    limiter = RateLimiter(rate=10)
+    session = create_session(pool_maxsize=8, limiter=limiter)
+    adapter = session.get_adapter("https://api.data.gov.in")
+    assert isinstance(adapter, RateLimitedAdapter)
+    assert adapter.limiter is limiter
+    assert adapter._pool_maxsize == 8
+    assert session.headers["Accept-Encoding"] == DEFAULT_HEADERS["Accept-Encoding"]
+
+def test_client_session(client):
+    session = requests.Session()
+    datagovin = DataGovIndia(session=session)
+    assert datagovin.session is session
+    assert datagovin.session.get_adapter("https://api.data.gov.in").limiter is datagovin.limiter
+    # The pool grows with the number of jobs of a request
+    assert client._session_for(njobs=40, engine="thread") is client.session
+    assert client.session.get_adapter("http://127.0.0.1")._pool_maxsize == 40
+    assert client._session_for(njobs=4, engine="process") is None
+
+def test_client_session_keeps_adapter_settings():
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=0.5)
+    session.mount("https://", HTTPAdapter(max_retries=retries, pool_maxsize=64, pool_block=True))
+    datagovin = DataGovIndia(session=session)
+    adapter = session.get_adapter("https://api.data.gov.in")
+    assert isinstance(adapter, RateLimitedAdapter) and adapter.limiter is datagovin.limiter
+    assert adapter.max_retries is retries
+    assert adapter._pool_maxsize == 64 and adapter._pool_block
+    assert isinstance(session.get_adapter("http://127.0.0.1"), RateLimitedAdapter)
+
+def test_client_session_keeps_custom_adapters(caplog):
+    class CustomAdapter(HTTPAdapter):
+        pass
+
+    session = requests.Session()
+    adapter = CustomAdapter()
+    session.mount("https://", adapter)
+    DataGovIndia(session=session)
+    assert session.get_adapter("https://api.data.gov.in") is adapter
+    assert isinstance(session.get_adapter("http://127.0.0.1"), RateLimitedAdapter)
+    assert "not rate limited" in caplog.text
@@ -0,0 +1,131 @@
+import time
+import threading
+import pytest
+import datagovindia.core as core
+from datagovindia.shard import WorkQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    return WorkQueue(str(tmp_path / "shards"), lease=60, max_attempts=2)
+
+def test_jobs_are_keyed_by_their_request(queue):
+    job_id = queue.create_job("get_data", {"resource_id": "a"}, [{"offset": 0}, {"offset": 10}])
+    assert queue.create_job("get_data", {"resource_id": "a"}, [{"offset": 0}]) == job_id
+    assert queue.create_job("get_data", {"resource_id": "b"}, [{"offset": 0}]) != job_id
+    assert queue.job(job_id)["num_units"] == 2
+    assert queue.job("missing") is None
+
+def test_units_are_claimed_once_in_order(queue):
+    job_id = queue.create_job("get_data", {}, [{"offset": i} for i in range(3)])
+    claims = [queue.claim(f"worker-{i}") for i in range(4)]
+    assert [claim["params"]["offset"] for claim in claims[:3]] == [0, 1, 2]
+    assert claims[3] is None
+    queue.complete(job_id, 0, 10)
+    assert queue.progress(job_id) == {"pending": 0, "claimed": 2, "done": 1, "failed": 0, "records": 10, "units": 3}
+
+def test_concurrent_workers_never_share_a_unit(queue):
+    job_id = queue.create_job("get_data", {}, [{"offset": i} for i in range(40)])
+    claimed, lock = [], threading.Lock()
+
+    def worker(name):
+        while (unit := queue.claim(name, job_id)) is not None:
+            with lock:
+                claimed.append(unit["unit"])
+
+    threads = [threading.Thread(target=worker, args=(f"worker-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == list(range(40))
+
+def test_expired_leases_are_claimed_again(tmp_path):
+    queue = WorkQueue(str(tmp_path / "shards"), lease=0.05, max_attempts=2)
+    job_id = queue.create_job("get_data", {}, [{"offset": 0}])
+    assert queue.claim("dead-worker")["attempts"] == 1
+    assert queue.claim("other-worker") is None
+    time.sleep(0.1)
+    assert queue.claim("other-worker")["attempts"] == 2
+    # The last allowed claim expired too: the unit fails instead of being claimed a third time
+    time.sleep(0.1)
+    assert queue.claim("other-worker") is None
+    assert queue.progress(job_id)["failed"] == 1
+    assert queue.errors(job_id) == {0: "Lease of worker other-worker expired"}
+
+def test_failed_units_are_retried_until_max_attempts(queue):
+    job_id = queue.create_job("get_data", {}, [{"offset": 0}])
+    queue.claim("worker")
+    queue.fail(job_id, 0, "ValueError: first")
+    assert queue.progress(job_id)["pending"] == 1
+    queue.claim("worker")
+    queue.fail(job_id, 0, "ValueError: second")
+    assert queue.progress(job_id)["failed"] == 1
+    assert queue.errors(job_id) == {0: "ValueError: second"}
+    assert queue.claim("worker") is None
+
+    assert queue.retry_failed(job_id) == 1
+    assert queue.claim("worker")["attempts"] == 1
+
+def test_unit_outputs(queue):
+    job_id = queue.create_job("get_data", {}, [{"offset": 0}])
+    queue.write_unit(job_id, 0, {"id": ["1", "2"]})
+    assert queue.read_unit(job_id, 0) == {"id": ["1", "2"]}
+    queue.remove(job_id)
+    assert queue.job(job_id) is None and queue.jobs() == []
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"batch_size": 300},
+        {"offset": 37, "limit": 1234, "batch_size": 500},
+        {"where": {"state": ["Kerala", "Goa"]}, "offset": 5, "limit": 300, "batch_size": 100},
+        {"where": ["value > 100"], "batch_size": 700, "fields": ["id", "value"]},
+    ],
+)
+def test_sharded_get_data_matches_get_data(client, kwargs):
+    job_id = client.plan_data_shards("resource", **kwargs)
+    workers = [threading.Thread(target=client.run_shard_worker, kwargs={"job_id": job_id, "njobs": 2, "worker_id": f"w{i}"}) for i in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert client.merge_shards(job_id).equals(client.get_data("resource", **kwargs))
+    assert WorkQueue().job(job_id) is None
+
+def test_failed_units_are_fetched_again(client, monkeypatch):
+    job_id = client.plan_data_shards("resource", batch_size=500)
+    failures = []
+    get_api_records = core.get_api_records
+
+    def flaky_records(url, session=None):
+        if "offset=1000" in url and not failures:
+            failures.append(url)
+            raise ValueError("Broken page")
+        return get_api_records(url, session=session)
+
+    monkeypatch.setattr(core, "get_api_records", flaky_records)
+    client.run_shard_worker(job_id=job_id, njobs=1)
+    assert len(failures) == 1
+    assert WorkQueue().progress(job_id)["done"] == 5
+    assert client.merge_shards(job_id)["id"].tolist() == [str(j) for j in range(2500)]
+
+def test_merge_requires_a_complete_job(client):
+    job_id = client.plan_data_shards("resource", batch_size=500)
+    with pytest.raises(ValueError, match="not complete"):
+        client.merge_shards(job_id)
+    with pytest.raises(ValueError):
+        client.merge_shards("missing-job")
+
+def test_sharded_sync_matches_sync_metadata(client, server, tmp_path):
+    job_id = client.plan_sync_shards(batch_size=500)
+    client.run_shard_worker(job_id=job_id, njobs=2)
+    assert client.merge_shards(job_id) == 1200
+
+    expected = core.DataGovIndia(db_path=str(tmp_path / "expected.db"))
+    expected.sync_metadata(batch_size=500)
+
+    def resources(datagovin):
+        return datagovin.search(source="data.gov.in").sort_values("resource_id", ignore_index=True)
+
+    assert resources(client).equals(resources(expected))
+    assert client.get_update_info()["number_of_resources"] == 1200
@@ -0,0 +1,79 @@
+import pytest
+import datagovindia.core as core
+
+def stored_ids(datagovin) -> set:
+    with datagovin.connect() as conn:
+        return {row[0] for row in conn.execute("SELECT resource_id FROM resources")}
+
+def newest_ids(datagovin, n: int) -> list:
+    with datagovin.connect() as conn:
+        return [row[0] for row in conn.execute("SELECT resource_id FROM resources ORDER BY date_updated DESC LIMIT ?", (n,))]
+
+def test_incremental_sync_on_empty_database_is_full(client, server):
+    client.sync_metadata(batch_size=500, njobs=2, incremental=True)
+    info = client.get_update_info()
+    assert info["sync_mode"] == "full"
+    assert info["number_of_resources"] == server.catalog_size == len(stored_ids(client))
+
+def test_incremental_sync_stops_at_watermark(client, server):
+    client.sync_metadata(batch_size=200, njobs=2)
+    missing = newest_ids(client, 10)
+    client._remove_resources(missing)
+    watermark = client._get_watermark()
+
+    requests_before = server.stats["requests"]
+    client.sync_metadata(batch_size=200, njobs=1, incremental=True)
+    info = client.get_update_info()
+    assert info["sync_mode"] == "incremental"
+    assert info["watermark"] == watermark
+    # The 10 removed resources and the one holding the watermark
+    assert info["num_fetched"] == 11
+    assert info["num_inserted"] == 10
+    assert info["number_of_resources"] == server.catalog_size
+    assert set(missing) <= stored_ids(client)
+    # Total, a few pages of the listing and the deactivated resources, never the whole catalog
+    assert server.stats["requests"] - requests_before < server.catalog_size // 200
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_full_sync_removes_unavailable_resources(client, server, bulk):
+    client.sync_metadata(batch_size=500, bulk=bulk)
+    server.catalog_size = 1000
+    client.sync_metadata(batch_size=500, bulk=bulk)
+    info = client.get_update_info()
+    assert info["num_removed"] == 200
+    assert len(stored_ids(client)) == 1000
+    assert len(client.search("mgnrega")) > 0
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_incomplete_listing_never_removes_resources(client, server, monkeypatch, bulk):
+    client.sync_metadata(batch_size=500, bulk=bulk)
+    fetch_metadata = core._fetch_metadata
+
+    def short_fetch_metadata(api_key, start, end, active, session):
+        return [] if start == 500 else fetch_metadata(api_key, start, end, active, session)
+
+    monkeypatch.setattr(core, "_fetch_metadata", short_fetch_metadata)
+    client.sync_metadata(batch_size=500, bulk=bulk)
+    info = client.get_update_info()
+    assert info["num_fetched"] == server.catalog_size - 500
+    assert info["num_removed"] == 0
+    assert len(stored_ids(client)) == server.catalog_size
+
+def test_bulk_and_row_by_row_syncs_agree(server, tmp_path):
+    from datagovindia import DataGovIndia
+
+    databases = []
+    for bulk in (True, False):
+        datagovin = DataGovIndia(db_path=str(tmp_path / f"bulk-{bulk}.db"))
+        datagovin.sync_metadata(batch_size=300, bulk=bulk)
+        with datagovin.connect() as conn:
+            databases.append(conn.execute("SELECT * FROM resources ORDER BY resource_id").fetchall())
+    assert databases[0] == databases[1]
+
+def test_pages_completing_out_of_order_are_all_stored(client, server):
+    server.jitter = 0.05
+    client.sync_metadata(batch_size=100, njobs=6)
+    with client.connect() as conn:
+        dates = [row[0] for row in conn.execute("SELECT date_updated FROM resources")]
+    assert len(set(dates)) == server.catalog_size
+    assert client.get_update_info()["num_fetched"] == server.catalog_size
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+from datagovindia.core import ChunkWriter, save_dataframe_chunks
+
+CHUNKS = [
+    pd.DataFrame({"id": ["0", "1"], "state": ["Kerala", "Goa"]}),
+    pd.DataFrame({"state": ["Assam"], "id": ["2"], "extra": ["dropped"]}),
+    pd.DataFrame({"id": ["3"]}),
+]
+
+EXPECTED = pd.DataFrame({"id": ["0", "1", "2", "3"], "state": ["Kerala", "Goa", "Assam", None]})
+
+def read(path: str) -> pd.DataFrame:
+    if path.endswith(".csv"):
+        return pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+    if path.endswith((".jsonl", ".ndjson")):
+        return pd.read_json(path, lines=True, dtype=False)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_feather(path)
+
+@pytest.mark.parametrize("extension", [".csv", ".jsonl", ".ndjson", ".parquet", ".feather", ".arrow"])
+def test_save_dataframe_chunks(tmp_path, extension):
+    if extension in (".parquet", ".feather", ".arrow"):
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"data{extension}")
+    assert save_dataframe_chunks(iter(CHUNKS), path) == 4
+    data = read(path)
+    assert list(data.columns) == ["id", "state"]
+    assert data["id"].astype(str).tolist() == EXPECTED["id"].tolist()
+    assert data["state"].tolist()[:3] == EXPECTED["state"].tolist()[:3]
+    assert pd.isna(data["state"].iloc[3])
+
+def test_chunk_writer_rejects_unknown_extension(tmp_path):
+    with pytest.raises(ValueError):
+        ChunkWriter(str(tmp_path / "data.xlsx"))
+
+def test_chunk_writer_writes_parquet_row_group_per_chunk(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "data.parquet")
+    with ChunkWriter(path) as writer:
+        for chunk in CHUNKS:
+            writer.write(chunk)
+    assert pq.ParquetFile(path).num_row_groups == len(CHUNKS)
+
+def test_get_data_streams_to_file(client, tmp_path):
+    path = str(tmp_path / "data.csv")
+    rows = save_dataframe_chunks(client.iter_data("resource", batch_size=500, limit=1200), path)
+    assert rows == 1200
+    assert read(path).equals(client.get_data("resource", limit=1200))
+
+@pytest.mark.parametrize("extension", [".csv", ".jsonl", ".parquet"])
+def test_empty_first_chunks_do_not_fix_the_columns(tmp_path, extension):
+    if extension == ".parquet":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"data{extension}")
+    empty = [pd.DataFrame(), pd.DataFrame({"id": [], "state": []})]
+    assert save_dataframe_chunks(iter(empty + CHUNKS), path) == 4
+    data = read(path)
+    assert list(data.columns) == ["id", "state"]
+    assert data["id"].astype(str).tolist() == EXPECTED["id"].tolist()
+    if extension == ".csv":
+        with open(path) as f:
+            assert f.read().count("id,state") == 1
+
+def test_only_empty_chunks_write_a_header(tmp_path):
+    path = str(tmp_path / "data.csv")
+    assert save_dataframe_chunks(iter([pd.DataFrame(), pd.DataFrame({"id": [], "state": []})]), path) == 0
+    with open(path) as f:
+        assert f.read() == "id,state\n"
+
+def test_locally_filtered_data_streams_to_file(client, tmp_path):
+    path = str(tmp_path / "data.csv")
+    rows = save_dataframe_chunks(client.iter_data("resource", batch_size=500, where=["id >= 1500"]), path)
+    assert rows == 1000
+    assert read(path).equals(client.get_data("resource", where=["id >= 1500"]))